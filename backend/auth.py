@@ -1,21 +1,32 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from models import User, TokenData
+from cache import TTLCache
+from passwords import password_hasher, pwd_context
 import os
+import time
 
 # Configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Validated users keyed by bearer token; an entry never outlives the token's exp
+user_cache: TTLCache[User] = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(username: str) -> int:
+    """Drop cached sessions of a user after it is changed, deactivated or removed."""
+    return user_cache.invalidate_where(lambda user: user.username == username)
+
+# Synchronous helpers; request handlers use password_hasher so bcrypt runs off the event loop
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -42,18 +53,29 @@ async def authenticate_user(db: AsyncIOMotorDatabase, username: str, password: s
     user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    if not verified:
         return False
+    if new_hash:
+        # Stored hash uses an outdated scheme or cost factor
+        await db.users.update_one({"id": user.id}, {"$set": {"password_hash": new_hash}})
+        user.password_hash = new_hash
+        invalidate_user(user.username)
     return user
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncIOMotorDatabase = None):
+    token = credentials.credentials
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -64,4 +86,6 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     user = await get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    if "exp" in payload:
+        user_cache.set(token, user, ttl_seconds=payload["exp"] - time.time())
+    return user
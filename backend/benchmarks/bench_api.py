@@ -0,0 +1,339 @@
+"""Throughput and latency of the API's hot paths, measured in-process.
+
+The FastAPI app is driven through httpx's ASGI transport, so no server,
+network or TLS is involved and runs are comparable between commits. Data
+lives in the in-memory fake of tests/memory_db.py by default
+(``--storage memory``); with ``--storage mongo`` the ``MONGO_URL`` server is
+used instead and the ``DB_NAME`` database (``scammer_bench`` by default)
+is reseeded whenever its size does not match ``--size``.
+
+Every scenario runs for ``--duration`` seconds with ``--concurrency``
+concurrent clients after a warm-up. Per request label the run records
+p50/p95/p99 and the throughput; ``--output`` writes them as JSON, and
+``--baseline`` compares against such a file from an earlier commit.
+
+    python benchmarks/bench_api.py --size 100000 --output after.json --baseline before.json
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "scammer_bench")
+
+import httpx  # noqa: E402
+
+from models import Scammer, ScammerStatus  # noqa: E402
+from search import with_search_fields  # noqa: E402
+import server  # noqa: E402
+
+ADMIN_USERNAME = "cyber_admin_2025"
+ADMIN_PASSWORD = "Sc4mm3r_Db@Pr0t3ct!"
+FIRST_DISCORD_ID = 100000000000000000
+# IDs of records created by the CRUD scenario, far away from the seeded ones
+CRUD_DISCORD_ID = 900000000000000000
+SCAM_METHODS = ["Фишинг", "Фейковый обмен", "Кража аккаунта", "Поддельный Nitro", "Предоплата"]
+SEED_BATCH = 10000
+LOOKUP_BATCH = 100
+PUBLIC_PAGES = 5
+PUBLIC_PAGE_SIZE = 50
+MIN_SAMPLES = 20
+# Latency changes smaller than this are reported as noise by --baseline
+NOISE = 0.05
+
+
+def progress(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+# -- dataset -------------------------------------------------------------------
+
+def make_document(position: int, now: datetime) -> Dict[str, Any]:
+    created_at = now - timedelta(seconds=position)
+    scammer = Scammer(
+        discord_id=str(FIRST_DISCORD_ID + position),
+        discord_name=f"scammer_{position}",
+        scam_method=SCAM_METHODS[position % len(SCAM_METHODS)],
+        description="Предлагал бесплатный Nitro по ссылке и крал аккаунты.",
+        status=ScammerStatus.INACTIVE if position % 4 == 0 else ScammerStatus.ACTIVE,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+    return with_search_fields(scammer.model_dump())
+
+
+async def seed(database, size: int) -> None:
+    if await database.scammers.count_documents({}) == size:
+        progress(f"Reusing {size} seeded scammers")
+        return
+    await database.scammers.delete_many({})
+    now = datetime.utcnow().replace(microsecond=0)
+    started = time.perf_counter()
+    for batch_start in range(0, size, SEED_BATCH):
+        batch = [make_document(position, now) for position in range(batch_start, min(size, batch_start + SEED_BATCH))]
+        await database.scammers.insert_many(batch, ordered=False)
+    progress(f"Seeded {size} scammers in {time.perf_counter() - started:.1f}s")
+
+
+# -- measuring -----------------------------------------------------------------
+
+class Session:
+    """An HTTP client that records the latency of every request by label."""
+
+    def __init__(self, client: httpx.AsyncClient, context: Dict[str, Any]):
+        self.client = client
+        self.context = context
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def request(self, label: str, method: str, url: str, expected: int = 200, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.samples[label].append(elapsed * 1000)
+            if response.status_code != expected:
+                self.errors[label] += 1
+        return response
+
+    @property
+    def auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.context['token']}"}
+
+
+Scenario = Callable[[Session, random.Random], Awaitable[None]]
+
+
+def random_seeded_id(session: Session, rng: random.Random) -> str:
+    return str(FIRST_DISCORD_ID + rng.randrange(session.context["size"]))
+
+
+async def public_list(session: Session, rng: random.Random) -> None:
+    await session.request("public_first_page", "GET", "/api/scammers/public")
+    response = await session.request("public_cursor_page", "GET", "/api/scammers/public", params={"limit": PUBLIC_PAGE_SIZE})
+    for _ in range(PUBLIC_PAGES - 1):
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        response = await session.request(
+            "public_cursor_page", "GET", "/api/scammers/public",
+            params={"limit": PUBLIC_PAGE_SIZE, "cursor": cursor},
+        )
+
+
+async def search(session: Session, rng: random.Random) -> None:
+    position = rng.randrange(session.context["size"])
+    await session.request("search_name", "GET", "/api/scammers/public", params={"search": f"scammer_{position}"[:11]})
+    await session.request("search_discord_id", "GET", "/api/scammers/public", params={"search": str(FIRST_DISCORD_ID + position)[:15]})
+    await session.request(
+        "search_admin_relevance", "GET", "/api/scammers",
+        params={"search": f"scammer {position}", "relevance": "true"}, headers=session.auth,
+    )
+    # A misspelt name, as a moderator looking for a renamed account would type it
+    await session.request(
+        "search_similar", "GET", "/api/scammers/similar", params={"name": f"scamer_{position}"}, headers=session.auth,
+    )
+
+
+async def statistics_page(session: Session, rng: random.Random) -> None:
+    await session.request("statistics", "GET", "/api/statistics")
+
+
+async def login(session: Session, rng: random.Random) -> None:
+    await session.request("login", "POST", "/api/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+
+
+async def crud(session: Session, rng: random.Random) -> None:
+    discord_id = str(CRUD_DISCORD_ID + next(session.context["crud_ids"]))
+    response = await session.request(
+        "crud_create", "POST", "/api/scammers", headers=session.auth,
+        json={"discord_id": discord_id, "discord_name": f"bench_{discord_id}", "scam_method": SCAM_METHODS[0], "description": "bench"},
+    )
+    if response.status_code != 200:
+        return
+    scammer_id = response.json()["id"]
+    await session.request("crud_read", "GET", f"/api/scammers/{scammer_id}", headers=session.auth)
+    await session.request("crud_update", "PUT", f"/api/scammers/{scammer_id}", headers=session.auth, json={"status": "inactive"})
+    await session.request("crud_delete", "DELETE", f"/api/scammers/{scammer_id}", headers=session.auth)
+
+
+async def bulk_lookup(session: Session, rng: random.Random) -> None:
+    # Half hits, half misses, as a bot checking a server's member list would see
+    hits = [random_seeded_id(session, rng) for _ in range(LOOKUP_BATCH // 2)]
+    misses = [str(CRUD_DISCORD_ID - 1 - rng.randrange(10 ** 9)) for _ in range(LOOKUP_BATCH - len(hits))]
+    await session.request("lookup_100", "POST", "/api/scammers/lookup", json={"discord_ids": hits + misses})
+    await session.request("check", "GET", f"/api/check/{random_seeded_id(session, rng)}")
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "public_list": public_list,
+    "search": search,
+    "statistics": statistics_page,
+    "bulk_lookup": bulk_lookup,
+    "login": login,
+    "crud": crud,
+}
+
+
+def percentile(quantiles: List[float], value: int) -> float:
+    return round(quantiles[value - 1], 3)
+
+
+def summarize(samples: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / seconds, 1),
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+async def run_scenario(
+    scenario: Scenario,
+    session: Session,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed_value: int,
+) -> Dict[str, Any]:
+    async def worker(rng: random.Random, until: float) -> None:
+        iterations = 0
+        # Slow scenarios (login hashes a password) still get a few samples
+        while time.perf_counter() < until or (session.recording and iterations * concurrency < MIN_SAMPLES):
+            await scenario(session, rng)
+            iterations += 1
+
+    for recording, seconds in ((False, warmup), (True, duration)):
+        session.recording = recording
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(random.Random(seed_value * 1000 + number), started + seconds) for number in range(concurrency)
+        ))
+    elapsed = time.perf_counter() - started
+    session.recording = False
+    return {
+        "seconds": round(elapsed, 3),
+        "endpoints": {
+            label: summarize(samples, session.errors[label], elapsed)
+            for label, samples in sorted(session.samples.items())
+        },
+    }
+
+
+# -- reporting -----------------------------------------------------------------
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    previous = {
+        label: endpoint
+        for scenario in (baseline or {}).get("scenarios", {}).values()
+        for label, endpoint in scenario["endpoints"].items()
+    }
+    print(f"{'endpoint':<24}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for scenario in results["scenarios"].values():
+        for label, endpoint in scenario["endpoints"].items():
+            line = (
+                f"{label:<24}{endpoint['throughput_rps']:>10.1f}{endpoint['p50_ms']:>10.3f}"
+                f"{endpoint['p95_ms']:>10.3f}{endpoint['p99_ms']:>10.3f}{endpoint['errors']:>8}"
+            )
+            before = previous.get(label)
+            if before and before["p50_ms"]:
+                change = endpoint["p50_ms"] / before["p50_ms"] - 1
+                verdict = "" if abs(change) < NOISE else (" slower" if change > 0 else " faster")
+                line += f"   p50 {change:+.1%}{verdict}"
+            print(line)
+
+
+def use_memory_storage() -> None:
+    # The fake lives with the tests; the repository root makes it importable
+    sys.path.insert(0, str(BACKEND_DIR.parent))
+    from tests.memory_db import MemoryClient
+
+    server.client = MemoryClient()
+    server.db = server.client[os.environ["DB_NAME"]]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    await seed(server.db, args.size)
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+            response.raise_for_status()
+            context = {"size": args.size, "token": response.json()["access_token"], "crud_ids": itertools.count()}
+
+            results: Dict[str, Any] = {}
+            for number, name in enumerate(args.scenarios):
+                progress(f"Running {name}")
+                results[name] = await run_scenario(
+                    SCENARIOS[name], Session(client, context), args.concurrency, args.duration, args.warmup, number,
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="Seeded scammers, e.g. 1000, 100000 or 1000000")
+    parser.add_argument("--storage", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--duration", type=float, default=5.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    # Keep per-request log lines out of the measurement
+    logging.disable(logging.INFO)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    if args.storage == "memory":
+        use_memory_storage()
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "storage": args.storage,
+        "size": args.size,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scenarios": asyncio.run(run(args)),
+    }
+    print_results(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
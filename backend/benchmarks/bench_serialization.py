@@ -0,0 +1,84 @@
+"""Per-row cost of serializing scammer list pages.
+
+Compares the previous path (build ``ScammerResponse`` per row, then let
+FastAPI validate the list against ``response_model`` and encode it with the
+default JSON encoder) with the projection + direct bytes path used by the
+list routes now.
+
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 50
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from models import ScammerResponse  # noqa: E402
+from serialization import SCAMMER_RESPONSE_FIELDS, dumps, orjson  # noqa: E402
+
+response_adapter = TypeAdapter(List[ScammerResponse])
+
+
+def make_documents(rows: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow().replace(microsecond=0)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "discord_id": str(100000000000000000 + i),
+            "discord_name": f"scammer_{i}",
+            "scam_method": "Фишинг",
+            "description": "Предлагал бесплатный Nitro по ссылке и крал аккаунты. " * 4,
+            "status": "active" if i % 3 else "inactive",
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+        }
+        for i in range(rows)
+    ]
+
+
+def pydantic_path(documents: List[Dict[str, Any]]) -> bytes:
+    models = [ScammerResponse(**document) for document in documents]
+    validated = response_adapter.validate_python(models)
+    content = response_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def direct_path(documents: List[Dict[str, Any]]) -> bytes:
+    return dumps(documents)
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], bytes], documents: List[Dict[str, Any]], repeat: int) -> float:
+    fn(documents)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(documents)
+    return (time.perf_counter() - started) / (repeat * len(documents))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Documents as the projection returns them: response fields only
+    documents = [{name: document[name] for name in SCAMMER_RESPONSE_FIELDS} for document in make_documents(args.rows)]
+    before = measure(pydantic_path, documents, args.repeat)
+    after = measure(direct_path, documents, args.repeat)
+
+    print(f"rows per page:     {args.rows}")
+    print(f"encoder:           {'orjson' if orjson is not None else 'json'}")
+    print(f"pydantic path:     {before * 1e6:8.2f} us/row")
+    print(f"direct bytes path: {after * 1e6:8.2f} us/row")
+    print(f"speedup:           {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Streaming bulk import of scammer records from NDJSON or CSV uploads.
+
+The request body is decoded incrementally and rows are written with
+unordered ``insert_many`` in fixed-size batches, so memory use depends on the
+batch size rather than on the size of the upload. Duplicates are detected by
+the unique Discord ID index instead of a lookup per row. A line or CSV record
+longer than ``MAX_RECORD_LENGTH`` is reported as an invalid row and skipped
+without being buffered, so a body without newlines cannot exhaust memory.
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import codecs
+import csv
+import json
+import os
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from models import (
+    RecordFormat, ImportReport, ImportRowResult, ImportRowStatus,
+    Scammer, ScammerCreate, DUPLICATE_DISCORD_ID_MESSAGE, INVALID_DISCORD_ID_MESSAGE,
+    is_valid_discord_id
+)
+from search import with_search_fields
+
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+# Longest line or CSV record accepted, in characters; longer ones are rejected
+# as a row without being buffered
+MAX_RECORD_LENGTH = int(os.environ.get("IMPORT_MAX_RECORD_LENGTH", str(1024 * 1024)))
+# Cap on the duplicate/invalid rows listed individually in the report
+MAX_REPORTED_ROWS = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+ParsedRow = Tuple[int, Union[Dict[str, Any], str]]
+
+
+def _too_long(max_length: int) -> str:
+    return f"Record exceeds {max_length} characters"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = MAX_RECORD_LENGTH) -> AsyncIterator[Optional[str]]:
+    """Decoded lines of the body; None stands for a line longer than ``max_length``.
+
+    The rest of a too long line is dropped as it arrives, so at most
+    ``max_length`` plus one chunk is buffered however the body is shaped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    # Dropping the remainder of a too long line until its newline
+    skipping = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if skipping or len(line) > max_length:
+                skipping = False
+                yield None
+            else:
+                yield line.rstrip("\r")
+        if len(pending) > max_length:
+            skipping, pending = True, ""
+    pending += decoder.decode(b"", final=True)
+    if skipping or len(pending) > max_length:
+        yield None
+    elif pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[Optional[str]], max_length: int = MAX_RECORD_LENGTH
+                           ) -> AsyncIterator[ParsedRow]:
+    row_number = 0
+    async for line in lines:
+        if line is None:
+            row_number += 1
+            yield row_number, _too_long(max_length)
+            continue
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except (ValueError, RecursionError) as exc:
+            # RecursionError: nesting deeper than the parser's stack allows
+            yield row_number, f"Invalid JSON: {exc}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "Row must be a JSON object"
+
+
+async def iter_csv_rows(lines: AsyncIterator[Optional[str]], max_length: int = MAX_RECORD_LENGTH
+                        ) -> AsyncIterator[ParsedRow]:
+    header: Optional[List[str]] = None
+    row_number = 0
+    record = ""
+    # Quote parity of a too long record whose remaining lines are being skipped
+    skipped_quotes = 0
+    async for line in lines:
+        if skipped_quotes % 2:
+            skipped_quotes += line.count('"') if line is not None else 0
+            continue
+        if line is None or len(record) + len(line) > max_length:
+            # Skip up to the end of the record; a dropped line is assumed to hold balanced quotes
+            skipped_quotes = record.count('"') + (line.count('"') if line is not None else 0)
+            record = ""
+            row_number += 1
+            yield row_number, _too_long(max_length)
+            continue
+        # A quoted field may span several lines; a record is complete once
+        # its quotes are balanced
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        try:
+            values = next(csv.reader([record]), [])
+        except csv.Error as exc:
+            # e.g. a newline inside an unquoted field: a"b<newline>c"d
+            record = ""
+            row_number += 1
+            yield row_number, f"Invalid CSV: {exc}"
+            continue
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values))
+    if record:
+        yield row_number + 1, "Unterminated quoted field"
+
+
+def validate_row(row: Dict[str, Any]) -> Union[ScammerCreate, str]:
+    try:
+        scammer_data = ScammerCreate(**row)
+    except ValidationError as exc:
+        return "; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+        )
+    if not is_valid_discord_id(scammer_data.discord_id):
+        return INVALID_DISCORD_ID_MESSAGE
+    return scammer_data
+
+
+class _ReportBuilder:
+    def __init__(self):
+        self.report = ImportReport()
+
+    def inserted(self, row_number: int) -> None:
+        self.report.inserted += 1
+        ranges = self.report.inserted_rows
+        if ranges and ranges[-1][1] == row_number - 1:
+            ranges[-1][1] = row_number
+        else:
+            ranges.append([row_number, row_number])
+
+    def rejected(self, row_number: int, row_status: ImportRowStatus, detail: str, discord_id: Optional[str] = None) -> None:
+        if row_status == ImportRowStatus.DUPLICATE:
+            self.report.duplicates += 1
+        else:
+            self.report.invalid += 1
+        if len(self.report.rows) < MAX_REPORTED_ROWS:
+            self.report.rows.append(ImportRowResult(
+                row=row_number, status=row_status, discord_id=discord_id, detail=detail
+            ))
+        else:
+            self.report.truncated = True
+
+
+async def _write_batch(
+    database: AsyncIOMotorDatabase,
+    batch: List[Tuple[int, Dict[str, Any]]],
+    builder: _ReportBuilder,
+    on_inserted: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+) -> None:
+    failed: Dict[int, Dict[str, Any]] = {}
+    try:
+        await database.scammers.insert_many([document for _, document in batch], ordered=False)
+    except BulkWriteError as exc:
+        failed = {error["index"]: error for error in exc.details.get("writeErrors", [])}
+
+    inserted = []
+    for index, (row_number, document) in enumerate(batch):
+        error = failed.get(index)
+        if error is None:
+            builder.inserted(row_number)
+            inserted.append(document)
+        elif error.get("code") == DUPLICATE_KEY_ERROR:
+            builder.rejected(row_number, ImportRowStatus.DUPLICATE, DUPLICATE_DISCORD_ID_MESSAGE, document["discord_id"])
+        else:
+            builder.rejected(row_number, ImportRowStatus.INVALID, error.get("errmsg", "Write failed"), document["discord_id"])
+    if inserted:
+        await on_inserted(inserted)
+
+
+async def import_scammers(
+    database: AsyncIOMotorDatabase,
+    chunks: AsyncIterator[bytes],
+    record_format: RecordFormat,
+    on_inserted: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    parse = iter_csv_rows if record_format == RecordFormat.CSV else iter_ndjson_rows
+    builder = _ReportBuilder()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    async for row_number, row in parse(iter_lines(chunks)):
+        builder.report.total_rows = row_number
+        scammer_data = validate_row(row) if isinstance(row, dict) else row
+        if isinstance(scammer_data, str):
+            discord_id = row.get("discord_id") if isinstance(row, dict) else None
+            builder.rejected(row_number, ImportRowStatus.INVALID, scammer_data, discord_id and str(discord_id))
+            continue
+
+        batch.append((row_number, with_search_fields(Scammer(**scammer_data.dict()).dict())))
+        if len(batch) >= batch_size:
+            await _write_batch(database, batch, builder, on_inserted)
+            batch = []
+
+    if batch:
+        await _write_batch(database, batch, builder, on_inserted)
+    return builder.report
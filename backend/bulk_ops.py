@@ -0,0 +1,187 @@
+"""Bulk status changes, partial updates and deletes.
+
+A selection (explicit ids or a filter) is resolved with one query, then all
+writes go out in a single unordered ``bulk_write``. Each write repeats the
+selection filter and the ``updated_at`` read while resolving, so it only
+applies to the exact document that was read: the documents from the
+selection are the "before" side of the change hooks.
+
+A record changed or removed concurrently makes its write miss. When the
+counts of the ``bulk_write`` show that (or the call fails), the selected
+records are read again to tell which writes landed; everything that did is
+published, and only then is an error raised.
+"""
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from export import export_filter
+from models import BulkItemResult, BulkOutcome, BulkResult, BulkSelection, MAX_BULK_IDS
+from pagination import SORT
+from search import search_fields
+
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+OnChanged = Callable[[List[Change]], Awaitable[None]]
+Document = Dict[str, Any]
+
+
+def selection_filter(selection: BulkSelection) -> Dict[str, Any]:
+    if selection.ids is not None:
+        return {"id": {"$in": selection.ids}}
+    query = export_filter(selection.filter.status, selection.filter.created_from, selection.filter.created_to)
+    if selection.filter.scam_method is not None:
+        query["scam_method"] = selection.filter.scam_method
+    return query
+
+
+async def resolve_selection(
+    database: AsyncIOMotorDatabase,
+    selection: BulkSelection,
+) -> Tuple[List[Document], List[str], bool]:
+    """Return the selected documents, requested ids that do not exist and whether more match."""
+    documents = await database.scammers.find(
+        selection_filter(selection), {"_id": 0}
+    ).sort(SORT).limit(MAX_BULK_IDS + 1).to_list(MAX_BULK_IDS + 1)
+    has_more = len(documents) > MAX_BULK_IDS
+    documents = documents[:MAX_BULK_IDS]
+
+    missing: List[str] = []
+    if selection.ids is not None:
+        found = {document["id"] for document in documents}
+        missing = [scammer_id for scammer_id in dict.fromkeys(selection.ids) if scammer_id not in found]
+    return documents, missing, has_more
+
+
+def _unchanged(query: Dict[str, Any], document: Document) -> Dict[str, Any]:
+    # Every write sets updated_at, so an equal value means nobody wrote the record since it was read
+    return {**query, "id": document["id"], "updated_at": document.get("updated_at")}
+
+
+async def _write(
+    database: AsyncIOMotorDatabase,
+    requests: List[Any],
+) -> Tuple[Optional[int], Set[int], Optional[PyMongoError]]:
+    """Run one unordered ``bulk_write``.
+
+    Returns how many requests matched (``None`` when unknown), the positions
+    that failed with a write error and an error whose outcome is unknown.
+    """
+    try:
+        result = await database.scammers.bulk_write(requests, ordered=False)
+    except BulkWriteError as exc:
+        details = exc.details
+        failed = {error["index"] for error in details.get("writeErrors", [])}
+        return details.get("nMatched", 0) + details.get("nRemoved", 0), failed, None
+    except PyMongoError as exc:
+        return None, set(), exc
+    return result.matched_count + result.deleted_count, set(), None
+
+
+async def _stored(database: AsyncIOMotorDatabase, documents: List[Document]) -> Dict[str, Document]:
+    ids = [document["id"] for document in documents]
+    stored = await database.scammers.find(
+        {"id": {"$in": ids}}, {"_id": 0, "id": 1, "updated_at": 1}
+    ).to_list(None)
+    return {document["id"]: document for document in stored}
+
+
+def _results(
+    documents: List[Document],
+    applied: List[Document],
+    failed: Set[int],
+    outcome: BulkOutcome,
+    missing: List[str],
+) -> List[BulkItemResult]:
+    applied_ids = {document["id"] for document in applied}
+    results = []
+    for position, document in enumerate(documents):
+        if position in failed:
+            item_outcome = BulkOutcome.FAILED
+        elif document["id"] in applied_ids:
+            item_outcome = outcome
+        else:
+            # Changed or removed after the selection was read
+            item_outcome = BulkOutcome.NOT_FOUND
+        results.append(BulkItemResult(id=document["id"], outcome=item_outcome))
+    return results + [BulkItemResult(id=scammer_id, outcome=BulkOutcome.NOT_FOUND) for scammer_id in missing]
+
+
+async def bulk_update(
+    database: AsyncIOMotorDatabase,
+    selection: BulkSelection,
+    update_data: Dict[str, Any],
+    on_changed: OnChanged,
+) -> BulkResult:
+    documents, missing, has_more = await resolve_selection(database, selection)
+    if not documents or not update_data:
+        return BulkResult(matched=len(documents), modified=0, deleted=0,
+                          results=_results([], [], set(), BulkOutcome.UPDATED, missing), has_more=has_more)
+
+    now = datetime.utcnow()
+    # One timestamp for the whole call, truncated to the stored precision
+    update_data = {**update_data, "updated_at": now.replace(microsecond=now.microsecond // 1000 * 1000)}
+    if update_data.get("discord_name") is not None:
+        update_data.update(search_fields(update_data["discord_name"]))
+
+    query = selection_filter(selection)
+    matched, failed, error = await _write(database, [
+        UpdateOne(_unchanged(query, document), {"$set": update_data}) for document in documents
+    ])
+    pending = [document for position, document in enumerate(documents) if position not in failed]
+    applied = pending
+    if matched != len(pending):
+        stored = await _stored(database, pending)
+        applied = [
+            document for document in pending
+            if stored.get(document["id"], {}).get("updated_at") == update_data["updated_at"]
+        ]
+
+    if applied:
+        await on_changed([(document, {**document, **update_data}) for document in applied])
+    if error is not None:
+        raise error
+    # updated_at is always set, so every matched record is modified
+    return BulkResult(
+        matched=len(applied),
+        modified=len(applied),
+        deleted=0,
+        results=_results(documents, applied, failed, BulkOutcome.UPDATED, missing),
+        has_more=has_more,
+    )
+
+
+async def bulk_delete(
+    database: AsyncIOMotorDatabase,
+    selection: BulkSelection,
+    on_changed: OnChanged,
+) -> BulkResult:
+    documents, missing, has_more = await resolve_selection(database, selection)
+    if not documents:
+        return BulkResult(matched=0, modified=0, deleted=0,
+                          results=_results([], [], set(), BulkOutcome.DELETED, missing), has_more=has_more)
+
+    query = selection_filter(selection)
+    deleted, failed, error = await _write(database, [
+        DeleteOne(_unchanged(query, document)) for document in documents
+    ])
+    pending = [document for position, document in enumerate(documents) if position not in failed]
+    applied = pending
+    if deleted != len(pending):
+        # A record deleted concurrently by another call is gone too; both calls report it then
+        stored = await _stored(database, pending)
+        applied = [document for document in pending if document["id"] not in stored]
+
+    if applied:
+        await on_changed([(document, None) for document in applied])
+    if error is not None:
+        raise error
+    return BulkResult(
+        matched=len(applied),
+        modified=0,
+        deleted=len(applied),
+        results=_results(documents, applied, failed, BulkOutcome.DELETED, missing),
+        has_more=has_more,
+    )
@@ -0,0 +1,161 @@
+"""Ordered change log of the scammers collection for client-side mirrors.
+
+Every write appends one entry per record to ``scammer_changes``, numbered
+with the data version the write was assigned, so entries share one global
+sequence across workers. Deletes leave tombstones. Clients page through the
+log with an opaque cursor and apply entries in order; a TTL index bounds its
+size, and a cursor older than the retained log gets 410 so the client knows to
+resync from a full export.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import os
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from models import ChangeEntry, ChangeFeedPage, ChangeOperation
+from serialization import SCAMMER_RESPONSE_FIELDS
+
+CHANGES_COLLECTION = "scammer_changes"
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get("CHANGE_LOG_RETENTION_DAYS", "30"))
+DEFAULT_CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+# A sequence number assigned but not yet logged is waited for this long
+# before it is treated as lost (e.g. the writing worker crashed)
+GAP_TIMEOUT_SECONDS = 10
+DUPLICATE_KEY_ERROR = 11000
+
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class CursorExpired(Exception):
+    pass
+
+
+class InvalidChangeCursor(ValueError):
+    pass
+
+
+def encode_change_cursor(epoch: str, seq: int) -> str:
+    return base64.urlsafe_b64encode(f"{epoch}:{seq}".encode()).decode().rstrip("=")
+
+
+def decode_change_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        epoch, seq = base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()).decode().split(":")
+        return epoch, int(seq)
+    except ValueError as exc:
+        raise InvalidChangeCursor("Invalid cursor") from exc
+
+
+def _operation(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> ChangeOperation:
+    if before is None:
+        return ChangeOperation.INSERT
+    if after is None:
+        return ChangeOperation.DELETE
+    return ChangeOperation.UPDATE
+
+
+def _record(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if document is None:
+        return None
+    return {name: document.get(name) for name in SCAMMER_RESPONSE_FIELDS}
+
+
+def change_entries(changes: List[Change], last_seq: int) -> List[Dict[str, Any]]:
+    """Build the log entries of ``changes``, which own the sequence numbers ending at ``last_seq``."""
+    now = datetime.utcnow()
+    first_seq = last_seq - len(changes) + 1
+    entries = []
+    for offset, (before, after) in enumerate(changes):
+        document = after if after is not None else before
+        entries.append({
+            "seq": first_seq + offset,
+            "op": _operation(before, after).value,
+            "id": document["id"],
+            "discord_id": document.get("discord_id"),
+            "at": now,
+            "record": _record(after),
+            # What the record counted as before, so consumers can derive statistics
+            # and membership deltas
+            "previous": None if before is None else {
+                "status": before.get("status"), "scam_method": before.get("scam_method"),
+                "discord_id": before.get("discord_id"),
+            },
+        })
+    return entries
+
+
+async def record_changes(database: AsyncIOMotorDatabase, changes: List[Change], last_seq: int) -> List[Dict[str, Any]]:
+    """Log ``changes``; safe to retry, entries already logged under their seq are kept."""
+    entries = change_entries(changes, last_seq)
+    if entries:
+        try:
+            # insert_many adds _id to the dicts; keep the returned entries clean
+            await database[CHANGES_COLLECTION].insert_many([dict(entry) for entry in entries], ordered=False)
+        except BulkWriteError as exc:
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in exc.details.get("writeErrors", [])):
+                raise
+    return entries
+
+
+async def read_change_log(
+    database: AsyncIOMotorDatabase,
+    head: int,
+    since: int,
+    limit: int = DEFAULT_CHANGES_PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Return up to ``limit`` raw entries after sequence ``since`` and whether more follow."""
+    collection = database[CHANGES_COLLECTION]
+    entries = await collection.find(
+        {"seq": {"$gt": since}}, {"_id": 0}
+    ).sort("seq", ASCENDING).limit(limit + 1).to_list(limit + 1)
+
+    if since < head and (not entries or entries[0]["seq"] != since + 1):
+        oldest = await collection.find_one({}, {"_id": 0, "seq": 1}, sort=[("seq", ASCENDING)])
+        if oldest is None or oldest["seq"] > since + 1:
+            raise CursorExpired("Cursor is older than the retained change log; resync required")
+
+    # Stop at a gap in the sequence: another worker may still be logging it
+    gap_deadline = datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT_SECONDS)
+    page: List[Dict[str, Any]] = []
+    expected = since + 1
+    for entry in entries[:limit]:
+        if entry["seq"] != expected and entry["at"] > gap_deadline:
+            break
+        page.append(entry)
+        expected = entry["seq"] + 1
+
+    last_seq = page[-1]["seq"] if page else since
+    return page, len(page) < len(entries) or last_seq < head
+
+
+async def read_changes(
+    database: AsyncIOMotorDatabase,
+    epoch: str,
+    head: int,
+    cursor: Optional[str],
+    limit: int = DEFAULT_CHANGES_PAGE_SIZE,
+) -> ChangeFeedPage:
+    """Return the changes after ``cursor`` in sequence order.
+
+    Without a cursor the page is empty and carries a cursor at the current
+    head: take it before a full export, then follow it to stay in sync.
+    """
+    if not cursor:
+        return ChangeFeedPage(changes=[], next_cursor=encode_change_cursor(epoch, head), has_more=False)
+
+    cursor_epoch, since = decode_change_cursor(cursor)
+    if cursor_epoch != epoch:
+        raise CursorExpired("Change log was reset; resync required")
+
+    page, has_more = await read_change_log(database, head, since, limit)
+    last_seq = page[-1]["seq"] if page else since
+    return ChangeFeedPage(
+        changes=[ChangeEntry(**entry) for entry in page],
+        next_cursor=encode_change_cursor(epoch, last_seq),
+        has_more=has_more,
+    )
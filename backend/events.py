@@ -0,0 +1,212 @@
+"""Server-Sent Events push of scammer changes.
+
+Subscribers first get a ``ready`` event naming the event source, then one
+``change`` event per inserted, updated or deleted record and a ``statistics``
+event with the resulting delta of every ``Statistics`` field. Event ids are change feed cursors, so a reconnecting client
+(``Last-Event-ID``) is first replayed what it missed from the change log.
+
+The endpoint is public, so besides the overall cap every client address
+may only hold a few subscriptions; one client cannot use up the cap and
+lock everyone else (admins included) out of live updates.
+
+Each subscriber has a bounded queue. A publish is serialized once and shared
+by all subscribers; a subscriber whose queue is full is disconnected with an
+``overflow`` event instead of slowing down the writers or growing without
+bound. It reconnects and catches up from the change log.
+
+With ``EVENT_SOURCE=change_stream`` events come from a MongoDB change stream
+on the change log instead of the local write handlers, so every worker sees
+the writes of all workers (requires a replica set). With the default local
+source a subscriber only hears about writes handled by its own worker, which
+is why clients are told the source and keep refetching otherwise.
+"""
+from collections import Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from change_feed import (
+    CHANGES_COLLECTION, MAX_CHANGES_PAGE_SIZE, CursorExpired, InvalidChangeCursor,
+    decode_change_cursor, encode_change_cursor, read_change_log
+)
+from serialization import dumps
+from stats_cache import statistics_delta
+
+logger = logging.getLogger(__name__)
+
+LOCAL_SOURCE = "local"
+CHANGE_STREAM_SOURCE = "change_stream"
+EVENT_SOURCE = os.environ.get("EVENT_SOURCE", LOCAL_SOURCE)
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "256"))
+EVENT_MAX_SUBSCRIBERS = int(os.environ.get("EVENT_MAX_SUBSCRIBERS", "1000"))
+EVENT_MAX_SUBSCRIBERS_PER_CLIENT = int(os.environ.get("EVENT_MAX_SUBSCRIBERS_PER_CLIENT", "8"))
+EVENT_KEEPALIVE_SECONDS = float(os.environ.get("EVENT_KEEPALIVE_SECONDS", "15"))
+EVENT_RETRY_MILLISECONDS = 3000
+
+# A published batch: first and last sequence number, the encoded events, the entries and the epoch
+Batch = Tuple[int, int, bytes, List[Dict[str, Any]], str]
+
+CHANGE_FIELDS = ("seq", "op", "id", "discord_id", "at", "record")
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class TooManyClientSubscribers(TooManySubscribers):
+    pass
+
+
+def format_event(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    head = f"id: {event_id}\nevent: {event}\n" if event_id else f"event: {event}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+def encode_batch(entries: List[Dict[str, Any]], epoch: str) -> bytes:
+    events = [
+        format_event("change", {name: entry.get(name) for name in CHANGE_FIELDS}, encode_change_cursor(epoch, entry["seq"]))
+        for entry in entries
+    ]
+    events.append(format_event("statistics", statistics_delta(
+        (entry.get("previous"), entry.get("record")) for entry in entries
+    )))
+    return b"".join(events)
+
+
+class Subscriber:
+    def __init__(self, queue_size: int, client: str = "", after_seq: int = 0):
+        self.queue: "asyncio.Queue[Optional[Batch]]" = asyncio.Queue(queue_size)
+        self.client = client
+        # Highest sequence number already delivered by the replay
+        self.after_seq = after_seq
+        self.overflowed = False
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, max_subscribers: int = EVENT_MAX_SUBSCRIBERS,
+                 max_per_client: int = EVENT_MAX_SUBSCRIBERS_PER_CLIENT):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.max_per_client = max_per_client
+        self.subscribers: Set[Subscriber] = set()
+        self.per_client: Counter = Counter()
+        self.published = 0
+        self.slow_disconnects = 0
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def subscribe(self, client: str = "") -> Subscriber:
+        if self.per_client[client] >= self.max_per_client:
+            raise TooManyClientSubscribers()
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscriber = Subscriber(self.queue_size, client)
+        self.subscribers.add(subscriber)
+        self.per_client[client] += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber not in self.subscribers:
+            return
+        self.subscribers.discard(subscriber)
+        self.per_client[subscriber.client] -= 1
+        if not self.per_client[subscriber.client]:
+            del self.per_client[subscriber.client]
+
+    def publish(self, entries: List[Dict[str, Any]], epoch: str) -> None:
+        """Fan out change log entries to every subscriber without waiting."""
+        if not entries or not self.subscribers:
+            return
+        batch = (entries[0]["seq"], entries[-1]["seq"], encode_batch(entries, epoch), entries, epoch)
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self._disconnect_slow(subscriber)
+
+    def _disconnect_slow(self, subscriber: Subscriber) -> None:
+        subscriber.overflowed = True
+        self.slow_disconnects += 1
+        # Drop what it has not read; the client catches up from the change log
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+
+async def replay(
+    database: AsyncIOMotorDatabase,
+    epoch: str,
+    head: int,
+    last_event_id: str,
+) -> Tuple[bytes, int, bool]:
+    """Encode the changes a reconnecting client missed.
+
+    Returns the events, the last sequence number replayed and whether the
+    client has to resync instead because the gap cannot be replayed.
+    """
+    try:
+        cursor_epoch, since = decode_change_cursor(last_event_id)
+        if cursor_epoch != epoch:
+            raise CursorExpired("Change log was reset")
+        entries, has_more = await read_change_log(database, head, since, MAX_CHANGES_PAGE_SIZE)
+    except (CursorExpired, InvalidChangeCursor):
+        return b"", 0, True
+    if has_more:
+        # Too far behind for one page: a full reload is cheaper than a long replay
+        return b"", 0, True
+    if not entries:
+        return b"", since, False
+    return encode_batch(entries, epoch), entries[-1]["seq"], False
+
+
+async def event_stream(broker: EventBroker, subscriber: Subscriber, backlog: bytes) -> AsyncIterator[bytes]:
+    try:
+        yield (
+            f"retry: {EVENT_RETRY_MILLISECONDS}\n\n".encode()
+            + format_event("ready", {"source": EVENT_SOURCE})
+            + backlog
+        )
+        while True:
+            try:
+                batch = await asyncio.wait_for(subscriber.queue.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if batch is None:
+                yield format_event("overflow", {})
+                return
+            first_seq, last_seq, message, entries, epoch = batch
+            if last_seq <= subscriber.after_seq:
+                continue  # already replayed
+            if first_seq <= subscriber.after_seq:
+                message = encode_batch([entry for entry in entries if entry["seq"] > subscriber.after_seq], epoch)
+            yield message
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+async def watch_change_log(database: AsyncIOMotorDatabase, broker: EventBroker, epoch: Callable[[], str]) -> None:
+    """Publish change log inserts from all workers via a change stream."""
+    resume_token = None
+    while True:
+        try:
+            async with database[CHANGES_COLLECTION].watch(
+                [{"$match": {"operationType": "insert"}}], resume_after=resume_token
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    entry = change["fullDocument"]
+                    entry.pop("_id", None)
+                    broker.publish([entry], epoch())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Change stream failed; reconnecting")
+            await asyncio.sleep(1)
@@ -0,0 +1,107 @@
+"""Streaming export of scammer records as NDJSON or CSV.
+
+Rows are encoded straight from the Motor cursor one batch at a time and
+handed to a ``StreamingResponse``, so memory use does not depend on the
+number of exported records and the first bytes leave as soon as the first
+batch arrives.
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Optional
+import csv
+import io
+import json
+
+from motor.motor_asyncio import AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+from models import RecordFormat, ScammerStatus
+
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+
+MEDIA_TYPES = {
+    RecordFormat.NDJSON: "application/x-ndjson",
+    RecordFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def export_filter(
+    scammer_status: Optional[ScammerStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if scammer_status is not None:
+        query["status"] = scammer_status.value
+    if created_from is not None or created_to is not None:
+        query["created_at"] = {}
+        if created_from is not None:
+            query["created_at"]["$gte"] = created_from
+        if created_to is not None:
+            query["created_at"]["$lt"] = created_to
+    return query
+
+
+def open_export_cursor(
+    database: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    fields: List[str],
+    batch_size: int,
+) -> AsyncIOMotorCursor:
+    projection = {"_id": 0, **{name: 1 for name in fields}}
+    return database.scammers.find(query, projection, batch_size=batch_size).sort(
+        [("created_at", ASCENDING), ("id", ASCENDING)]
+    )
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+async def _batches(cursor: AsyncIOMotorCursor, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_ndjson(cursor: AsyncIOMotorCursor, fields: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    async for batch in _batches(cursor, batch_size):
+        yield "".join(
+            json.dumps({name: _plain(document.get(name)) for name in fields}, ensure_ascii=False) + "\n"
+            for document in batch
+        ).encode()
+
+
+async def iter_csv(cursor: AsyncIOMotorCursor, fields: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+
+    async for batch in _batches(cursor, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(document.get(name)) for name in fields] for document in batch)
+        yield buffer.getvalue().encode()
+
+
+def stream_export(
+    database: AsyncIOMotorDatabase,
+    record_format: RecordFormat,
+    query: Dict[str, Any],
+    fields: List[str],
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    cursor = open_export_cursor(database, query, fields, batch_size)
+    encode = iter_csv if record_format == RecordFormat.CSV else iter_ndjson
+    return encode(cursor, fields, batch_size)
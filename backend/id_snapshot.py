@@ -0,0 +1,161 @@
+"""Binary snapshot of flagged Discord IDs for offline lookups.
+
+Layout, all little-endian:
+
+    header   40 bytes   magic "SCID", format version (u16), flags (u16),
+                        entry count (u64), data version (u64),
+                        created at (u64, unix seconds), epoch (8 bytes)
+    ids      8 * count  sorted uint64 Discord IDs
+    statuses ceil(count / 8) bytes, only with FLAG_STATUS_BITMAP: bit i
+                        (LSB first) is set when entry i is active; without
+                        the bitmap every entry is active
+    checksum 4 bytes    CRC-32 of everything before it
+
+The module only depends on the standard library, so consumers can copy it
+and check IDs against a downloaded file: ``IDSnapshot`` memory-maps the file
+and binary searches the ID array in place, so opening it is O(1) and a
+lookup is a few microseconds even for millions of entries.
+
+    python id_snapshot.py flagged.bin 123456789012345678
+"""
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional, Union
+import mmap
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b"SCID"
+FORMAT_VERSION = 1
+FLAG_STATUS_BITMAP = 0x1
+HEADER = struct.Struct("<4sHHQQQ8s")
+CHECKSUM = struct.Struct("<I")
+MEDIA_TYPE = "application/octet-stream"
+
+
+class InvalidSnapshot(ValueError):
+    pass
+
+
+def encode_snapshot(
+    ids: array,
+    version: int = 0,
+    epoch: str = "",
+    active: Optional[Iterable[bool]] = None,
+) -> bytes:
+    """Serialize a sorted ``array('Q')`` of IDs, optionally with per-entry active flags."""
+    flags = 0 if active is None else FLAG_STATUS_BITMAP
+    epoch_bytes = bytes.fromhex(epoch[:16]).ljust(8, b"\0") if epoch else bytes(8)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(ids), version, int(time.time()), epoch_bytes)]
+
+    if sys.byteorder == "little":
+        parts.append(ids.tobytes())
+    else:  # pragma: no cover - big-endian hosts
+        swapped = array("Q", ids)
+        swapped.byteswap()
+        parts.append(swapped.tobytes())
+
+    if active is not None:
+        bitmap = bytearray((len(ids) + 7) // 8)
+        for position, is_active in enumerate(active):
+            if is_active:
+                bitmap[position >> 3] |= 1 << (position & 7)
+        parts.append(bytes(bitmap))
+
+    checksum = 0
+    for part in parts:
+        checksum = zlib.crc32(part, checksum)
+    parts.append(CHECKSUM.pack(checksum))
+    return b"".join(parts)
+
+
+class IDSnapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: str, verify: bool = True):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(verify)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _parse(self, verify: bool) -> None:
+        if len(self._mmap) < HEADER.size + CHECKSUM.size:
+            raise InvalidSnapshot("File is too short")
+        magic, format_version, self.flags, self.count, self.version, self.created_at, epoch = (
+            HEADER.unpack_from(self._mmap)
+        )
+        if magic != MAGIC:
+            raise InvalidSnapshot("Not an ID snapshot")
+        if format_version != FORMAT_VERSION:
+            raise InvalidSnapshot(f"Unsupported format version {format_version}")
+        self.epoch = epoch.hex()
+
+        ids_end = HEADER.size + 8 * self.count
+        bitmap_end = ids_end + ((self.count + 7) // 8 if self.flags & FLAG_STATUS_BITMAP else 0)
+        if len(self._mmap) != bitmap_end + CHECKSUM.size:
+            raise InvalidSnapshot("File size does not match the header")
+        if verify:
+            (expected,) = CHECKSUM.unpack_from(self._mmap, bitmap_end)
+            if zlib.crc32(memoryview(self._mmap)[:bitmap_end]) != expected:
+                raise InvalidSnapshot("Checksum mismatch")
+
+        if sys.byteorder == "little":
+            self._ids = memoryview(self._mmap)[HEADER.size:ids_end].cast("Q")
+        else:  # pragma: no cover - big-endian hosts: swap into memory once
+            self._ids = array("Q", self._mmap[HEADER.size:ids_end])
+            self._ids.byteswap()
+        self._bitmap = memoryview(self._mmap)[ids_end:bitmap_end] if self.flags & FLAG_STATUS_BITMAP else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _position(self, discord_id: int) -> Optional[int]:
+        position = bisect_left(self._ids, discord_id)
+        if position < self.count and self._ids[position] == discord_id:
+            return position
+        return None
+
+    def __contains__(self, discord_id: Union[int, str]) -> bool:
+        return self.is_flagged(discord_id)
+
+    def is_flagged(self, discord_id: Union[int, str]) -> bool:
+        """True if the ID is in the snapshot and active."""
+        # int() also parses other scripts' digits, which are never valid IDs
+        if isinstance(discord_id, str) and not discord_id.isascii():
+            return False
+        try:
+            position = self._position(int(discord_id))
+        except (TypeError, ValueError, OverflowError):
+            return False
+        if position is None:
+            return False
+        if self._bitmap is None:
+            return True
+        return bool(self._bitmap[position >> 3] & (1 << (position & 7)))
+
+    def close(self) -> None:
+        if isinstance(self._ids, memoryview):
+            self._ids.release()
+        if self._bitmap is not None:
+            self._bitmap.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "IDSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python id_snapshot.py SNAPSHOT DISCORD_ID [DISCORD_ID ...]")
+    with IDSnapshot(sys.argv[1]) as snapshot:
+        print(f"version {snapshot.version}, {len(snapshot)} entries")
+        for discord_id in sys.argv[2:]:
+            print(discord_id, "flagged" if snapshot.is_flagged(discord_id) else "not flagged")
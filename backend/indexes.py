@@ -0,0 +1,213 @@
+"""Declarative index definitions for the scammers and users collections.
+
+The API runs ``ensure_indexes`` from its startup hook. The same step can be run
+offline before a deploy::
+
+    python indexes.py --check              # report drift, exit 1 if any
+    python indexes.py                      # create missing indexes
+    python indexes.py --drop-conflicting   # also rebuild indexes whose options changed
+    python indexes.py --drop-extra         # also drop indexes no longer declared
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from change_feed import CHANGE_LOG_RETENTION_DAYS, CHANGES_COLLECTION
+from migrations import backfill_completed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    name: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    partial_filter: Optional[Dict[str, Any]] = None
+    # Declared only until this backfill of migrations.py is recorded as finished
+    until_backfill: Optional[str] = None
+
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"name": self.name, "unique": self.unique}
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return options
+
+    def matches_options(self, info: Dict[str, Any]) -> bool:
+        return (
+            bool(info.get("unique", False)) == self.unique
+            and info.get("expireAfterSeconds") == self.expire_after_seconds
+            and info.get("partialFilterExpression") == self.partial_filter
+        )
+
+
+INDEXES: List[IndexSpec] = [
+    # The numeric index is partial so it can be built before migrations.py has
+    # backfilled every record. Until then the unique index on the string
+    # discord_id keeps guarding records without discord_id_num; afterwards it
+    # is reported as extra and can be removed with --drop-extra.
+    IndexSpec(
+        "scammers", "discord_id_num_unique", (("discord_id_num", ASCENDING),), unique=True,
+        partial_filter={"discord_id_num": {"$exists": True}},
+    ),
+    IndexSpec("scammers", "discord_id_unique", (("discord_id", ASCENDING),), unique=True, until_backfill="discord_id_num"),
+    IndexSpec("scammers", "id_unique", (("id", ASCENDING),), unique=True),
+    IndexSpec("scammers", "created_at_id", (("created_at", DESCENDING), ("id", DESCENDING))),
+    IndexSpec("scammers", "status_created_at", (("status", ASCENDING), ("created_at", DESCENDING))),
+    IndexSpec("scammers", "discord_name_lower", (("discord_name_lower", ASCENDING),)),
+    IndexSpec("scammers", "search_grams", (("search_grams", ASCENDING),)),
+    IndexSpec("users", "username_unique", (("username", ASCENDING),), unique=True),
+    IndexSpec(CHANGES_COLLECTION, "seq_unique", (("seq", ASCENDING),), unique=True),
+    IndexSpec(
+        CHANGES_COLLECTION, "at_ttl", (("at", ASCENDING),),
+        expire_after_seconds=CHANGE_LOG_RETENTION_DAYS * 24 * 3600,
+    ),
+]
+
+
+@dataclass
+class IndexReport:
+    present: List[str] = field(default_factory=list)
+    created: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    conflicting: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def has_drift(self) -> bool:
+        return bool(self.missing or self.conflicting or self.errors)
+
+    def summary(self) -> str:
+        parts = []
+        for label in ("present", "created", "missing", "conflicting", "extra"):
+            names = getattr(self, label)
+            if names:
+                parts.append(f"{label}: {', '.join(names)}")
+        for name, error in self.errors.items():
+            parts.append(f"error {name}: {error}")
+        return "; ".join(parts) or "no indexes declared"
+
+
+def _qualified(collection: str, name: str) -> str:
+    return f"{collection}.{name}"
+
+
+async def ensure_indexes(
+    database: AsyncIOMotorDatabase,
+    specs: Optional[List[IndexSpec]] = None,
+    create: bool = True,
+    drop_conflicting: bool = False,
+    drop_extra: bool = False,
+) -> IndexReport:
+    """Compare the declared indexes with the database and create missing ones.
+
+    Existing indexes are matched by key pattern rather than by name, so an
+    index created by hand under another name is not duplicated. An index with
+    the right keys but different options is reported as conflicting and is only
+    rebuilt when ``drop_conflicting`` is set. Undeclared indexes are only
+    reported, or dropped when ``drop_extra`` is set.
+    """
+    specs = INDEXES if specs is None else specs
+    retired = set()
+    for backfill in {spec.until_backfill for spec in specs if spec.until_backfill}:
+        if await backfill_completed(database, backfill):
+            retired.add(backfill)
+    specs = [spec for spec in specs if spec.until_backfill not in retired]
+    report = IndexReport()
+
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection_name, collection_specs in by_collection.items():
+        collection = database[collection_name]
+        existing = await collection.index_information()
+        by_keys = {tuple(map(tuple, info["key"])): (name, info) for name, info in existing.items()}
+        declared_keys = set()
+
+        for spec in collection_specs:
+            qualified = _qualified(collection_name, spec.name)
+            declared_keys.add(spec.keys)
+            found = by_keys.get(spec.keys)
+
+            if found is not None and spec.matches_options(found[1]):
+                report.present.append(qualified)
+                continue
+
+            if found is not None:
+                report.conflicting.append(qualified)
+                if not (create and drop_conflicting):
+                    logger.warning(
+                        "Index %s differs from existing index %s; rerun with --drop-conflicting to rebuild",
+                        qualified, found[0],
+                    )
+                    continue
+                await collection.drop_index(found[0])
+            elif not create:
+                report.missing.append(qualified)
+                continue
+
+            try:
+                await collection.create_index(list(spec.keys), **spec.options())
+                report.created.append(qualified)
+            except OperationFailure as exc:
+                report.errors[qualified] = str(exc)
+                logger.error("Failed to create index %s: %s", qualified, exc)
+
+        for name, info in existing.items():
+            if name != "_id_" and tuple(map(tuple, info["key"])) not in declared_keys:
+                report.extra.append(_qualified(collection_name, name))
+                if create and drop_extra:
+                    await collection.drop_index(name)
+                    logger.info("Dropped undeclared index %s", _qualified(collection_name, name))
+
+    return report
+
+
+async def _run_cli(args: argparse.Namespace) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(args.mongo_url or os.environ['MONGO_URL'])
+    try:
+        database = client[args.db_name or os.environ['DB_NAME']]
+        report = await ensure_indexes(
+            database, create=not args.check,
+            drop_conflicting=args.drop_conflicting, drop_extra=args.drop_extra,
+        )
+    finally:
+        client.close()
+
+    print(report.summary())
+    return 1 if report.has_drift else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Create or verify MongoDB indexes for the scammer database")
+    parser.add_argument("--check", action="store_true", help="only report drift, do not create anything")
+    parser.add_argument("--drop-conflicting", action="store_true", help="rebuild indexes whose options changed")
+    parser.add_argument("--drop-extra", action="store_true", help="drop indexes that are no longer declared")
+    parser.add_argument("--mongo-url", help="defaults to MONGO_URL from the environment/.env")
+    parser.add_argument("--db-name", help="defaults to DB_NAME from the environment/.env")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
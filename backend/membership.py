@@ -0,0 +1,281 @@
+"""In-process membership index of active Discord IDs.
+
+Snowflakes fit in 64 bits, so the active IDs are kept as a sorted
+``array('Q')`` (8 bytes per entry) searched with ``bisect``, plus two small
+delta sets for writes made since the last compaction. Answering "is this
+account flagged" never touches MongoDB; the write handlers keep the index
+current and a periodic reconcile rebuilds it from the collection so it cannot
+silently drift.
+
+Compaction merges the sorted deltas into a new array with slice copies, so it
+is linear in the array size and never rebuilds it through a ``set``. The
+sorted array is never modified in place, which lets the snapshot and reload
+work on it in a thread. Writes made by other workers reach the index through
+the change log (``catch_up``); ``synced_seq`` is the data version up to which
+the index is known to be complete.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from change_feed import MAX_CHANGES_PAGE_SIZE, CursorExpired, read_change_log
+from id_snapshot import encode_snapshot
+from models import ScammerStatus, parse_discord_id
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    numpy = None
+
+MEMBERSHIP_RECONCILE_SECONDS = float(os.environ.get("MEMBERSHIP_RECONCILE_SECONDS", "300"))
+# Merge the deltas into the sorted array once they grow past this size
+COMPACT_THRESHOLD = 4096
+LOAD_BATCH_SIZE = 10000
+
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def _active_id(document: Optional[Dict[str, Any]]) -> Optional[int]:
+    if document is None or document.get("status") != ScammerStatus.ACTIVE:
+        return None
+    return parse_discord_id(document.get("discord_id", ""))
+
+
+def _entry_change(entry: Dict[str, Any]) -> Change:
+    """Rebuild the (before, after) pair of a change log entry, as far as the index needs it."""
+    previous = entry.get("previous")
+    before = None if previous is None else {
+        "discord_id": previous.get("discord_id", entry.get("discord_id")), "status": previous.get("status"),
+    }
+    return before, entry.get("record")
+
+
+def merge_sorted(base: array, added: Iterable[int], removed: Iterable[int]) -> array:
+    """``base`` with ``added`` (not in it) inserted and ``removed`` (all in it) left out.
+
+    Positions come from bisecting the few deltas; everything between them is
+    copied slice by slice, so the cost is one pass of memory copies.
+    """
+    edits = sorted(
+        [(bisect_left(base, value), value, True) for value in added]
+        + [(bisect_left(base, value), value, False) for value in removed]
+    )
+    merged = array("Q", bytes(8 * (len(base) + sum(1 if is_added else -1 for _, _, is_added in edits))))
+    position = out = 0
+    for index, value, is_added in edits:
+        size = index - position
+        merged[out:out + size] = base[position:index]
+        out += size
+        if is_added:
+            merged[out] = value
+            out += 1
+            position = index
+        else:
+            position = index + 1
+    merged[out:] = base[position:]
+    return merged
+
+
+def _sorted_unique(ids: array) -> array:
+    if numpy is not None:
+        # numpy sorts without holding the GIL; numpy.unique is much slower on uint64
+        ordered = numpy.sort(numpy.frombuffer(ids, dtype=numpy.uint64))
+        if len(ordered):
+            ordered = ordered[numpy.concatenate(([True], ordered[1:] != ordered[:-1]))]
+        return array("Q", ordered.tobytes())
+    ordered = sorted(ids)
+    return array("Q", (value for position, value in enumerate(ordered) if not position or ordered[position - 1] != value))
+
+
+def _difference_sizes(old: array, new: array) -> Tuple[int, int]:
+    """How many entries of two sorted arrays are only in ``new`` and only in ``old``."""
+    if numpy is not None:
+        common = numpy.intersect1d(
+            numpy.frombuffer(old, dtype=numpy.uint64), numpy.frombuffer(new, dtype=numpy.uint64), assume_unique=True,
+        ).size
+        return len(new) - common, len(old) - common
+    i = j = common = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            common += 1
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            i += 1
+        else:
+            j += 1
+    return len(new) - common, len(old) - common
+
+
+def _rebuild(parts: Tuple[array, frozenset, frozenset], loaded: array) -> Tuple[array, int, int]:
+    fresh = _sorted_unique(loaded)
+    # Compared with the merged contents: writes still in the deltas are not drift
+    added, removed = _difference_sizes(merge_sorted(*parts), fresh)
+    return fresh, added, removed
+
+
+class MembershipIndex:
+    def __init__(self, compact_threshold: int = COMPACT_THRESHOLD):
+        self.compact_threshold = compact_threshold
+        self.loaded = False
+        # Data version (and its epoch) up to which the index has every write
+        self.synced_seq = 0
+        self.epoch = ""
+        self._base = array("Q")
+        self._added: set = set()
+        self._removed: set = set()
+        # Changes seen while a reload is in flight, replayed once it finishes
+        self._journal: Optional[List[Change]] = None
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._removed) + len(self._added)
+
+    def __contains__(self, discord_id: int) -> bool:
+        if discord_id in self._added:
+            return True
+        if discord_id in self._removed:
+            return False
+        return self._in_base(discord_id)
+
+    def is_flagged(self, discord_id: str) -> bool:
+        number = parse_discord_id(discord_id)
+        return number is not None and number in self
+
+    def _in_base(self, discord_id: int) -> bool:
+        position = bisect_left(self._base, discord_id)
+        return position < len(self._base) and self._base[position] == discord_id
+
+    def add(self, discord_id: int) -> None:
+        self._removed.discard(discord_id)
+        if not self._in_base(discord_id):
+            self._added.add(discord_id)
+
+    def discard(self, discord_id: int) -> None:
+        self._added.discard(discord_id)
+        if self._in_base(discord_id):
+            self._removed.add(discord_id)
+
+    def compact(self) -> None:
+        if not (self._added or self._removed):
+            return
+        self._base = merge_sorted(self._base, self._added, self._removed)
+        self._added, self._removed = set(), set()
+
+    def parts(self) -> Tuple[array, frozenset, frozenset]:
+        """The sorted array and copies of the deltas; merge them to get the current IDs."""
+        return self._base, frozenset(self._added), frozenset(self._removed)
+
+    def apply(self, changes: Iterable[Change]) -> None:
+        """Fold ``(before, after)`` document pairs into the index."""
+        changes = list(changes)
+        if self._journal is not None:
+            self._journal.extend(changes)
+        for before, after in changes:
+            before_id, after_id = _active_id(before), _active_id(after)
+            if before_id is not None and before_id != after_id:
+                self.discard(before_id)
+            if after_id is not None:
+                self.add(after_id)
+        if len(self._added) + len(self._removed) > self.compact_threshold:
+            self.compact()
+
+    def mark_synced(self, epoch: str, first_seq: int, last_seq: int) -> None:
+        """Record that local writes owning ``first_seq..last_seq`` were applied."""
+        if epoch == self.epoch and self.synced_seq >= first_seq - 1:
+            self.synced_seq = max(self.synced_seq, last_seq)
+
+    async def catch_up(self, database: AsyncIOMotorDatabase, epoch: str, head: int) -> int:
+        """Apply change log entries after ``synced_seq``, which includes other workers' writes.
+
+        Entries are replayed in order, own writes included; applying a change
+        twice is harmless. Raises ``CursorExpired`` when the log no longer
+        reaches back far enough, in which case the index has to be reloaded.
+        """
+        applied = 0
+        async with self._sync_lock:
+            if epoch != self.epoch or head < self.synced_seq:
+                raise CursorExpired("Data version was reset")
+            while self.synced_seq < head:
+                page, has_more = await read_change_log(database, head, self.synced_seq, MAX_CHANGES_PAGE_SIZE)
+                if not page:
+                    # A writer has not logged its entry yet; retry on the next call
+                    break
+                self.apply(_entry_change(entry) for entry in page)
+                self.synced_seq = page[-1]["seq"]
+                applied += len(page)
+                if not has_more:
+                    break
+        return applied
+
+    async def load(self, database: AsyncIOMotorDatabase, epoch: str = "", version: int = 0) -> Tuple[int, int]:
+        """Rebuild the index from the collection.
+
+        ``epoch`` and ``version`` are the data version read before calling; the collection
+        contains at least every write up to it. Returns how many IDs were
+        added and removed compared with the previous contents, which is the
+        drift when called as a reconcile.
+        """
+        async with self._sync_lock:
+            self._journal = []
+            try:
+                ids = array("Q")
+                cursor = database.scammers.find(
+                    {"status": ScammerStatus.ACTIVE.value},
+                    {"_id": 0, "discord_id": 1},
+                    batch_size=LOAD_BATCH_SIZE,
+                )
+                async for document in cursor:
+                    number = parse_discord_id(document.get("discord_id", ""))
+                    if number is not None:
+                        ids.append(number)
+
+                # Sorting and diffing millions of IDs stays off the event loop
+                fresh, added, removed = await asyncio.to_thread(_rebuild, self.parts(), ids)
+                self._base, self._added, self._removed = fresh, set(), set()
+                journal, self._journal = self._journal, None
+                self.apply(journal)
+            finally:
+                self._journal = None
+
+        if epoch != self.epoch:
+            self.epoch, self.synced_seq = epoch, version
+        else:
+            self.synced_seq = max(self.synced_seq, version)
+        self.loaded = True
+        return added, removed
+
+
+class MembershipSnapshot:
+    """The index encoded as an ``id_snapshot`` file for download.
+
+    Encoding the in-memory array is a merge plus a checksum, so the file is
+    rebuilt lazily on the first request after the index moves instead of
+    rescanning the collection. The merge runs in a thread on a copy of the
+    deltas, and the body is keyed by the version the index has caught up to.
+    """
+
+    def __init__(self, index: MembershipIndex):
+        self.index = index
+        self.key: Optional[Tuple[str, int]] = None
+        self.body = b""
+        self.rebuilds = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self, epoch: str, version: int) -> bytes:
+        if self.key != (epoch, version):
+            async with self._lock:
+                if self.key != (epoch, version):
+                    base, added, removed = self.index.parts()
+                    self.body = await asyncio.to_thread(_encode, base, added, removed, version, epoch)
+                    self.key = (epoch, version)
+                    self.rebuilds += 1
+        return self.body
+
+
+def _encode(base: array, added: frozenset, removed: frozenset, version: int, epoch: str) -> bytes:
+    return encode_snapshot(merge_sorted(base, added, removed), version, epoch)
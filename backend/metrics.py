@@ -0,0 +1,264 @@
+"""Prometheus metrics in the text exposition format, without dependencies.
+
+Request counts and latency histograms come from an ASGI middleware labelled
+by route template, MongoDB command timings from a pymongo ``CommandListener``
+labelled by collection and command. Values owned by other components (cache
+hits, bcrypt queue depth, ...) are read through callbacks at scrape time, so
+they cost nothing between scrapes.
+
+Recording is a dict lookup, a bisect over the bucket bounds and two
+increments, which keeps it cheap enough to stay on under full load.
+"""
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import threading
+import time
+
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Label of requests that did not match a route, so unknown paths cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+Samples = Dict[Labels, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Samples = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket (the last one is +Inf), then the sum
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                bucket = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Collected(Metric):
+    """A gauge or counter whose samples are read from a callback at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Any],
+        label_names: Sequence[str] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, label_names)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        samples = self.collect()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        lines = self.header()
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode()
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until an HTTP response body was fully sent.",
+    ("method", "route"),
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served.",
+))
+mongo_commands = registry.register(Counter(
+    "mongodb_commands_total", "MongoDB commands by collection, command and outcome.",
+    ("collection", "command", "outcome"),
+))
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trip time as seen by the driver.",
+    ("collection", "command"),
+))
+
+
+def cache_metrics(caches: Dict[str, Any]) -> None:
+    """Export hit and miss counters of objects with ``hits``/``misses`` attributes."""
+    registry.register(Collected(
+        "cache_hits_total", "Cache lookups answered from the cache.",
+        lambda: {(name,): cache.hits for name, cache in caches.items()}, ("cache",), kind="counter",
+    ))
+    registry.register(Collected(
+        "cache_misses_total", "Cache lookups that had to compute or fetch the value.",
+        lambda: {(name,): cache.misses for name, cache in caches.items()}, ("cache",), kind="counter",
+    ))
+    registry.register(Collected(
+        "cache_hit_ratio", "Share of lookups answered from the cache since start.",
+        lambda: {
+            (name,): cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0
+            for name, cache in caches.items()
+        },
+        ("cache",),
+    ))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests.inc((method, path, str(status_code)))
+            http_request_duration.observe((method, path), time.perf_counter() - started)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends; runs on the driver's threads."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, Any], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[(event.request_id, event.connection_id)] = target if isinstance(target, str) else ""
+
+    def _finished(self, event, outcome: str) -> None:
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        mongo_commands.inc((collection, event.command_name, outcome))
+        mongo_command_duration.observe((collection, event.command_name), event.duration_micros / 1e6)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event, "failure")
@@ -0,0 +1,191 @@
+"""Online data backfills for fields derived by the write paths.
+
+Backfills run in the background from the API startup hook and can be run
+offline with ``python migrations.py``. They work in small batches and only
+touch documents that still lack the derived fields, so they are safe to
+interrupt and rerun while the API is serving traffic.
+
+The outcome of each backfill is stored in the ``meta`` collection. A
+finished backfill is not rescanned on later startups, and the switches that
+depend on it (numeric Discord ID lookups) are applied from the stored state.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models import DISCORD_ID_LENGTH, discord_id_number
+from search import search_fields, use_numeric_discord_ids
+from versioning import META_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+MAX_REPORTED_DUPLICATES = 100
+
+
+class BackfillBlocked(Exception):
+    """The backfill went through every record but some could not be migrated."""
+
+
+def _state_id(name: str) -> str:
+    return f"backfill:{name}"
+
+
+async def backfill_completed(database: AsyncIOMotorDatabase, name: str) -> bool:
+    state = await database[META_COLLECTION].find_one({"_id": _state_id(name)})
+    return bool(state and state.get("completed"))
+
+
+async def record_backfill(database: AsyncIOMotorDatabase, name: str, completed: bool, error: Optional[str] = None) -> None:
+    await database[META_COLLECTION].update_one(
+        {"_id": _state_id(name)},
+        {"$set": {"completed": completed, "error": error, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def backfill_search_fields(database: AsyncIOMotorDatabase, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    updated = 0
+    while True:
+        batch = await database.scammers.find(
+            {"search_grams": {"$exists": False}},
+            {"_id": 1, "discord_name": 1},
+        ).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return updated
+
+        result = await database.scammers.bulk_write(
+            [
+                UpdateOne({"_id": doc["_id"]}, {"$set": search_fields(doc.get("discord_name", ""))})
+                for doc in batch
+            ],
+            ordered=False,
+        )
+        updated += result.modified_count
+        # Yield between batches so request handlers keep priority
+        await asyncio.sleep(0)
+
+
+async def backfill_discord_id_num(database: AsyncIOMotorDatabase, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Add the Int64 ``discord_id_num`` to records written before it existed.
+
+    Records whose ``discord_id`` is not a valid ID are left alone. Records
+    sharing a Discord ID with another one cannot get the field (its index is
+    unique); they are reported and the backfill stays unfinished, so lookups
+    keep using the string field until they are cleaned up.
+    """
+    updated = 0
+    duplicates: List[str] = []
+    last_id = None
+    while True:
+        query = {"discord_id_num": {"$exists": False}, "discord_id": {"$regex": f"^[0-9]{{{DISCORD_ID_LENGTH}}}$"}}
+        if last_id is not None:
+            # Walk by _id so records that fail are not picked up again
+            query["_id"] = {"$gt": last_id}
+        batch = await database.scammers.find(
+            query, {"_id": 1, "discord_id": 1},
+        ).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        try:
+            result = await database.scammers.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": doc["_id"], "discord_id": doc["discord_id"]},
+                        {"$set": {"discord_id_num": discord_id_number(doc["discord_id"])}},
+                    )
+                    for doc in batch
+                ],
+                ordered=False,
+            )
+            updated += result.modified_count
+        except BulkWriteError as exc:
+            updated += exc.details.get("nModified", 0)
+            for error in exc.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+                duplicates.append(batch[error["index"]]["discord_id"])
+        await asyncio.sleep(0)
+
+    if duplicates:
+        raise BackfillBlocked(
+            f"{len(duplicates)} records share a Discord ID with another record: "
+            + ", ".join(sorted(set(duplicates))[:MAX_REPORTED_DUPLICATES])
+        )
+    return updated
+
+
+BACKFILLS = {
+    "search_fields": backfill_search_fields,
+    "discord_id_num": backfill_discord_id_num,
+}
+
+# Applied in every worker once the backfill is recorded as finished
+ON_COMPLETED = {
+    "discord_id_num": use_numeric_discord_ids,
+}
+
+
+async def run_backfills(database: AsyncIOMotorDatabase, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    results = {}
+    for name, backfill in BACKFILLS.items():
+        if await backfill_completed(database, name):
+            results[name] = 0
+        else:
+            try:
+                results[name] = await backfill(database, batch_size)
+            except BackfillBlocked as exc:
+                logger.error("Backfill %s cannot finish: %s", name, exc)
+                await record_backfill(database, name, completed=False, error=str(exc))
+                continue
+            except Exception:
+                logger.exception("Backfill %s failed", name)
+                continue
+            await record_backfill(database, name, completed=True)
+            if results[name]:
+                logger.info("Backfill %s updated %d documents", name, results[name])
+        if name in ON_COMPLETED:
+            ON_COMPLETED[name]()
+    return results
+
+
+async def _run_cli(args: argparse.Namespace) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(args.mongo_url or os.environ['MONGO_URL'])
+    try:
+        results = await run_backfills(client[args.db_name or os.environ['DB_NAME']], args.batch_size)
+    finally:
+        client.close()
+
+    for name, count in results.items():
+        print(f"{name}: {count} documents updated")
+    return 0 if len(results) == len(BACKFILLS) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill derived fields on scammer records")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mongo-url", help="defaults to MONGO_URL from the environment/.env")
+    parser.add_argument("--db-name", help="defaults to DB_NAME from the environment/.env")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
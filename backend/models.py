@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from bson.int64 import Int64
+from pydantic import BaseModel, Field, computed_field, field_validator, model_validator
+from typing import Any, Optional, List, Dict, Union
 from datetime import datetime
 import uuid
 from enum import Enum
@@ -36,6 +37,25 @@ class UserResponse(BaseModel):
     is_active: bool
 
 # Scammer Models  
+DISCORD_ID_LENGTH = 18
+INVALID_DISCORD_ID_MESSAGE = "Discord ID должен состоять из 18 цифр"
+DUPLICATE_DISCORD_ID_MESSAGE = "Мошенник с таким Discord ID уже существует"
+
+def is_valid_discord_id(discord_id: str) -> bool:
+    # str.isdigit() alone also accepts superscripts and other scripts' digits
+    return len(discord_id) == DISCORD_ID_LENGTH and discord_id.isascii() and discord_id.isdigit()
+
+def parse_discord_id(discord_id: str) -> Optional[int]:
+    """Numeric form of a Discord ID, or ``None`` if it is not 18 ASCII digits."""
+    return int(discord_id) if is_valid_discord_id(discord_id) else None
+
+def discord_id_number(discord_id: str) -> Int64:
+    number = parse_discord_id(discord_id)
+    if number is None:
+        raise ValueError(INVALID_DISCORD_ID_MESSAGE)
+    # 18 digits always fit in a signed 64-bit integer
+    return Int64(number)
+
 class Scammer(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     discord_id: str
@@ -46,6 +66,20 @@ class Scammer(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    @field_validator("discord_id")
+    @classmethod
+    def check_discord_id(cls, discord_id: str) -> str:
+        if not is_valid_discord_id(discord_id):
+            raise ValueError(INVALID_DISCORD_ID_MESSAGE)
+        return discord_id
+
+    # Stored next to the string form, which the API keeps returning; the
+    # unique index and lookups use the numeric key
+    @computed_field
+    @property
+    def discord_id_num(self) -> int:
+        return discord_id_number(self.discord_id)
+
 class ScammerCreate(BaseModel):
     discord_id: str
     discord_name: str
@@ -69,6 +103,172 @@ class ScammerResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+# Compact view for list routes; the description is only served by detail routes
+class ScammerSummary(BaseModel):
+    id: str
+    discord_id: str
+    discord_name: str
+    scam_method: str
+    status: ScammerStatus
+    created_at: datetime
+    updated_at: datetime
+
+# List row for a custom ``fields`` selection: only the requested fields are present
+class ScammerFields(BaseModel):
+    id: Optional[str] = None
+    discord_id: Optional[str] = None
+    discord_name: Optional[str] = None
+    scam_method: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[ScammerStatus] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# Documented shape of list routes: the summary by default, every field with
+# fields=full, or the requested subset
+ScammerListItem = Union[ScammerSummary, ScammerResponse, ScammerFields]
+
+# Fuzzy name search result: trigram similarity (0-1) and edit distance to the query
+class SimilarScammer(ScammerSummary):
+    score: float
+    distance: int
+
+# Batch lookup Models
+MAX_LOOKUP_IDS = 5000
+
+class LookupRequest(BaseModel):
+    discord_ids: List[str] = Field(..., max_length=MAX_LOOKUP_IDS)
+    hits_only: bool = False
+
+class LookupResponse(BaseModel):
+    hits: List[str]
+    misses: List[str]
+    records: List[ScammerResponse] = []
+
+class CheckResult(BaseModel):
+    discord_id: str
+    flagged: bool
+
+# Bulk import/export Models
+class RecordFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class ImportRowStatus(str, Enum):
+    DUPLICATE = "duplicate"
+    INVALID = "invalid"
+
+class ImportRowResult(BaseModel):
+    row: int
+    status: ImportRowStatus
+    discord_id: Optional[str] = None
+    detail: str
+
+class ImportReport(BaseModel):
+    total_rows: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    inserted_rows: List[List[int]] = []  # [first, last] row ranges
+    rows: List[ImportRowResult] = []  # duplicate and invalid rows
+    truncated: bool = False
+
+# Bulk change Models
+MAX_BULK_IDS = 5000
+
+class BulkFilter(BaseModel):
+    status: Optional[ScammerStatus] = None
+    scam_method: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # An empty filter would select the whole collection
+        if all(getattr(self, name) is None for name in self.model_fields):
+            raise ValueError("Filter must set at least one field")
+        return self
+
+class BulkSelection(BaseModel):
+    # Either explicit ids or a filter; a filter selects at most MAX_BULK_IDS records per call
+    ids: Optional[List[str]] = Field(None, max_length=MAX_BULK_IDS)
+    filter: Optional[BulkFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide either ids or filter")
+        return self
+
+class BulkStatusRequest(BulkSelection):
+    status: ScammerStatus
+
+class BulkScammerUpdate(BaseModel):
+    # discord_id is unique per record, so it cannot be bulk-assigned
+    discord_name: Optional[str] = None
+    scam_method: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[ScammerStatus] = None
+
+class BulkUpdateRequest(BulkSelection):
+    update: BulkScammerUpdate
+
+class BulkDeleteRequest(BulkSelection):
+    pass
+
+class BulkOutcome(str, Enum):
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    FAILED = "failed"  # the write itself was rejected, e.g. by a unique index
+
+class BulkItemResult(BaseModel):
+    id: str
+    outcome: BulkOutcome
+
+class BulkResult(BaseModel):
+    matched: int
+    modified: int
+    deleted: int
+    results: List[BulkItemResult]
+    has_more: bool = False  # filter matched more than one call processes
+
+# Change feed Models
+class ChangeOperation(str, Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+class ChangeEntry(BaseModel):
+    seq: int
+    op: ChangeOperation
+    id: str
+    discord_id: Optional[str] = None
+    at: datetime
+    record: Optional[ScammerResponse] = None  # None for deletes (tombstones)
+
+class ChangeFeedPage(BaseModel):
+    changes: List[ChangeEntry]
+    next_cursor: str
+    has_more: bool
+
+# Diagnostics Models
+class SlowQueryStats(BaseModel):
+    collection: str
+    command: str
+    filter: Any = None  # shape only, values are redacted
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    routes: List[str] = []
+    # From the latest sampled explain, if any
+    plan: Optional[str] = None
+    collscan: Optional[bool] = None
+    docs_examined: Optional[int] = None
+    keys_examined: Optional[int] = None
+    docs_returned: Optional[int] = None
+    explained_at: Optional[float] = Field(None, exclude=True)
+
 # Auth Models
 class Token(BaseModel):
     access_token: str
@@ -81,4 +281,6 @@ class TokenData(BaseModel):
 class Statistics(BaseModel):
     total_records: int
     active_threats: int
-    verified: int
\ No newline at end of file
+    verified: int
+    by_status: Dict[str, int] = Field(default_factory=dict)
+    by_scam_method: Dict[str, int] = Field(default_factory=dict)
\ No newline at end of file
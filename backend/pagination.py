@@ -0,0 +1,63 @@
+"""Keyset (cursor) pagination for scammer lists.
+
+Lists are ordered newest first by ``(created_at, id)``; ``id`` breaks ties
+between records created in the same millisecond, so the order is total and
+stable while new records are inserted. A cursor is an opaque token encoding
+the sort key of the last row of the previous page, so every page is a
+single index range scan regardless of its depth.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+from pymongo import DESCENDING
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SORT: List[Tuple[str, int]] = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    payload = json.dumps([document["created_at"].isoformat(), document["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, scammer_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+    # Stored datetimes are naive UTC; an offset in a hand-made cursor is converted
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at, str(scammer_id)
+
+
+def after_cursor(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict ``query`` to the rows that sort after ``cursor``."""
+    if not cursor:
+        return query
+    created_at, scammer_id = decode_cursor(cursor)
+    keyset = {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": scammer_id}},
+        ]
+    }
+    return {"$and": [query, keyset]} if query else keyset
+
+
+def next_cursor(page: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    # A short page means the end of the list has been reached
+    if len(page) < limit or not page:
+        return None
+    return encode_cursor(page[-1])
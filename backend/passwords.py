@@ -0,0 +1,76 @@
+"""bcrypt hashing and verification off the event loop.
+
+bcrypt is deliberately slow (~100-300 ms per call) and releases the GIL, so
+calls run on a dedicated thread pool whose size caps how many hashes run at
+once. Requests beyond the cap wait in the pool's queue instead of blocking
+the uvicorn worker, and ``queue_depth`` exposes how many are waiting.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+import asyncio
+import os
+import threading
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 2)))
+
+# Hashes with a different cost factor are flagged for rehash on next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext = pwd_context, concurrency: int = PASSWORD_HASH_CONCURRENCY):
+        self.context = context
+        self.concurrency = max(1, concurrency)
+        self.queue_depth = 0
+        self.in_progress = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._counters_lock = threading.Lock()
+
+    def _run_tracked(self, fn: Callable[..., T], *args) -> T:
+        with self._counters_lock:
+            self.queue_depth -= 1
+            self.in_progress += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._counters_lock:
+                self.in_progress -= 1
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        with self._counters_lock:
+            self.queue_depth += 1
+        future = self._executor.submit(self._run_tracked, fn, *args)
+        future.add_done_callback(self._dequeue_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _dequeue_cancelled(self, future: Future) -> None:
+        # Cancelling the awaiting task cancels a job that has not started yet,
+        # so _run_tracked never takes it off the queue
+        if future.cancelled():
+            with self._counters_lock:
+                self.queue_depth -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.context.verify, password, password_hash)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a new hash if the stored one is outdated."""
+        return await self._run(self.context.verify_and_update, password, password_hash)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
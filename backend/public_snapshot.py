@@ -0,0 +1,101 @@
+"""Materialized, pre-compressed first page of ``/api/scammers/public``.
+
+The default public page is by far the most requested response. It is built
+once per data version - serialized JSON plus gzip and brotli variants - and
+served from memory. Writes schedule a debounced rebuild, so a burst of admin
+edits costs one rebuild, and until it lands requests fall back to the live
+query because a snapshot is only served for the data version it was built
+from.
+"""
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import gzip
+import logging
+import os
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is listed in requirements.txt
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.environ.get("SNAPSHOT_DEBOUNCE_SECONDS", "1"))
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Returns the data version the page was read at, its JSON body and next cursor
+SnapshotBuilder = Callable[[], Awaitable[Tuple[int, bytes, Optional[str]]]]
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _compress(body: bytes) -> Dict[Optional[str], bytes]:
+    variants: Dict[Optional[str], bytes] = {None: body, "gzip": gzip.compress(body, GZIP_LEVEL)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+class PublicSnapshot:
+    def __init__(self, build: SnapshotBuilder, debounce_seconds: float = SNAPSHOT_DEBOUNCE_SECONDS):
+        self.build = build
+        self.debounce_seconds = debounce_seconds
+        self.version: Optional[int] = None
+        self.next_cursor: Optional[str] = None
+        self.rebuilds = 0
+        self._variants: Dict[Optional[str], bytes] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._building = False
+        self._dirty = False
+
+    def current(self, version: int) -> bool:
+        return self.version == version and bool(self._variants)
+
+    def encoding(self, accept_encoding: str) -> Optional[str]:
+        """The best content coding for an Accept-Encoding header; None is identity."""
+        for coding in ("br", "gzip"):
+            if coding in self._variants and _accepts(accept_encoding, coding):
+                return coding
+        return None
+
+    def body(self, encoding: Optional[str]) -> bytes:
+        return self._variants[encoding]
+
+    def schedule_rebuild(self) -> None:
+        if self._building:
+            # The rebuild in flight may already have read stale rows
+            self._dirty = True
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._debounced_rebuild())
+
+    async def _debounced_rebuild(self) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        try:
+            await self.rebuild()
+        except Exception:
+            logger.exception("Public snapshot rebuild failed")
+        if self._dirty:
+            self._task = asyncio.create_task(self._debounced_rebuild())
+
+    async def rebuild(self) -> None:
+        self._building, self._dirty = True, False
+        try:
+            version, body, next_cursor = await self.build()
+            # Maximum compression is slow; keep it off the event loop
+            variants = await asyncio.to_thread(_compress, body)
+        finally:
+            self._building = False
+        self._variants, self.version, self.next_cursor = variants, version, next_cursor
+        self.rebuilds += 1
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,136 @@
+"""Index-backed search over scammer records.
+
+Every scammer document carries two derived fields maintained by the write
+paths:
+
+* ``discord_name_lower`` - the normalized (NFKC + casefold) display name, used
+  for anchored prefix matches on short queries;
+* ``search_grams`` - the distinct trigrams of that name, indexed as a multikey
+  index so substring queries only look at candidate documents.
+
+User input is always escaped, so a search can no longer submit a regex.
+
+Discord IDs are looked up through the numeric ``discord_id_num`` field once
+every record has it (``migrations.backfill_discord_id_num`` switches this on);
+all IDs have 18 digits, so an ID prefix is a numeric range.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import re
+import unicodedata
+
+from bson.int64 import Int64
+
+from models import DISCORD_ID_LENGTH, discord_id_number
+
+MAX_SEARCH_LENGTH = 64
+GRAM_SIZE = 3
+# How many candidates are pulled from Mongo to be ranked in relevance mode
+RELEVANCE_CANDIDATES = 500
+
+_numeric_discord_ids = False
+
+
+def use_numeric_discord_ids(enabled: bool = True) -> None:
+    global _numeric_discord_ids
+    _numeric_discord_ids = enabled
+
+
+def discord_ids_filter(discord_ids: List[str]) -> Dict[str, Any]:
+    """Match any of ``discord_ids``, which must be valid 18-digit IDs."""
+    if _numeric_discord_ids:
+        numbers = [discord_id_number(discord_id) for discord_id in discord_ids]
+        return {"discord_id_num": numbers[0] if len(numbers) == 1 else {"$in": numbers}}
+    return {"discord_id": discord_ids[0] if len(discord_ids) == 1 else {"$in": discord_ids}}
+
+
+def discord_id_prefix_filter(prefix: str) -> Dict[str, Any]:
+    if _numeric_discord_ids:
+        scale = 10 ** (DISCORD_ID_LENGTH - len(prefix))
+        low = int(prefix) * scale
+        return {"discord_id_num": {"$gte": Int64(low), "$lt": Int64(low + scale)}}
+    return {"discord_id": {"$regex": "^" + prefix}}
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold().strip()
+
+
+def grams(text: str, size: int = GRAM_SIZE) -> List[str]:
+    if len(text) < size:
+        return []
+    return sorted({text[i:i + size] for i in range(len(text) - size + 1)})
+
+
+def search_fields(discord_name: str) -> Dict[str, Any]:
+    normalized = normalize(discord_name)
+    return {"discord_name_lower": normalized, "search_grams": grams(normalized)}
+
+
+def with_search_fields(document: Dict[str, Any]) -> Dict[str, Any]:
+    document.update(search_fields(document["discord_name"]))
+    return document
+
+
+def prepare_query(search: Optional[str]) -> str:
+    if not search:
+        return ""
+    return normalize(search)[:MAX_SEARCH_LENGTH]
+
+
+def build_search_filter(search: Optional[str]) -> Dict[str, Any]:
+    """Translate a free-text search into an index-friendly Mongo filter.
+
+    Digits are matched against ``discord_id`` exactly (full snowflake) or by
+    anchored prefix. Names are matched by anchored prefix for short queries and
+    by trigram candidates plus an escaped substring check otherwise.
+    """
+    query = prepare_query(search)
+    if not query:
+        return {}
+
+    clauses = []
+    # isdigit() alone would let other scripts' digits reach int()
+    if query.isascii() and query.isdigit():
+        if len(query) == DISCORD_ID_LENGTH:
+            clauses.append(discord_ids_filter([query]))
+        elif len(query) < DISCORD_ID_LENGTH:
+            clauses.append(discord_id_prefix_filter(query))
+
+    query_grams = grams(query)
+    if query_grams:
+        clauses.append({
+            "search_grams": {"$all": query_grams},
+            "discord_name_lower": {"$regex": re.escape(query)},
+        })
+    else:
+        clauses.append({"discord_name_lower": {"$regex": "^" + re.escape(query)}})
+
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def relevance(document: Dict[str, Any], query: str) -> int:
+    discord_id = document.get("discord_id", "")
+    name = document.get("discord_name_lower") or normalize(document.get("discord_name", ""))
+
+    if discord_id == query:
+        return 100
+    if name == query:
+        return 80
+    if discord_id.startswith(query):
+        return 60
+    if name.startswith(query):
+        return 50
+    if any(token.startswith(query) for token in re.split(r"[\W_]+", name) if token):
+        return 40
+    if query in name:
+        return 20
+    return 0
+
+
+def rank(documents: Iterable[Dict[str, Any]], search: str) -> List[Dict[str, Any]]:
+    query = prepare_query(search)
+    return sorted(
+        documents,
+        key=lambda document: (relevance(document, query), document.get("created_at")),
+        reverse=True,
+    )
@@ -0,0 +1,82 @@
+"""Fast JSON path for hot read routes.
+
+List endpoints fetch exactly the response fields with a Mongo projection and
+encode the raw documents straight to JSON bytes. Returning a ``Response``
+makes FastAPI skip validating and re-serializing the rows against
+``response_model``, which stays declared on the route for the OpenAPI schema.
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+import json
+
+from fastapi import Response
+
+from models import ScammerResponse, ScammerSummary
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+SCAMMER_RESPONSE_FIELDS: List[str] = list(ScammerResponse.model_fields)
+SCAMMER_PROJECTION: Dict[str, int] = {"_id": 0, **{name: 1 for name in SCAMMER_RESPONSE_FIELDS}}
+
+# Named views accepted by the ``fields`` parameter of list routes
+SUMMARY_VIEW = "summary"
+FULL_VIEW = "full"
+SUMMARY_FIELDS: List[str] = list(ScammerSummary.model_fields)
+# Always fetched for list routes: the pagination cursor is built from them
+CURSOR_FIELDS = ("created_at", "id")
+
+
+def parse_fields(fields: Optional[str], allowed: List[str] = SCAMMER_RESPONSE_FIELDS) -> List[str]:
+    """Parse a comma separated ``fields`` parameter, keeping the declared order."""
+    if not fields:
+        return list(allowed)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in allowed if name in requested]
+
+
+def resolve_view(fields: Optional[str]) -> List[str]:
+    """Map the ``fields`` parameter of a list route to the fields to return."""
+    if not fields or fields == SUMMARY_VIEW:
+        return list(SUMMARY_FIELDS)
+    if fields == FULL_VIEW:
+        return list(SCAMMER_RESPONSE_FIELDS)
+    return parse_fields(fields)
+
+
+def projection_for(fields: List[str], *extra: str) -> Dict[str, int]:
+    return {"_id": 0, **{name: 1 for name in (*fields, *CURSOR_FIELDS, *extra)}}
+
+
+def select_fields(documents: List[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    """Drop fields that were fetched for internal use but not requested."""
+    if not documents or set(documents[0]).issubset(fields):
+        return documents
+    return [{name: document[name] for name in fields if name in document} for document in documents]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None):
+        super().__init__(content=content, status_code=status_code, headers=headers)
@@ -1,30 +1,75 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import asyncio
 import os
 import logging
 from pathlib import Path
 
 from models import (
-    Scammer, ScammerCreate, ScammerUpdate, ScammerResponse,
+    Scammer, ScammerCreate, ScammerUpdate, ScammerResponse, ScammerListItem,
     User, UserCreate, UserLogin, UserResponse, Token, Statistics,
-    ScammerStatus
+    ScammerStatus, RecordFormat, ImportReport, LookupRequest, LookupResponse, CheckResult,
+    BulkStatusRequest, BulkUpdateRequest, BulkDeleteRequest, BulkResult, ChangeFeedPage, SlowQueryStats,
+    SimilarScammer,
+    DUPLICATE_DISCORD_ID_MESSAGE, INVALID_DISCORD_ID_MESSAGE, discord_id_number, is_valid_discord_id
 )
 from auth import (
     authenticate_user, create_access_token, get_current_user, 
-    get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+    invalidate_user, user_cache, ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from bulk_import import import_scammers
+from bulk_ops import bulk_delete, bulk_update
+from change_feed import (
+    DEFAULT_CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, CursorExpired, InvalidChangeCursor,
+    read_changes, record_changes
+)
+from events import (
+    CHANGE_STREAM_SOURCE, EVENT_SOURCE, LOCAL_SOURCE, EventBroker, TooManyClientSubscribers, TooManySubscribers,
+    event_stream, format_event, replay, watch_change_log
+)
+from export import (
+    DEFAULT_EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE, MEDIA_TYPES,
+    export_filter, stream_export
+)
+from indexes import ensure_indexes
+from id_snapshot import MEDIA_TYPE as ID_SNAPSHOT_MEDIA_TYPE
+from membership import MEMBERSHIP_RECONCILE_SECONDS, MembershipIndex, MembershipSnapshot
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Collected, MetricsMiddleware, MongoCommandMetrics, cache_metrics, registry
+from migrations import run_backfills
+from passwords import password_hasher
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, SORT, InvalidCursor, after_cursor, next_cursor
+from public_snapshot import PublicSnapshot
+from search import (
+    MAX_SEARCH_LENGTH, RELEVANCE_CANDIDATES, build_search_filter, discord_ids_filter, normalize, rank,
+    search_fields, with_search_fields
+)
+from serialization import (
+    SCAMMER_PROJECTION, SCAMMER_RESPONSE_FIELDS, SUMMARY_FIELDS, SUMMARY_VIEW, JSONBytesResponse,
+    dumps, parse_fields, projection_for, resolve_view, select_fields
+)
+from similarity import (
+    DEFAULT_MIN_SCORE, DEFAULT_SIMILAR_LIMIT, MAX_SIMILAR_LIMIT, SIMILARITY_CHECK_SECONDS, SimilarityIndex,
+    edit_distance
+)
+from slow_queries import RequestScopeMiddleware, SlowQueryLog
+from stats_cache import StatisticsCache
+from versioning import DATA_VERSION_POLL_SECONDS, DataVersion, not_modified
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+slow_query_log = SlowQueryLog()
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics(), slow_query_log])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app
@@ -36,6 +81,109 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 
+# Keep references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+statistics_cache = StatisticsCache()
+membership_index = MembershipIndex()
+membership_snapshot = MembershipSnapshot(membership_index)
+similarity_index = SimilarityIndex()
+data_version = DataVersion()
+event_broker = EventBroker()
+
+# Seconds to wait before each new attempt to publish a committed write
+PUBLISH_RETRY_DELAYS = (1, 5, 30)
+
+# Called by every handler that writes to the scammers collection with
+# (before, after) document pairs; None stands for "did not exist".
+#
+# The write is already committed when this runs, and what follows are separate
+# round trips with no transaction around them (that would need a replica set),
+# so the steps are ordered to make a partial failure safe:
+#   1. The in-process mirrors (statistics, membership, similarity) are updated;
+#      this cannot fail, so this worker answers correctly right away.
+#   2. The shared data version is bumped. This moves the ETags of every worker
+#      and reserves the change log sequence numbers of the write.
+#   3. The entries are logged under those numbers and pushed to subscribers.
+# A failure in 2 or 3 does not fail the request - the client would retry a
+# write that did happen - but is retried in the background from the step that
+# failed. Until then other workers keep serving the previous version and its
+# ETags, and change feed readers wait at the missing sequence numbers for up
+# to GAP_TIMEOUT_SECONDS before skipping them. If every attempt fails the
+# feed misses the change for good; the periodic reconcile and the version
+# poll still bring the in-process mirrors back in line.
+async def scammers_changed(
+    database: AsyncIOMotorDatabase,
+    changes: List[Tuple[Optional[dict], Optional[dict]]]
+):
+    statistics_cache.apply(changes)
+    membership_index.apply(changes)
+    similarity_index.apply(changes)
+    version = None
+    try:
+        version = await bump_data_version(database, changes)
+        await log_changes(database, changes, version)
+    except Exception:
+        logger.exception("Publishing a committed write of %d records failed, retrying", len(changes))
+        run_in_background(retry_publish(database, changes, version))
+    public_snapshot.schedule_rebuild()
+
+async def bump_data_version(database: AsyncIOMotorDatabase, changes: list) -> int:
+    version, foreign_writes = await data_version.bump(database, len(changes))
+    if foreign_writes:
+        # Another worker wrote in the meantime; its changes are not in the counters
+        statistics_cache.invalidate()
+        run_in_background(sync_membership(database))
+    else:
+        membership_index.mark_synced(data_version.epoch, version - len(changes) + 1, version)
+    return version
+
+async def log_changes(database: AsyncIOMotorDatabase, changes: list, version: int):
+    entries = await record_changes(database, changes, version)
+    if EVENT_SOURCE == LOCAL_SOURCE:
+        event_broker.publish(entries, data_version.epoch)
+
+async def retry_publish(database: AsyncIOMotorDatabase, changes: list, version: Optional[int]):
+    # version is None while the bump itself has not gone through
+    for delay in PUBLISH_RETRY_DELAYS:
+        await asyncio.sleep(delay)
+        try:
+            if version is None:
+                version = await bump_data_version(database, changes)
+                public_snapshot.schedule_rebuild()
+            await log_changes(database, changes, version)
+            return
+        except Exception:
+            logger.warning("Publishing a committed write failed again", exc_info=True)
+    logger.error("Gave up publishing a committed write of %d records; the change feed misses it", len(changes))
+
+async def sync_membership(database: AsyncIOMotorDatabase):
+    """Apply other workers' writes to the membership index from the change log."""
+    epoch, head = data_version.epoch, data_version.version
+    if (membership_index.epoch, membership_index.synced_seq) == (epoch, head):
+        return
+    try:
+        await membership_index.catch_up(database, epoch, head)
+    except CursorExpired:
+        # The log no longer reaches back to what the index has seen
+        await membership_index.load(database, epoch, head)
+
+async def build_public_snapshot() -> Tuple[int, bytes, Optional[str]]:
+    version = data_version.version
+    scammers, page_cursor = await find_scammers(db, None, DEFAULT_PAGE_SIZE)
+    return version, dumps(scammers), page_cursor
+
+public_snapshot = PublicSnapshot(build_public_snapshot)
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
 # Dependency to get database
 async def get_database() -> AsyncIOMotorDatabase:
     return db
@@ -47,6 +195,42 @@ async def get_current_user_with_db(
 ):
     return await get_current_user(credentials, database)
 
+async def find_scammers(
+    database: AsyncIOMotorDatabase,
+    search: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    relevance: bool = False,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of scammers and the cursor of the following page."""
+    fields = fields or SUMMARY_FIELDS
+    query = build_search_filter(search)
+    if relevance and query:
+        # Rank a bounded candidate set instead of sorting the whole collection
+        candidates = await database.scammers.find(
+            query, projection_for(fields, "discord_id", "discord_name_lower")
+        ).limit(RELEVANCE_CANDIDATES).to_list(RELEVANCE_CANDIDATES)
+        return select_fields(rank(candidates, search)[skip:skip + limit], fields), None
+
+    try:
+        query = after_cursor(query, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    scammers = database.scammers.find(query, projection_for(fields)).sort(SORT)
+    if skip and not cursor:
+        scammers = scammers.skip(skip)
+    page = await scammers.limit(limit).to_list(limit)
+    return select_fields(page, fields), next_cursor(page, limit)
+
+def list_fields(fields: Optional[str]) -> List[str]:
+    try:
+        return resolve_view(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
 # Auth routes
 @api_router.post("/auth/login", response_model=Token)
 async def login_for_access_token(
@@ -80,7 +264,7 @@ async def register_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     new_user = User(
         username=user_data.username,
         password_hash=hashed_password
@@ -106,58 +290,223 @@ async def read_users_me(current_user: User = Depends(get_current_user_with_db)):
         is_active=current_user.is_active
     )
 
+LIST_RESPONSE_DESCRIPTION = (
+    "Summary rows by default, every field with fields=full, or only the requested fields"
+)
+
 # Public routes (no auth required)
-@api_router.get("/scammers/public", response_model=List[ScammerResponse])
+@api_router.get("/scammers/public", response_model=List[ScammerListItem],
+                response_description=LIST_RESPONSE_DESCRIPTION)
 async def get_scammers_public(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
+    relevance: bool = False,
+    fields: Optional[str] = Query(
+        None, description="'summary' (default), 'full' or a comma separated list of fields"
+    ),
+    skip: int = Query(0, ge=0, deprecated=True, description="Deprecated: use cursor"),
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    query = {}
-    if search:
-        query = {
-            "$or": [
-                {"discord_id": {"$regex": search, "$options": "i"}},
-                {"discord_name": {"$regex": search, "$options": "i"}}
-            ]
-        }
-    
-    scammers = await database.scammers.find(query).skip(skip).limit(limit).to_list(limit)
-    return [ScammerResponse(**scammer) for scammer in scammers]
+    default_page = (
+        limit == DEFAULT_PAGE_SIZE and not (cursor or search or relevance or skip)
+        and fields in (None, SUMMARY_VIEW)
+    )
+    from_snapshot = default_page and public_snapshot.current(data_version.version)
+    encoding = public_snapshot.encoding(request.headers.get("accept-encoding", "")) if from_snapshot else None
 
-@api_router.get("/statistics", response_model=Statistics)
-async def get_statistics(database: AsyncIOMotorDatabase = Depends(get_database)):
-    total_records = await database.scammers.count_documents({})
-    active_threats = await database.scammers.count_documents({"status": "active"})
-    verified = total_records  # All records are considered verified
+    headers = data_version.cache_headers(request)
+    headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        # Each content coding is its own representation and needs its own strong validator
+        headers["ETag"] = f'{headers["ETag"][:-1]}-{encoding}"'
+    if not_modified(request, headers):
+        return not_modified_response(headers)
+
+    if from_snapshot:
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if public_snapshot.next_cursor:
+            headers[NEXT_CURSOR_HEADER] = public_snapshot.next_cursor
+        return JSONBytesResponse(public_snapshot.body(encoding), headers=headers)
+
+    scammers, page_cursor = await find_scammers(
+        database, search, limit, cursor, skip, relevance, list_fields(fields)
+    )
+    if page_cursor:
+        headers[NEXT_CURSOR_HEADER] = page_cursor
+    return JSONBytesResponse(dumps(scammers), headers=headers)
+
+@api_router.get("/scammers/public/{scammer_id}", response_model=ScammerResponse)
+async def get_scammer_public(
+    scammer_id: str,
+    request: Request,
+    response: Response,
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    headers = data_version.cache_headers(request)
+    if not_modified(request, headers):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+
+    scammer = await database.scammers.find_one({"id": scammer_id}, SCAMMER_PROJECTION)
+    if not scammer:
+        raise HTTPException(status_code=404, detail="Мошенник не найден")
     
-    return Statistics(
-        total_records=total_records,
-        active_threats=active_threats,
-        verified=verified
+    return ScammerResponse(**scammer)
+
+@api_router.get("/scammers/changes", response_model=ChangeFeedPage)
+async def get_scammer_changes(
+    since: Optional[str] = Query(None, description="Cursor from a previous page; omit to get the current head"),
+    limit: int = Query(DEFAULT_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    try:
+        return await read_changes(database, data_version.epoch, data_version.version, since, limit)
+    except InvalidChangeCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except CursorExpired as exc:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(exc))
+
+@api_router.get("/scammers/events")
+async def stream_scammer_events(
+    request: Request,
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    # Server-Sent Events; EventSource resends the last event id on reconnect
+    try:
+        subscriber = event_broker.subscribe(request.client.host if request.client else "")
+    except TooManyClientSubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много подключений с вашего адреса"
+        )
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Слишком много подключений, попробуйте позже"
+        )
+    backlog = b""
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            backlog, subscriber.after_seq, resync = await replay(
+                database, data_version.epoch, data_version.version, last_event_id
+            )
+        except BaseException:
+            event_broker.unsubscribe(subscriber)
+            raise
+        if resync:
+            backlog = format_event("resync", {})
+    return StreamingResponse(
+        event_stream(event_broker, subscriber, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.post("/scammers/lookup", response_model=LookupResponse)
+async def lookup_scammers(
+    lookup: LookupRequest,
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    # One $in query on the unique Discord ID index for the whole batch
+    requested = list(dict.fromkeys(lookup.discord_ids))
+    candidates = [discord_id for discord_id in requested if is_valid_discord_id(discord_id)]
+    projection = {"_id": 0, "discord_id": 1} if lookup.hits_only else SCAMMER_PROJECTION
+    found = await database.scammers.find(
+        discord_ids_filter(candidates), projection
+    ).to_list(len(candidates)) if candidates else []
+
+    found_ids = {scammer["discord_id"] for scammer in found}
+    return LookupResponse(
+        hits=[discord_id for discord_id in requested if discord_id in found_ids],
+        misses=[discord_id for discord_id in requested if discord_id not in found_ids],
+        records=[] if lookup.hits_only else [ScammerResponse(**scammer) for scammer in found],
     )
 
+@api_router.get("/check/snapshot", response_class=Response)
+async def download_check_snapshot(request: Request):
+    # Sorted uint64 IDs of active records for offline lookups, see id_snapshot.py
+    await sync_membership(db)
+    # Tagged with the version the index reflects, which lags while a writer is still logging
+    epoch, version = membership_index.epoch, membership_index.synced_seq
+    headers = data_version.cache_headers(request, version=version)
+    if not_modified(request, headers):
+        return not_modified_response(headers)
+    body = await membership_snapshot.get(epoch, version)
+    headers["Content-Disposition"] = 'attachment; filename="flagged-ids.bin"'
+    return Response(content=body, media_type=ID_SNAPSHOT_MEDIA_TYPE, headers=headers)
+
+@api_router.get("/check/{discord_id}", response_model=CheckResult)
+async def check_discord_id(discord_id: str):
+    if not is_valid_discord_id(discord_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_DISCORD_ID_MESSAGE)
+    # Answered from the in-process index, never from MongoDB
+    return CheckResult(discord_id=discord_id, flagged=membership_index.is_flagged(discord_id))
+
+@api_router.get("/statistics", response_model=Statistics)
+async def get_statistics(
+    request: Request,
+    response: Response,
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    headers = data_version.cache_headers(request)
+    if not_modified(request, headers):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    return await statistics_cache.get(database)
+
 # Protected routes (auth required)
-@api_router.get("/scammers", response_model=List[ScammerResponse])
+@api_router.get("/scammers", response_model=List[ScammerListItem],
+                response_description=LIST_RESPONSE_DESCRIPTION)
 async def get_scammers(
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
+    relevance: bool = False,
+    fields: Optional[str] = Query(
+        None, description="'summary' (default), 'full' or a comma separated list of fields"
+    ),
+    skip: int = Query(0, ge=0, deprecated=True, description="Deprecated: use cursor"),
     current_user: User = Depends(get_current_user_with_db),
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    query = {}
-    if search:
-        query = {
-            "$or": [
-                {"discord_id": {"$regex": search, "$options": "i"}},
-                {"discord_name": {"$regex": search, "$options": "i"}}
-            ]
-        }
-    
-    scammers = await database.scammers.find(query).skip(skip).limit(limit).to_list(limit)
-    return [ScammerResponse(**scammer) for scammer in scammers]
+    scammers, page_cursor = await find_scammers(
+        database, search, limit, cursor, skip, relevance, list_fields(fields)
+    )
+    headers = {NEXT_CURSOR_HEADER: page_cursor} if page_cursor else None
+    return JSONBytesResponse(dumps(scammers), headers=headers)
+
+@api_router.get("/scammers/similar", response_model=List[SimilarScammer])
+async def find_similar_scammers(
+    name: str = Query(..., min_length=1, max_length=MAX_SEARCH_LENGTH),
+    limit: int = Query(DEFAULT_SIMILAR_LIMIT, ge=1, le=MAX_SIMILAR_LIMIT),
+    min_score: float = Query(DEFAULT_MIN_SCORE, ge=0.1, le=1),
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    # Candidates are ranked by the in-process trigram index; Mongo only serves the top k
+    matches = similarity_index.search(name, limit, min_score)
+    if not matches:
+        return []
+    discord_ids = [f"{discord_id:018d}" for discord_id, _ in matches]
+    found = await database.scammers.find(
+        discord_ids_filter(discord_ids), projection_for(SUMMARY_FIELDS)
+    ).to_list(len(discord_ids))
+    by_discord_id = {document["discord_id"]: document for document in found}
+
+    query = normalize(name)
+    results = [
+        SimilarScammer(
+            **by_discord_id[discord_id], score=score,
+            distance=edit_distance(query, normalize(by_discord_id[discord_id]["discord_name"])),
+        )
+        for discord_id, (_, score) in zip(discord_ids, matches) if discord_id in by_discord_id
+    ]
+    # Equal scores (e.g. "d1scord" vs "discord" fold to the same trigrams) are split by edit distance
+    results.sort(key=lambda result: (-result.score, result.distance))
+    return results
 
 @api_router.post("/scammers", response_model=ScammerResponse)
 async def create_scammer(
@@ -166,32 +515,107 @@ async def create_scammer(
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
     # Validate Discord ID format (18 digits)
-    if not scammer_data.discord_id.isdigit() or len(scammer_data.discord_id) != 18:
+    if not is_valid_discord_id(scammer_data.discord_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Discord ID должен состоять из 18 цифр"
+            detail=INVALID_DISCORD_ID_MESSAGE
         )
     
-    # Check if scammer already exists
-    existing_scammer = await database.scammers.find_one({"discord_id": scammer_data.discord_id})
-    if existing_scammer:
+    # The unique discord_id index rejects duplicates atomically
+    new_scammer = Scammer(**scammer_data.dict())
+    document = with_search_fields(new_scammer.dict())
+    try:
+        await database.scammers.insert_one(document)
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Мошенник с таким Discord ID уже существует"
+            detail=DUPLICATE_DISCORD_ID_MESSAGE
         )
-    
-    new_scammer = Scammer(**scammer_data.dict())
-    await database.scammers.insert_one(new_scammer.dict())
+    await scammers_changed(database, [(None, document)])
     
     return ScammerResponse(**new_scammer.dict())
 
+@api_router.post("/scammers/import", response_model=ImportReport)
+async def import_scammers_bulk(
+    request: Request,
+    format: Optional[RecordFormat] = None,
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    # Body is NDJSON (one object per line) or CSV with a header row
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = RecordFormat.CSV if "csv" in content_type else RecordFormat.NDJSON
+
+    async def on_inserted(documents: List[dict]):
+        await scammers_changed(database, [(None, document) for document in documents])
+
+    return await import_scammers(database, request.stream(), format, on_inserted)
+
+@api_router.post("/scammers/bulk/status", response_model=BulkResult)
+async def bulk_change_status(
+    bulk_request: BulkStatusRequest,
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    async def on_changed(changes):
+        await scammers_changed(database, changes)
+
+    return await bulk_update(database, bulk_request, {"status": bulk_request.status}, on_changed)
+
+@api_router.post("/scammers/bulk/update", response_model=BulkResult)
+async def bulk_update_scammers(
+    bulk_request: BulkUpdateRequest,
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    async def on_changed(changes):
+        await scammers_changed(database, changes)
+
+    update_data = bulk_request.update.dict(exclude_unset=True)
+    return await bulk_update(database, bulk_request, update_data, on_changed)
+
+@api_router.post("/scammers/bulk/delete", response_model=BulkResult)
+async def bulk_delete_scammers(
+    bulk_request: BulkDeleteRequest,
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    async def on_changed(changes):
+        await scammers_changed(database, changes)
+
+    return await bulk_delete(database, bulk_request, on_changed)
+
+@api_router.get("/scammers/export")
+async def export_scammers(
+    format: RecordFormat = RecordFormat.NDJSON,
+    scammer_status: Optional[ScammerStatus] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to export"),
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    current_user: User = Depends(get_current_user_with_db),
+    database: AsyncIOMotorDatabase = Depends(get_database)
+):
+    try:
+        export_fields = parse_fields(fields, SCAMMER_RESPONSE_FIELDS)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    query = export_filter(scammer_status, created_from, created_to)
+    return StreamingResponse(
+        stream_export(database, format, query, export_fields, batch_size),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="scammers.{format.value}"'},
+    )
+
 @api_router.get("/scammers/{scammer_id}", response_model=ScammerResponse)
 async def get_scammer(
     scammer_id: str,
     current_user: User = Depends(get_current_user_with_db),
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    scammer = await database.scammers.find_one({"id": scammer_id})
+    scammer = await database.scammers.find_one({"id": scammer_id}, SCAMMER_PROJECTION)
     if not scammer:
         raise HTTPException(status_code=404, detail="Мошенник не найден")
     
@@ -204,26 +628,47 @@ async def update_scammer(
     current_user: User = Depends(get_current_user_with_db),
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    scammer = await database.scammers.find_one({"id": scammer_id})
-    if not scammer:
-        raise HTTPException(status_code=404, detail="Мошенник не найден")
-    
     # Validate Discord ID format if provided
-    if scammer_update.discord_id and (not scammer_update.discord_id.isdigit() or len(scammer_update.discord_id) != 18):
+    if scammer_update.discord_id and not is_valid_discord_id(scammer_update.discord_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Discord ID должен состоять из 18 цифр"
+            detail=INVALID_DISCORD_ID_MESSAGE
         )
     
     update_data = scammer_update.dict(exclude_unset=True)
-    if update_data:
-        update_data["updated_at"] = datetime.utcnow()
-        await database.scammers.update_one(
-            {"id": scammer_id}, 
-            {"$set": update_data}
+    if not update_data:
+        scammer = await database.scammers.find_one({"id": scammer_id}, SCAMMER_PROJECTION)
+        if not scammer:
+            raise HTTPException(status_code=404, detail="Мошенник не найден")
+        return ScammerResponse(**scammer)
+
+    now = datetime.utcnow()
+    # Stored with millisecond precision; truncate so the response matches it
+    update_data["updated_at"] = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    if update_data.get("discord_name") is not None:
+        update_data.update(search_fields(update_data["discord_name"]))
+    if update_data.get("discord_id") is not None:
+        update_data["discord_id_num"] = discord_id_number(update_data["discord_id"])
+
+    # One atomic round trip; the unique index guards a changed discord_id.
+    # The previous version is returned because the change hooks need it, and
+    # the new one is exactly the previous one with update_data applied.
+    try:
+        scammer = await database.scammers.find_one_and_update(
+            {"id": scammer_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
         )
-    
-    updated_scammer = await database.scammers.find_one({"id": scammer_id})
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=DUPLICATE_DISCORD_ID_MESSAGE
+        )
+    if not scammer:
+        raise HTTPException(status_code=404, detail="Мошенник не найден")
+
+    updated_scammer = {**scammer, **update_data}
+    await scammers_changed(database, [(scammer, updated_scammer)])
     return ScammerResponse(**updated_scammer)
 
 @api_router.delete("/scammers/{scammer_id}")
@@ -232,21 +677,76 @@ async def delete_scammer(
     current_user: User = Depends(get_current_user_with_db),
     database: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    result = await database.scammers.delete_one({"id": scammer_id})
-    if result.deleted_count == 0:
+    deleted_scammer = await database.scammers.find_one_and_delete({"id": scammer_id})
+    if deleted_scammer is None:
         raise HTTPException(status_code=404, detail="Мошенник не найден")
+    await scammers_changed(database, [(deleted_scammer, None)])
     
     return {"message": "Мошенник успешно удален"}
 
+@api_router.get("/admin/slow-queries", response_model=List[SlowQueryStats])
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_user_with_db)
+):
+    # Query shapes over SLOW_QUERY_MS on this worker, most total time first
+    return slow_query_log.top(limit)
+
+@api_router.delete("/admin/slow-queries")
+async def reset_slow_queries(current_user: User = Depends(get_current_user_with_db)):
+    slow_query_log.reset()
+    return {"message": "Статистика медленных запросов сброшена"}
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Optional shared secret for scrapers; without it /metrics is open like /api/check
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+cache_metrics({"statistics": statistics_cache, "users": user_cache})
+registry.register(Collected(
+    "password_hash_queue_depth", "bcrypt operations waiting for a hashing thread.",
+    lambda: password_hasher.queue_depth,
+))
+registry.register(Collected(
+    "password_hash_in_progress", "bcrypt operations currently running.",
+    lambda: password_hasher.in_progress,
+))
+registry.register(Collected(
+    "event_subscribers", "Connected change event subscribers.", lambda: len(event_broker),
+))
+registry.register(Collected(
+    "event_slow_disconnects_total", "Event subscribers dropped for falling behind.",
+    lambda: event_broker.slow_disconnects, kind="counter",
+))
+registry.register(Collected(
+    "membership_index_size", "Active Discord IDs in the membership index.", lambda: len(membership_index),
+))
+registry.register(Collected(
+    "similarity_index_size", "Names in the fuzzy search index.", lambda: len(similarity_index),
+))
+registry.register(Collected(
+    "public_snapshot_rebuilds_total", "Rebuilds of the default public page snapshot.",
+    lambda: public_snapshot.rebuilds, kind="counter",
+))
+registry.register(Collected("data_version", "Last seen data version of the scammers collection.", lambda: data_version.version))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestScopeMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 # Configure logging
@@ -256,14 +756,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def reconcile_membership_periodically():
+    while True:
+        await asyncio.sleep(MEMBERSHIP_RECONCILE_SECONDS)
+        try:
+            added, removed = await membership_index.load(db, data_version.epoch, data_version.version)
+        except Exception:
+            logger.exception("Membership index reconcile failed")
+            continue
+        if added or removed:
+            logger.warning("Membership index drift corrected: %d added, %d removed", added, removed)
+
+async def reload_similarity_periodically():
+    while True:
+        await asyncio.sleep(SIMILARITY_CHECK_SECONDS)
+        if not similarity_index.due():
+            continue
+        try:
+            await similarity_index.load(db)
+        except Exception:
+            logger.exception("Similarity index reload failed")
+
+async def watch_data_version():
+    # Picks up writes made by other workers so ETags and caches stay current
+    while True:
+        await asyncio.sleep(DATA_VERSION_POLL_SECONDS)
+        try:
+            if await data_version.refresh(db):
+                statistics_cache.invalidate()
+                public_snapshot.schedule_rebuild()
+            await sync_membership(db)
+        except Exception:
+            logger.exception("Data version refresh failed")
+
 @app.on_event("startup")
 async def startup_db_client():
+    # Make sure lookups by id, discord_id and username are index-backed
+    index_report = await ensure_indexes(db)
+    if index_report.has_drift:
+        logger.warning("Index drift detected: %s", index_report.summary())
+    else:
+        logger.info("Indexes verified: %s", index_report.summary())
+    # Derive search fields for records written before they existed
+    run_in_background(run_backfills(db))
+
+    slow_query_log.start(db)
+    await data_version.refresh(db)
+    run_in_background(watch_data_version())
+    if EVENT_SOURCE == CHANGE_STREAM_SOURCE:
+        run_in_background(watch_change_log(db, event_broker, lambda: data_version.epoch))
+    public_snapshot.schedule_rebuild()
+
+    await membership_index.load(db, data_version.epoch, data_version.version)
+    logger.info("Membership index loaded with %d active Discord IDs", len(membership_index))
+    run_in_background(reconcile_membership_periodically())
+
+    await similarity_index.load(db)
+    logger.info("Similarity index loaded with %d names", len(similarity_index))
+    run_in_background(reload_similarity_periodically())
+
     # Create default admin user if not exists
     existing_admin = await db.users.find_one({"username": "cyber_admin_2025"})
     if not existing_admin:
         admin_user = User(
             username="cyber_admin_2025",
-            password_hash=get_password_hash("Sc4mm3r_Db@Pr0t3ct!")  # Secure password
+            password_hash=await password_hasher.hash("Sc4mm3r_Db@Pr0t3ct!")  # Secure password
         )
         await db.users.insert_one(admin_user.dict())
         logger.info("Secure admin user created with username: cyber_admin_2025")
@@ -272,8 +829,11 @@ async def startup_db_client():
     old_admin = await db.users.find_one({"username": "admin"})
     if old_admin:
         await db.users.delete_one({"username": "admin"})
+        invalidate_user("admin")
         logger.info("Old default admin user removed for security")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    public_snapshot.cancel()
+    client.close()
+    password_hasher.shutdown()
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""Fuzzy name search for catching renamed accounts.
+
+Scammers come back under names that differ by a character or two
+("discord_support" -> "d1scord_support", a Cyrillic "о" for a Latin "o").
+Names are folded to a skeleton (casefolded, accents stripped, lookalike
+digits and Cyrillic letters mapped to Latin, separators unified) and split
+into padded trigrams. An in-process inverted index maps every trigram to the
+slots of the names containing it, so a query only counts shared trigrams over
+its own posting lists and ranks candidates by trigram Jaccard similarity; the
+cost follows how common the query's trigrams are, not the collection size.
+
+A slot is the numeric Discord ID (8 bytes) plus its trigram count, and the
+posting lists are ``array('I')``. Renames and deletes leave dead slots that
+queries skip; a reload drops them once they pile up, and periodically picks
+up writes made by other workers.
+"""
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import os
+import re
+import time
+import unicodedata
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models import parse_discord_id
+from search import normalize
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    numpy = None
+
+SIMILARITY_RELOAD_SECONDS = float(os.environ.get("SIMILARITY_RELOAD_SECONDS", "600"))
+# How often the server checks whether a reload is due
+SIMILARITY_CHECK_SECONDS = 30
+DEFAULT_SIMILAR_LIMIT = 10
+MAX_SIMILAR_LIMIT = 100
+DEFAULT_MIN_SCORE = 0.3
+# Reload once this share of the slots belongs to renamed or deleted records
+DEAD_SLOT_RATIO = 0.25
+LOAD_BATCH_SIZE = 10000
+
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+# Characters commonly swapped in to dodge name searches
+_LOOKALIKES = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "i", "l": "i",
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i",
+})
+_SEPARATORS = re.compile(r"[\s_.\-]+")
+
+
+def skeleton(name: str) -> str:
+    text = unicodedata.normalize("NFKD", normalize(name))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", text.translate(_LOOKALIKES)).strip()
+
+
+def name_grams(name: str) -> Set[str]:
+    """Distinct trigrams of the skeleton, padded so short names still have some."""
+    text = skeleton(name)
+    if not text:
+        return set()
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two (short) names."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _entry(document: Optional[Dict[str, Any]]) -> Optional[Tuple[int, str]]:
+    if document is None:
+        return None
+    number = parse_discord_id(document.get("discord_id", ""))
+    name = document.get("discord_name")
+    if not name or number is None:
+        return None
+    return number, name
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._discord_ids = array("Q")
+        self._sizes = array("H")
+        self._alive = bytearray()
+        self._dead = 0
+        self._postings: Dict[str, array] = {}
+        # Changes seen while a reload is in flight, replayed once it finishes
+        self._journal: Optional[List[Change]] = None
+
+    def __len__(self) -> int:
+        return len(self._sizes) - self._dead
+
+    def _find(self, discord_id: int, grams: Set[str]) -> Optional[int]:
+        # Every slot of this name is in each of its posting lists; scan the shortest
+        rarest = min((self._postings.get(gram, ()) for gram in grams), key=len)
+        for slot in rarest:
+            if self._alive[slot] and self._discord_ids[slot] == discord_id:
+                return slot
+        return None
+
+    def _add(self, discord_id: int, grams: Set[str]) -> None:
+        slot = len(self._sizes)
+        self._discord_ids.append(discord_id)
+        self._sizes.append(min(len(grams), 0xFFFF))
+        self._alive.append(1)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("I")
+            posting.append(slot)
+
+    def apply(self, changes: Iterable[Change]) -> None:
+        """Fold ``(before, after)`` document pairs into the index."""
+        changes = list(changes)
+        if self._journal is not None:
+            self._journal.extend(changes)
+        for before, after in changes:
+            old, new = _entry(before), _entry(after)
+            if old == new:
+                continue
+            if old is not None:
+                grams = name_grams(old[1])
+                slot = self._find(old[0], grams) if grams else None
+                if slot is not None:
+                    self._alive[slot] = 0
+                    self._dead += 1
+            if new is not None:
+                grams = name_grams(new[1])
+                # Replayed journal entries may already be in a fresh load
+                if grams and self._find(new[0], grams) is None:
+                    self._add(new[0], grams)
+
+    def due(self) -> bool:
+        """Whether dead slots piled up or the last reload is old enough to redo."""
+        return (
+            self._dead > DEAD_SLOT_RATIO * len(self._sizes)
+            or time.monotonic() - self.loaded_at > SIMILARITY_RELOAD_SECONDS
+        )
+
+    def search(self, name: str, limit: int = DEFAULT_SIMILAR_LIMIT, min_score: float = DEFAULT_MIN_SCORE
+               ) -> List[Tuple[int, float]]:
+        """Up to ``limit`` (Discord ID, Jaccard score) pairs, best first."""
+        query = name_grams(name)
+        if not query:
+            return []
+        postings = [self._postings[gram] for gram in query if gram in self._postings]
+        # Jaccard can be at most shared / len(query), which bounds the shared trigrams from below
+        needed = max(1, math.ceil(min_score * len(query)))
+        if len(postings) < needed:
+            return []
+
+        if numpy is not None:
+            scored = self._score_vectorized(postings, len(query), needed, min_score, limit)
+        else:
+            scored = self._score(postings, len(query), needed, min_score, limit)
+        return [(self._discord_ids[slot], round(score, 4)) for score, slot in scored]
+
+    def _score(self, postings: List[array], query_size: int, needed: int, min_score: float, limit: int
+               ) -> List[Tuple[float, int]]:
+        shared_counts: Counter = Counter()
+        for posting in postings:
+            shared_counts.update(posting)
+        sizes, alive = self._sizes, self._alive
+        scored = []
+        for slot, shared in shared_counts.items():
+            if shared >= needed and alive[slot]:
+                score = shared / (sizes[slot] + query_size - shared)
+                if score >= min_score:
+                    scored.append((score, slot))
+        return heapq.nlargest(limit, scored)
+
+    def _score_vectorized(self, postings: List[array], query_size: int, needed: int, min_score: float, limit: int
+                          ) -> List[Tuple[float, int]]:
+        # Slots are dense, so counting shared trigrams is one bincount over the
+        # concatenated posting lists; fancy indexing copies out of the buffers,
+        # which leaves the arrays free to grow again
+        slots = numpy.concatenate([numpy.frombuffer(posting, dtype=numpy.uint32) for posting in postings])
+        shared = numpy.bincount(slots, minlength=len(self._sizes))
+        candidates = numpy.flatnonzero(shared >= needed)
+        candidates = candidates[numpy.frombuffer(self._alive, dtype=numpy.uint8)[candidates] == 1]
+        shared = shared[candidates]
+        sizes = numpy.frombuffer(self._sizes, dtype=numpy.uint16)[candidates].astype(numpy.int64)
+        scores = shared / (sizes + query_size - shared)
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        if len(scores) > limit:
+            best = numpy.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[best], scores[best]
+        order = numpy.lexsort((-candidates, -scores))
+        return [(float(scores[i]), int(candidates[i])) for i in order]
+
+    async def load(self, database: AsyncIOMotorDatabase) -> None:
+        """Rebuild the index from the collection, dropping dead slots."""
+        self._journal = []
+        try:
+            fresh = SimilarityIndex()
+            cursor = database.scammers.find(
+                {}, {"_id": 0, "discord_id": 1, "discord_name": 1}, batch_size=LOAD_BATCH_SIZE,
+            )
+            async for document in cursor:
+                entry = _entry(document)
+                grams = name_grams(entry[1]) if entry is not None else None
+                if grams:
+                    fresh._add(entry[0], grams)
+
+            self._discord_ids, self._sizes, self._alive = fresh._discord_ids, fresh._sizes, fresh._alive
+            self._postings, self._dead = fresh._postings, 0
+            journal, self._journal = self._journal, None
+            self.apply(journal)
+        finally:
+            self._journal = None
+
+        self.loaded = True
+        self.loaded_at = time.monotonic()
@@ -0,0 +1,245 @@
+"""Slow MongoDB command log with sampled explain plans.
+
+A pymongo ``CommandListener`` sees every command the API sends, whichever
+module issued it. Commands slower than ``SLOW_QUERY_MS`` are logged as one
+JSON record with the route that issued them and the filter shape (keys and
+operators kept, values redacted), and are aggregated per shape so the admin
+endpoint can list the top offenders by total time.
+
+For a sample of slow reads the command is re-run through ``explain`` in
+``executionStats`` mode in the background, which adds the winning plan
+(``COLLSCAN`` vs ``IXSCAN``) and documents examined vs returned.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from models import SlowQueryStats
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+# Explain a given shape at most this often, and never more than a few at once
+EXPLAIN_INTERVAL_SECONDS = 60
+MAX_EXPLAINS_IN_FLIGHT = 2
+MAX_SHAPES = 500
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+# Where each command keeps its filter
+FILTER_FIELDS = {
+    "find": "filter", "count": "query", "distinct": "query", "findAndModify": "query",
+    "aggregate": "pipeline", "update": "updates", "delete": "deletes",
+}
+REDACTED = "?"
+
+# The ASGI scope of the request being served; Motor copies the context into
+# the threads that run the driver, so the listener can read the route
+current_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_scope", default=None)
+
+
+def redact(value: Any) -> Any:
+    """Keep the structure of a filter or pipeline but none of its values."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return [REDACTED] if value else []
+    return REDACTED
+
+
+def filter_shape(command_name: str, command: Dict[str, Any]) -> Any:
+    field = FILTER_FIELDS.get(command_name)
+    if field is None:
+        return None
+    value = command.get(field)
+    if command_name == "update":
+        value = [update.get("q") for update in value or []][:1]
+    elif command_name == "delete":
+        value = [delete.get("q") for delete in value or []][:1]
+    return redact(value)
+
+
+def docs_returned(command_name: str, reply: Dict[str, Any]) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name in ("count", "update", "delete"):
+        return reply.get("n")
+    if command_name == "findAndModify":
+        return 0 if reply.get("value") is None else 1
+    return None
+
+
+def _route() -> str:
+    scope = current_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return f"{scope.get('method', '')} {getattr(route, 'path', scope.get('path', ''))}"
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    # Aggregations nest the query plan in their first $cursor stage
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            explain = stage["$cursor"]
+            break
+    planner = explain.get("queryPlanner", {})
+    stats = explain.get("executionStats", {})
+    stages = _plan_stages(planner.get("winningPlan", {}).get("queryPlan") or planner.get("winningPlan", {}))
+    return {
+        "plan": " <- ".join(stages),
+        "collscan": any(stage.startswith("COLLSCAN") for stage in stages),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_returned": stats.get("nReturned"),
+    }
+
+
+class RequestScopeMiddleware:
+    """Make the current request visible to the listener through ``current_scope``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain_rate: float = SLOW_QUERY_EXPLAIN_RATE):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self._commands: Dict[Tuple[int, Any], Tuple[Dict[str, Any], str]] = {}
+        self._stats: Dict[str, SlowQueryStats] = {}
+        self._lock = threading.Lock()
+        self._database: Optional[AsyncIOMotorDatabase] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explains_in_flight = 0
+        self._explain_tasks: set = set()
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """Enable explain capture; called from the event loop at startup."""
+        self._database = database
+        self._loop = asyncio.get_running_loop()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in FILTER_FIELDS:
+            self._commands[(event.request_id, event.connection_id)] = (event.command, _route())
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._commands.pop((event.request_id, event.connection_id), None)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        started = self._commands.pop((event.request_id, event.connection_id), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+        command, route = started
+        collection = command.get(event.command_name)
+        shape = filter_shape(event.command_name, command)
+        key = json.dumps([collection, event.command_name, shape], sort_keys=True, default=str)
+        record = {
+            "route": route,
+            "collection": collection,
+            "command": event.command_name,
+            "filter": shape,
+            "duration_ms": round(duration_ms, 3),
+            "docs_returned": docs_returned(event.command_name, event.reply),
+        }
+        logger.warning("Slow query %s", json.dumps(record, default=str))
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= MAX_SHAPES:
+                    return
+                stats = self._stats[key] = SlowQueryStats(
+                    collection=str(collection), command=event.command_name, filter=shape,
+                )
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.routes = sorted({*stats.routes, route})
+            explain = self._should_explain(event.command_name, stats)
+        if explain:
+            self._loop.call_soon_threadsafe(self._spawn_explain, key, event.command_name, command)
+
+    def _should_explain(self, command_name: str, stats: SlowQueryStats) -> bool:
+        now = time.time()
+        if (
+            self._loop is None
+            or command_name not in EXPLAINABLE
+            or self._explains_in_flight >= MAX_EXPLAINS_IN_FLIGHT
+            or (stats.explained_at is not None and now - stats.explained_at < EXPLAIN_INTERVAL_SECONDS)
+            or random.random() >= self.explain_rate
+        ):
+            return False
+        stats.explained_at = now
+        self._explains_in_flight += 1
+        return True
+
+    def _spawn_explain(self, key: str, command_name: str, command: Dict[str, Any]) -> None:
+        # Runs on the event loop; keep a reference until the task is done
+        task = asyncio.ensure_future(self._explain(key, command_name, command))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, key: str, command_name: str, command: Dict[str, Any]) -> None:
+        try:
+            # Driver-added fields (session, $db, cluster time, ...) must not be resent
+            original = {name: value for name, value in command.items() if not name.startswith("$") and name != "lsid"}
+            explain = await self._database.command({"explain": original, "verbosity": "executionStats"})
+            summary = summarize_explain(explain)
+            with self._lock:
+                stats = self._stats.get(key)
+                if stats is not None:
+                    stats.plan = summary["plan"]
+                    stats.collscan = summary["collscan"]
+                    stats.docs_examined = summary["docs_examined"]
+                    stats.keys_examined = summary["keys_examined"]
+                    stats.docs_returned = summary["docs_returned"]
+            logger.warning("Slow query plan %s", json.dumps({"filter": json.loads(key)[2], **summary}, default=str))
+        except Exception:
+            logger.exception("Explain of slow %s failed", command_name)
+        finally:
+            with self._lock:
+                self._explains_in_flight -= 1
+
+    def top(self, limit: int) -> List[SlowQueryStats]:
+        with self._lock:
+            stats = [entry.model_copy() for entry in self._stats.values()]
+        return sorted(stats, key=lambda entry: entry.total_ms, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,130 @@
+"""In-process cache for ``/api/statistics``.
+
+The counters are rebuilt with a single ``$facet`` aggregation and then kept
+up to date incrementally by the write handlers, so in the steady state a
+statistics request does not touch MongoDB at all. The TTL is only a safety
+net against writes this process did not see (other workers, manual edits).
+"""
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+import asyncio
+import os
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models import ScammerStatus, Statistics
+
+STATISTICS_TTL_SECONDS = float(os.environ.get("STATISTICS_TTL_SECONDS", "300"))
+
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+async def compute_counts(database: AsyncIOMotorDatabase) -> Tuple[Counter, Counter]:
+    result = await database.scammers.aggregate([
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "by_scam_method": [{"$group": {"_id": "$scam_method", "count": {"$sum": 1}}}],
+        }}
+    ]).to_list(1)
+    facets = result[0] if result else {"by_status": [], "by_scam_method": []}
+    by_status = Counter({row["_id"]: row["count"] for row in facets["by_status"]})
+    by_scam_method = Counter({row["_id"]: row["count"] for row in facets["by_scam_method"]})
+    return by_status, by_scam_method
+
+
+def build_statistics(by_status: Counter, by_scam_method: Counter) -> Statistics:
+    total = sum(by_status.values())
+    return Statistics(
+        total_records=total,
+        active_threats=by_status.get(ScammerStatus.ACTIVE.value, 0),
+        verified=total,  # All records are considered verified
+        by_status=dict(+by_status),
+        by_scam_method=dict(+by_scam_method),
+    )
+
+
+def _value(scammer_status: Any) -> Any:
+    return scammer_status.value if isinstance(scammer_status, ScammerStatus) else scammer_status
+
+
+def count_changes(changes: Iterable[Change]) -> Tuple[Counter, Counter]:
+    """Net per-status and per-method count changes of ``(before, after)`` pairs."""
+    by_status: Counter = Counter()
+    by_scam_method: Counter = Counter()
+    for before, after in changes:
+        if before is not None:
+            by_status[_value(before.get("status"))] -= 1
+            by_scam_method[before.get("scam_method")] -= 1
+        if after is not None:
+            by_status[_value(after.get("status"))] += 1
+            by_scam_method[after.get("scam_method")] += 1
+    return by_status, by_scam_method
+
+
+def statistics_delta(changes: Iterable[Change]) -> Dict[str, Any]:
+    """The change of each ``Statistics`` field, for clients that keep their own copy."""
+    by_status, by_scam_method = count_changes(changes)
+    total = sum(by_status.values())
+    return {
+        "total_records": total,
+        "active_threats": by_status.get(ScammerStatus.ACTIVE.value, 0),
+        "verified": total,
+        "by_status": {key: count for key, count in by_status.items() if count},
+        "by_scam_method": {key: count for key, count in by_scam_method.items() if count},
+    }
+
+
+class StatisticsCache:
+    def __init__(self, ttl_seconds: float = STATISTICS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._by_status: Optional[Counter] = None
+        self._by_scam_method: Optional[Counter] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._by_status is not None and time.monotonic() < self._expires_at
+
+    def _snapshot(self) -> Statistics:
+        return build_statistics(self._by_status, self._by_scam_method)
+
+    async def get(self, database: AsyncIOMotorDatabase) -> Statistics:
+        if self._fresh():
+            self.hits += 1
+            return self._snapshot()
+
+        # Only one request rebuilds; concurrent callers wait for its result
+        async with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._snapshot()
+            self.misses += 1
+            generation = self._generation
+            by_status, by_scam_method = await compute_counts(database)
+            if generation != self._generation:
+                # Invalidated while aggregating: serve the result, don't keep it
+                return build_statistics(by_status, by_scam_method)
+            self._by_status, self._by_scam_method = by_status, by_scam_method
+            self._expires_at = time.monotonic() + self.ttl_seconds
+            return self._snapshot()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._by_status = self._by_scam_method = None
+
+    def apply(self, changes: Iterable[Change]) -> None:
+        """Fold ``(before, after)`` document pairs into the cached counters."""
+        if self._lock.locked():
+            # A rebuild is in flight and may or may not include these writes,
+            # also when nothing is cached yet
+            self.invalidate()
+            return
+        if self._by_status is None:
+            return
+        status_delta, scam_method_delta = count_changes(changes)
+        self._by_status.update(status_delta)
+        self._by_scam_method.update(scam_method_delta)
@@ -0,0 +1,112 @@
+"""Collection data version and HTTP conditional-GET helpers.
+
+Every write to the scammers collection increments a counter kept in the
+``meta`` collection, so all workers agree on the current version. Each
+worker keeps the latest value in memory (refreshed by its own writes and by
+a short poll), which lets it derive strong ETags and ``Last-Modified`` and
+answer ``If-None-Match`` with 304 without querying the scammers collection.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import uuid
+
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+DATA_VERSION_POLL_SECONDS = float(os.environ.get("DATA_VERSION_POLL_SECONDS", "2"))
+PUBLIC_MAX_AGE_SECONDS = int(os.environ.get("PUBLIC_MAX_AGE_SECONDS", "30"))
+PUBLIC_CACHE_CONTROL = f"public, max-age={PUBLIC_MAX_AGE_SECONDS}, stale-while-revalidate={PUBLIC_MAX_AGE_SECONDS * 2}"
+
+META_COLLECTION = "meta"
+VERSION_DOCUMENT_ID = "scammers_version"
+
+
+class DataVersion:
+    def __init__(self):
+        self.version = 0
+        # Identifies the counter document, so a reset counter never reuses old ETags
+        self.epoch = ""
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def _observe(self, document: Optional[Dict]) -> None:
+        if not document:
+            return
+        self.version = document.get("version", 0)
+        self.epoch = document.get("epoch", "")
+        last_modified = document.get("last_modified")
+        if last_modified is not None:
+            self.last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+    async def refresh(self, database: AsyncIOMotorDatabase) -> bool:
+        """Reload the shared counter; True if another writer moved it."""
+        previous = (self.epoch, self.version)
+        self._observe(await database[META_COLLECTION].find_one({"_id": VERSION_DOCUMENT_ID}))
+        return (self.epoch, self.version) != previous
+
+    async def bump(self, database: AsyncIOMotorDatabase, count: int = 1) -> Tuple[int, bool]:
+        """Record ``count`` local writes.
+
+        Returns the new version - the local writes own the ``count`` versions
+        ending there - and whether writes by others were detected too.
+        """
+        expected = (self.epoch, self.version + count)
+        document = await database[META_COLLECTION].find_one_and_update(
+            {"_id": VERSION_DOCUMENT_ID},
+            {
+                "$inc": {"version": count},
+                "$set": {"last_modified": datetime.utcnow()},
+                "$setOnInsert": {"epoch": uuid.uuid4().hex},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._observe(document)
+        return self.version, (self.epoch, self.version) != expected
+
+    def etag(self, request: Request, version: Optional[int] = None) -> str:
+        # The URL is part of the tag: different queries over the same data differ
+        url = f"{request.url.path}?{request.url.query}"
+        variant = hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
+        return f'"{self.epoch[:8]}-{self.version if version is None else version}-{variant}"'
+
+    def cache_headers(self, request: Request, cache_control: str = PUBLIC_CACHE_CONTROL,
+                      version: Optional[int] = None) -> Dict[str, str]:
+        """Validators for a body built at ``version`` (default: the current one).
+
+        A body that lags behind the current version gets no ``Last-Modified``:
+        that date belongs to a newer write and would confirm the stale body.
+        """
+        headers = {"ETag": self.etag(request, version), "Cache-Control": cache_control}
+        if version is None or version == self.version:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against ``cache_headers``."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison (RFC 7232 3.2): a proxy that
+        # compresses the body may hand out W/ tags, which still match
+        tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque_tag(headers["ETag"]) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
@@ -0,0 +1,30 @@
+import React from 'react';
+
+const LoadMoreButton = ({ onClick, loading }) => {
+  return (
+    <div style={{ textAlign: 'center', margin: '20px 0' }}>
+      <button
+        onClick={onClick}
+        disabled={loading}
+        style={{
+          padding: '12px 30px',
+          background: 'linear-gradient(to right, #333, #555)',
+          color: 'white',
+          border: 'none',
+          borderRadius: '50px',
+          cursor: loading ? 'default' : 'pointer',
+          opacity: loading ? 0.6 : 1,
+          fontSize: '1rem',
+          fontWeight: '600',
+          transition: 'all 0.3s ease',
+          fontFamily: "'Segoe UI', Tahoma, Geneva, Verdana, sans-serif"
+        }}
+      >
+        <i className="fas fa-chevron-down mr-2"></i>
+        {loading ? 'Загрузка...' : 'Показать ещё'}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMoreButton;
@@ -0,0 +1,49 @@
+// Subscribes to the server-sent change events of the scammer database.
+// EventSource reconnects on its own and the server replays what was missed;
+// `onResync` is called when that is not possible and the data must be reloaded.
+// `onReady` gets the event source: only with 'change_stream' does the stream
+// carry the writes of every server worker.
+export const subscribeToChanges = (apiBase, { onReady, onChange, onStatistics, onResync }) => {
+  const source = new EventSource(`${apiBase}/scammers/events`);
+
+  source.addEventListener('ready', (event) => onReady(JSON.parse(event.data)));
+
+  source.addEventListener('change', (event) => onChange(JSON.parse(event.data)));
+  source.addEventListener('statistics', (event) => onStatistics(JSON.parse(event.data)));
+  source.addEventListener('resync', () => onResync());
+  // Dropped for falling behind; reconnecting resumes from the last event
+  source.addEventListener('overflow', () => {});
+
+  return () => source.close();
+};
+
+export const coversAllWorkers = (ready) => ready?.source === 'change_stream';
+
+const addCounts = (counts = {}, delta = {}) => {
+  const result = { ...counts };
+  Object.entries(delta).forEach(([key, value]) => {
+    result[key] = (result[key] || 0) + value;
+    if (result[key] <= 0) delete result[key];
+  });
+  return result;
+};
+
+export const applyStatisticsDelta = (stats, delta) => {
+  if (!stats) return stats;
+  return {
+    ...stats,
+    total_records: stats.total_records + delta.total_records,
+    active_threats: stats.active_threats + delta.active_threats,
+    verified: stats.verified + delta.verified,
+    by_status: addCounts(stats.by_status, delta.by_status),
+    by_scam_method: addCounts(stats.by_scam_method, delta.by_scam_method),
+  };
+};
+
+// Applies a change event to a list of records; safe to apply more than once
+export const applyChange = (rows, change) => {
+  const rest = rows.filter((row) => row.id !== change.id);
+  if (change.op === 'delete') return rest;
+  if (change.op === 'insert') return [change.record, ...rest];
+  return rows.map((row) => (row.id === change.id ? { ...row, ...change.record } : row));
+};
@@ -0,0 +1,18 @@
+import axios from 'axios';
+
+// Matches the API default page size, whose first public page is served from a snapshot
+export const PAGE_SIZE = 100;
+
+// Loads one page of a cursor-paginated list endpoint. nextCursor comes from
+// the X-Next-Cursor header and is null on the last page; pass it back to load
+// the following one when the user asks for more.
+export const fetchPage = async (url, cursor = null, params = {}) => {
+  const response = await axios.get(url, {
+    params: { ...params, limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+  });
+  return { rows: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+// Query parameters for a search on a list endpoint. The server does the
+// search, so it covers records that were not loaded yet
+export const searchParams = (term) => (term.trim() ? { search: term.trim() } : {});
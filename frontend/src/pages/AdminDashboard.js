@@ -1,19 +1,29 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { fetchPage, searchParams } from '../lib/pagination';
+import { applyChange, applyStatisticsDelta, coversAllWorkers, subscribeToChanges } from '../lib/events';
 import { useAuth } from '../contexts/AuthContext';
 import Layout from '../components/Layout';
 import Header from '../components/Header';
 import SearchBox from '../components/SearchBox';
 import ScammerTable from '../components/ScammerTable';
+import LoadMoreButton from '../components/LoadMoreButton';
 import ScammerDetailModal from '../components/ScammerDetailModal';
 import ScammerForm from '../components/ScammerForm';
 
 const AdminDashboard = () => {
   const [scammers, setScammers] = useState([]);
-  const [filteredScammers, setFilteredScammers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [stats, setStats] = useState(null);
+  // Cursor of the next page; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [searchTerm, setSearchTerm] = useState('');
+  // Search shown in the table; pages answering an older search are dropped
+  const activeSearch = useRef('');
+  // Whether pushed statistics include every write; until then refetch after our own
+  const [liveStatistics, setLiveStatistics] = useState(false);
   
   // Modal states
   const [detailModalOpen, setDetailModalOpen] = useState(false);
@@ -34,14 +44,27 @@ const AdminDashboard = () => {
     loadData();
   }, [isAuthenticated, navigate]);
 
+  // Live updates: statistics and changes made by other admins or bots are pushed
+  useEffect(() => {
+    if (!isAuthenticated) return undefined;
+    return subscribeToChanges(API_BASE, {
+      onReady: (ready) => setLiveStatistics(coversAllWorkers(ready)),
+      onChange: (change) => setScammers((rows) => applyChange(rows, change)),
+      onStatistics: (delta) => setStats((current) => applyStatisticsDelta(current, delta)),
+      onResync: () => loadData(),
+    });
+  }, [isAuthenticated]);
+
   const loadData = async () => {
     try {
       setLoading(true);
       
       // Load scammers (protected endpoint)
-      const scammersResponse = await axios.get(`${API_BASE}/scammers?limit=1000`);
-      setScammers(scammersResponse.data);
-      setFilteredScammers(scammersResponse.data);
+      // Only the first page; further pages are loaded on request
+      const page = await fetchPage(`${API_BASE}/scammers`, null, searchParams(activeSearch.current));
+      setScammers(page.rows);
+      setNextCursor(page.nextCursor);
+      setLoading(false);
       
       // Load statistics
       const statsResponse = await axios.get(`${API_BASE}/statistics`);
@@ -58,28 +81,75 @@ const AdminDashboard = () => {
     }
   };
 
-  const handleSearch = (searchTerm) => {
-    if (!searchTerm.trim()) {
-      setFilteredScammers(scammers);
-      return;
+  const loadMore = async () => {
+    const term = searchTerm;
+    try {
+      setLoadingMore(true);
+      const page = await fetchPage(`${API_BASE}/scammers`, nextCursor, searchParams(term));
+      if (activeSearch.current !== term) return;
+      setScammers((rows) => [...rows, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка загрузки данных:', error);
+    } finally {
+      setLoadingMore(false);
     }
+  };
+
+  // Without a change stream the push only carries this worker's writes, and our
+  // own write may have been handled by another one
+  const refreshStatistics = async () => {
+    if (liveStatistics) return;
+    try {
+      const statsResponse = await axios.get(`${API_BASE}/statistics`);
+      setStats(statsResponse.data);
+    } catch (error) {
+      console.error('Ошибка загрузки статистики:', error);
+    }
+  };
+
+  // Searches the whole database, not only the pages loaded so far
+  const handleSearch = async (term) => {
+    setSearchTerm(term);
+    activeSearch.current = term;
+    try {
+      setLoading(true);
+      const page = await fetchPage(`${API_BASE}/scammers`, null, searchParams(term));
+      if (activeSearch.current !== term) return;
+      setScammers(page.rows);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка поиска:', error);
+    } finally {
+      if (activeSearch.current === term) setLoading(false);
+    }
+  };
 
-    const filtered = scammers.filter(scammer =>
-      scammer.discord_id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      scammer.discord_name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-    
-    setFilteredScammers(filtered);
+  // The list only carries the summary view; details and edits need the full record
+  const loadFullScammer = async (scammer) => {
+    const response = await axios.get(`${API_BASE}/scammers/${scammer.id}`);
+    return response.data;
   };
 
-  const handleViewDetails = (scammer) => {
+  const handleViewDetails = async (scammer) => {
     setSelectedScammer(scammer);
     setDetailModalOpen(true);
+
+    try {
+      setSelectedScammer(await loadFullScammer(scammer));
+    } catch (error) {
+      console.error('Ошибка загрузки записи:', error);
+    }
   };
 
-  const handleEdit = (scammer) => {
-    setEditingScammer(scammer);
-    setFormModalOpen(true);
+  const handleEdit = async (scammer) => {
+    try {
+      setEditingScammer(await loadFullScammer(scammer));
+      setFormModalOpen(true);
+    } catch (error) {
+      console.error('Ошибка загрузки записи:', error);
+      alert('Ошибка при загрузке записи');
+    }
   };
 
   const handleDelete = async (scammer) => {
@@ -91,17 +161,10 @@ const AdminDashboard = () => {
       await axios.delete(`${API_BASE}/scammers/${scammer.id}`);
       
       // Remove from local state
-      const updatedScammers = scammers.filter(s => s.id !== scammer.id);
-      setScammers(updatedScammers);
-      setFilteredScammers(updatedScammers.filter(s => 
-        !filteredScammers.find(fs => fs.id === scammer.id) || 
-        updatedScammers.includes(s)
-      ));
-      
-      // Reload stats
-      const statsResponse = await axios.get(`${API_BASE}/statistics`);
-      setStats(statsResponse.data);
+      setScammers(scammers.filter(s => s.id !== scammer.id));
       
+      await refreshStatistics();
+
       alert('Мошенник успешно удален!');
     } catch (error) {
       console.error('Ошибка удаления:', error);
@@ -115,14 +178,10 @@ const AdminDashboard = () => {
       
       // Add to local state
       const newScammer = response.data;
-      const updatedScammers = [...scammers, newScammer];
-      setScammers(updatedScammers);
-      setFilteredScammers(updatedScammers);
-      
-      // Reload stats
-      const statsResponse = await axios.get(`${API_BASE}/statistics`);
-      setStats(statsResponse.data);
+      setScammers([...scammers, newScammer]);
       
+      await refreshStatistics();
+
       alert('Мошенник успешно добавлен в базу данных!');
     } catch (error) {
       console.error('Ошибка создания:', error);
@@ -138,19 +197,12 @@ const AdminDashboard = () => {
       
       // Update in local state
       const updatedScammer = response.data;
-      const updatedScammers = scammers.map(s => 
+      setScammers(scammers.map(s => 
         s.id === editingScammer.id ? updatedScammer : s
-      );
-      setScammers(updatedScammers);
-      setFilteredScammers(updatedScammers.filter(s => 
-        !filteredScammers.find(fs => fs.id === s.id) || 
-        filteredScammers.find(fs => fs.id === s.id)
       ));
       
-      // Reload stats
-      const statsResponse = await axios.get(`${API_BASE}/statistics`);
-      setStats(statsResponse.data);
-      
+      await refreshStatistics();
+
       alert('Запись успешно обновлена!');
     } catch (error) {
       console.error('Ошибка обновления:', error);
@@ -291,7 +343,7 @@ const AdminDashboard = () => {
         </div>
       ) : (
         <ScammerTable
-          scammers={filteredScammers}
+          scammers={scammers}
           onViewDetails={handleViewDetails}
           onEdit={handleEdit}
           onDelete={handleDelete}
@@ -299,6 +351,10 @@ const AdminDashboard = () => {
         />
       )}
 
+      {!loading && nextCursor && (
+        <LoadMoreButton onClick={loadMore} loading={loadingMore} />
+      )}
+
       {/* Modals */}
       <ScammerDetailModal
         isOpen={detailModalOpen}
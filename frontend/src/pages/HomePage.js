@@ -1,16 +1,23 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { fetchPage, searchParams } from '../lib/pagination';
 import Layout from '../components/Layout';
 import Header from '../components/Header';
 import SearchBox from '../components/SearchBox';
 import ScammerTable from '../components/ScammerTable';
+import LoadMoreButton from '../components/LoadMoreButton';
 import ScammerDetailModal from '../components/ScammerDetailModal';
 
 const HomePage = () => {
   const [scammers, setScammers] = useState([]);
-  const [filteredScammers, setFilteredScammers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [stats, setStats] = useState(null);
+  // Cursor of the next page; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [searchTerm, setSearchTerm] = useState('');
+  // Search shown in the table; pages answering an older search are dropped
+  const activeSearch = useRef('');
   const [selectedScammer, setSelectedScammer] = useState(null);
   const [detailModalOpen, setDetailModalOpen] = useState(false);
 
@@ -26,9 +33,11 @@ const HomePage = () => {
       setLoading(true);
       
       // Load scammers (public endpoint)
-      const scammersResponse = await axios.get(`${API_BASE}/scammers/public?limit=1000`);
-      setScammers(scammersResponse.data);
-      setFilteredScammers(scammersResponse.data);
+      // Only the first page; further pages are loaded on request
+      const page = await fetchPage(`${API_BASE}/scammers/public`);
+      setScammers(page.rows);
+      setNextCursor(page.nextCursor);
+      setLoading(false);
       
       // Load statistics
       const statsResponse = await axios.get(`${API_BASE}/statistics`);
@@ -41,23 +50,49 @@ const HomePage = () => {
     }
   };
 
-  const handleSearch = (searchTerm) => {
-    if (!searchTerm.trim()) {
-      setFilteredScammers(scammers);
-      return;
+  const loadMore = async () => {
+    const term = searchTerm;
+    try {
+      setLoadingMore(true);
+      const page = await fetchPage(`${API_BASE}/scammers/public`, nextCursor, searchParams(term));
+      if (activeSearch.current !== term) return;
+      setScammers((rows) => [...rows, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка загрузки данных:', error);
+    } finally {
+      setLoadingMore(false);
     }
+  };
 
-    const filtered = scammers.filter(scammer =>
-      scammer.discord_id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      scammer.discord_name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-    
-    setFilteredScammers(filtered);
+  // Searches the whole database, not only the pages loaded so far
+  const handleSearch = async (term) => {
+    setSearchTerm(term);
+    activeSearch.current = term;
+    try {
+      setLoading(true);
+      const page = await fetchPage(`${API_BASE}/scammers/public`, null, searchParams(term));
+      if (activeSearch.current !== term) return;
+      setScammers(page.rows);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка поиска:', error);
+    } finally {
+      if (activeSearch.current === term) setLoading(false);
+    }
   };
 
-  const handleViewDetails = (scammer) => {
+  const handleViewDetails = async (scammer) => {
     setSelectedScammer(scammer);
     setDetailModalOpen(true);
+
+    // The list only carries the summary view; load the full record for the modal
+    try {
+      const response = await axios.get(`${API_BASE}/scammers/public/${scammer.id}`);
+      setSelectedScammer(response.data);
+    } catch (error) {
+      console.error('Ошибка загрузки записи:', error);
+    }
   };
 
   return (
@@ -96,7 +131,7 @@ const HomePage = () => {
         </div>
       ) : (
         <ScammerTable
-          scammers={filteredScammers}
+          scammers={scammers}
           onViewDetails={handleViewDetails}
           showActions={true}
           onEdit={null}
@@ -104,6 +139,10 @@ const HomePage = () => {
         />
       )}
 
+      {!loading && nextCursor && (
+        <LoadMoreButton onClick={loadMore} loading={loadingMore} />
+      )}
+
       <ScammerDetailModal
         isOpen={detailModalOpen}
         onClose={() => setDetailModalOpen(false)}
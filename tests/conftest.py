@@ -0,0 +1,49 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend is a flat set of modules run from its own directory
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Tests never talk to MongoDB; the client is created but never used
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "scammer_test")
+os.environ.setdefault("SNAPSHOT_DEBOUNCE_SECONDS", "0")
+
+import server  # noqa: E402
+from tests.memory_db import MemoryClient, MemoryDatabase  # noqa: E402
+
+# The API runs on the in-process fake instead
+server.client = MemoryClient()
+server.db = server.client[os.environ["DB_NAME"]]
+
+ADMIN_USERNAME = "cyber_admin_2025"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def database():
+    return MemoryDatabase("test")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    from auth import create_access_token
+
+    # The admin account is created at startup; sign a token instead of hashing its password again
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': ADMIN_USERNAME})}"}
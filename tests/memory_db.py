@@ -0,0 +1,903 @@
+"""In-process fake of the part of the Motor API the app uses.
+
+Test and benchmark infrastructure, not a storage backend of the app: every
+module talks to storage through the ``database`` object handed out by
+``get_database``, so tests/conftest.py and benchmarks/bench_api.py replace
+``server.db`` with a ``MemoryClient`` database and run the API with no
+MongoDB at all. Nothing is persisted.
+
+Documents go through a BSON round trip on write, as with MongoDB, so callers
+get the same types back (naive UTC datetimes truncated to milliseconds,
+enums as their values); only the decoded form is kept, and reads hand out
+copies so callers never share mutable state with the store. The
+declared indexes are real in-memory structures:
+
+* every single-field index keeps a hash map from value to documents (one
+  entry per element for array fields), used for equality, ``$in`` and
+  ``$all`` lookups;
+* every index keeps its entries in key order, so queries sorted like an
+  index (for example the ``(created_at, id)`` list order) walk it and stop
+  after ``skip + limit`` matches instead of sorting the collection;
+* unique and partial unique indexes reject duplicates with
+  ``DuplicateKeyError`` / ``BulkWriteError`` like the server does.
+
+Supported query operators: ``$and``, ``$or``, ``$eq``, ``$ne``, ``$in``,
+``$nin``, ``$gt``, ``$gte``, ``$lt``, ``$lte``, ``$exists``, ``$regex`` and
+``$all``; updates: ``$set``, ``$unset``, ``$inc`` and ``$setOnInsert``;
+aggregation stages: ``$match``, ``$group``, ``$facet``, ``$sort``,
+``$limit`` and ``$count``.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import re
+import time
+
+import bson
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteOne, InsertOne, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+DUPLICATE_KEY_ERROR = 11000
+# Expired documents of TTL indexes are removed at most this often, like the server's TTL monitor
+TTL_SWEEP_SECONDS = 60
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+Document = Dict[str, Any]
+Filter = Dict[str, Any]
+SortSpec = List[Tuple[str, int]]
+_MISSING = object()
+
+
+# -- values -------------------------------------------------------------------
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _get(document: Document, path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+# BSON comparison order of the types the app stores
+_RANKS = {type(None): 1, int: 2, Int64: 2, float: 2, str: 3, dict: 4, list: 5, ObjectId: 7, bool: 8, datetime: 9}
+_SCALARS = (str, int, Int64, float, datetime, ObjectId, bool, type(None))
+
+
+def _type_rank(value: Any) -> int:
+    rank = _RANKS.get(type(value))
+    if rank is not None:
+        return rank
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    rank = _type_rank(value)
+    if rank == 1:
+        return (1, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+class _Descending:
+    """Inverts the order of a sort key component."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any):
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and other.key == self.key
+
+
+def _order_key(document: Document, spec: SortSpec) -> Tuple:
+    parts = []
+    for field, direction in spec:
+        key = _sort_key(_get(document, field))
+        parts.append(key if direction == ASCENDING else _Descending(key))
+    return tuple(parts)
+
+
+def _hashable(value: Any) -> Any:
+    if type(value) in _SCALARS:
+        return value
+    value = _plain(value)
+    if isinstance(value, list):
+        return ("__list__", tuple(_hashable(item) for item in value))
+    if isinstance(value, dict):
+        return ("__dict__", tuple((key, _hashable(item)) for key, item in value.items()))
+    return None if value is _MISSING else value
+
+
+def _normalize_sort(key_or_list: Union[str, SortSpec, Dict[str, int], None], direction: Optional[int] = None) -> Optional[SortSpec]:
+    if key_or_list is None:
+        return None
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else ASCENDING)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(field, order) for field, order in key_or_list]
+
+
+# -- query matching ------------------------------------------------------------
+
+@lru_cache(maxsize=1024)
+def _compile(pattern: str, options: str = "") -> "re.Pattern[str]":
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+
+def _candidates(value: Any) -> List[Any]:
+    # A query on an array field matches the array itself or any of its elements
+    if isinstance(value, list):
+        return [value, *value]
+    return [value]
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    expected = _plain(expected)
+    if expected is None:
+        return value is _MISSING or value is None or (isinstance(value, list) and None in value)
+    return any(candidate == expected and _type_rank(candidate) == _type_rank(expected) for candidate in _candidates(value))
+
+
+def _compare(value: Any, expected: Any, predicate: Callable[[Any, Any], bool]) -> bool:
+    expected = _plain(expected)
+    rank = _type_rank(expected)
+    return any(
+        _type_rank(candidate) == rank and candidate is not _MISSING and predicate(candidate, expected)
+        for candidate in _candidates(value)
+    )
+
+
+def _match_operators(value: Any, conditions: Dict[str, Any]) -> bool:
+    for operator, operand in conditions.items():
+        if operator == "$eq":
+            ok = _equals(value, operand)
+        elif operator == "$ne":
+            ok = not _equals(value, operand)
+        elif operator == "$in":
+            ok = any(_equals(value, item) for item in operand)
+        elif operator == "$nin":
+            ok = not any(_equals(value, item) for item in operand)
+        elif operator == "$gt":
+            ok = _compare(value, operand, lambda a, b: a > b)
+        elif operator == "$gte":
+            ok = _compare(value, operand, lambda a, b: a >= b)
+        elif operator == "$lt":
+            ok = _compare(value, operand, lambda a, b: a < b)
+        elif operator == "$lte":
+            ok = _compare(value, operand, lambda a, b: a <= b)
+        elif operator == "$exists":
+            ok = (value is not _MISSING) == bool(operand)
+        elif operator == "$regex":
+            pattern = operand if isinstance(operand, re.Pattern) else _compile(operand, conditions.get("$options", ""))
+            ok = any(isinstance(candidate, str) and pattern.search(candidate) for candidate in _candidates(value))
+        elif operator == "$options":
+            continue
+        elif operator == "$all":
+            ok = isinstance(value, list) and all(_equals(value, item) for item in operand)
+        else:
+            raise OperationFailure(f"Unsupported query operator {operator} in the memory engine")
+        if not ok:
+            return False
+    return True
+
+
+def matches(document: Document, query: Optional[Filter]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator {key} in the memory engine")
+        else:
+            value = _get(document, key)
+            if isinstance(condition, dict) and condition and all(name.startswith("$") for name in condition):
+                if not _match_operators(value, condition):
+                    return False
+            elif not _equals(value, condition):
+                return False
+    return True
+
+
+def _project(document: Document, projection: Optional[Dict[str, Any]]) -> Document:
+    if not projection:
+        return document
+    include_id = bool(projection.get("_id", True))
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    if included:
+        result = {"_id": document["_id"]} if include_id and "_id" in document else {}
+        for field in included:
+            if field in document:
+                result[field] = document[field]
+        return result
+    excluded = {field for field, flag in projection.items() if not flag}
+    return {field: value for field, value in document.items() if field not in excluded}
+
+
+# -- updates ---------------------------------------------------------------------
+
+def _apply_update(document: Document, update: Dict[str, Any], inserting: bool) -> Document:
+    if not update or not all(key.startswith("$") for key in update):
+        # Replacement document
+        return {"_id": document.get("_id"), **(update or {})}
+    result = dict(document)
+    for operator, fields in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            for field, value in fields.items():
+                result[field] = value
+        elif operator == "$setOnInsert":
+            continue
+        elif operator == "$unset":
+            for field in fields:
+                result.pop(field, None)
+        elif operator == "$inc":
+            for field, amount in fields.items():
+                result[field] = result.get(field, 0) + amount
+        else:
+            raise OperationFailure(f"Unsupported update operator {operator} in the memory engine")
+    return result
+
+
+def _upsert_seed(query: Filter) -> Document:
+    return {
+        field: value for field, value in query.items()
+        if not field.startswith("$") and not (isinstance(value, dict) and any(key.startswith("$") for key in value))
+    }
+
+
+# -- indexes ---------------------------------------------------------------------
+
+class _Index:
+    def __init__(
+        self,
+        name: str,
+        keys: SortSpec,
+        unique: bool = False,
+        partial_filter: Optional[Filter] = None,
+        expire_after_seconds: Optional[int] = None,
+    ):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.partial_filter = partial_filter
+        self.expire_after_seconds = expire_after_seconds
+        self.field = keys[0][0] if len(keys) == 1 else None
+        # All-descending indexes are kept ascending and walked backwards, which
+        # keeps key comparisons in C
+        self._descending = all(direction != ASCENDING for _, direction in keys)
+        self._order_spec = [(field, ASCENDING) for field, _ in keys] if self._descending else keys
+        # Array values make the index multikey; like MongoDB it then cannot provide a sort order
+        self.multikey = False
+        # (order key, insertion counter, _id) in index order
+        self._ordered: List[Tuple[Tuple, int, Any]] = []
+        self._entries: Dict[Any, Tuple[Tuple, int]] = {}
+        self._counter = 0
+        # Single-field indexes: value -> set of _id
+        self._hash: Dict[Any, set] = {}
+        # Unique indexes: key values -> _id
+        self._unique: Dict[Tuple, Any] = {}
+
+    def info(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"v": 2, "key": list(self.keys)}
+        if self.unique:
+            info["unique"] = True
+        if self.partial_filter is not None:
+            info["partialFilterExpression"] = self.partial_filter
+        if self.expire_after_seconds is not None:
+            info["expireAfterSeconds"] = self.expire_after_seconds
+        return info
+
+    def covers(self, document: Document) -> bool:
+        return self.partial_filter is None or matches(document, self.partial_filter)
+
+    def _unique_key(self, document: Document) -> Tuple:
+        return tuple(_hashable(_get(document, field)) for field, _ in self.keys)
+
+    def conflict(self, document: Document) -> Optional[Any]:
+        """The _id of another document holding the same unique key, if any."""
+        if not self.unique or not self.covers(document):
+            return None
+        existing = self._unique.get(self._unique_key(document))
+        return existing if existing is not None and existing != document["_id"] else None
+
+    def add(self, document: Document, keep_order: bool = True) -> None:
+        if not self.covers(document):
+            return
+        _id = document["_id"]
+        if not self.multikey:
+            if any(isinstance(_get(document, field), list) for field, _ in self.keys):
+                self.multikey = True
+                self._ordered, self._entries = [], {}
+            else:
+                self._counter += 1
+                entry = (_order_key(document, self._order_spec), self._counter)
+                self._entries[_id] = entry
+                if keep_order:
+                    insort(self._ordered, (*entry, _id))
+                else:
+                    self._ordered.append((*entry, _id))
+        if self.field is not None:
+            value = _get(document, self.field)
+            for item in (value if isinstance(value, list) and value else [value]):
+                self._hash.setdefault(_hashable(item), set()).add(_id)
+        if self.unique:
+            self._unique[self._unique_key(document)] = _id
+
+    def finish_build(self) -> None:
+        """Sort once after documents were added with ``keep_order=False``."""
+        self._ordered.sort()
+
+    def remove(self, document: Document) -> None:
+        _id = document["_id"]
+        entry = self._entries.pop(_id, None)
+        if entry is not None:
+            del self._ordered[bisect_left(self._ordered, (*entry, _id))]
+        if self.field is not None:
+            value = _get(document, self.field)
+            for item in (value if isinstance(value, list) and value else [value]):
+                ids = self._hash.get(_hashable(item))
+                if ids is not None:
+                    ids.discard(_id)
+                    if not ids:
+                        del self._hash[_hashable(item)]
+        if self.unique:
+            self._unique.pop(self._unique_key(document), None)
+
+    def lookup(self, value: Any) -> set:
+        return self._hash.get(_hashable(value), set())
+
+    def range(self, condition: Dict[str, Any]) -> Optional[set]:
+        """Ids whose value may satisfy a $gt/$gte/$lt/$lte condition, or None.
+
+        Bounds of a different type than the values are fine: the result is a
+        superset that the caller filters with ``matches`` anyway.
+        """
+        if self.field is None or self.multikey or not condition or not set(condition) <= RANGE_OPERATORS:
+            return None
+        low = condition.get("$gte", condition.get("$gt"))
+        high = condition.get("$lte", condition.get("$lt"))
+        bound = low if low is not None else high
+        if bound is None:
+            return None
+        rank = _sort_key(bound)[0]
+        # A one-sided range stays within the type of its bound, like in MongoDB
+        start = ((_sort_key(low),), float("inf") if "$gt" in condition else -1) if low is not None else (((rank,),),)
+        stop = ((_sort_key(high),), -1 if "$lt" in condition else float("inf")) if high is not None else (((rank + 1,),),)
+        first, last = bisect_left(self._ordered, start), bisect_left(self._ordered, stop)
+        return {entry[2] for entry in self._ordered[first:last]}
+
+    def ids_in_order(self, reverse: bool) -> Iterator[Any]:
+        entries = reversed(self._ordered) if reverse != self._descending else iter(self._ordered)
+        return (entry[2] for entry in entries)
+
+
+# -- cursors ---------------------------------------------------------------------
+
+class MemoryCursor:
+    """Lazy result set with the chainable part of the Motor cursor API."""
+
+    def __init__(self, run: Callable[["MemoryCursor"], List[Document]]):
+        self._run = run
+        self.sort_spec: Optional[SortSpec] = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self._results: Optional[Iterator[Document]] = None
+
+    def sort(self, key_or_list: Union[str, SortSpec], direction: Optional[int] = None) -> "MemoryCursor":
+        self.sort_spec = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self.skip_count = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size: int) -> "MemoryCursor":
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Document]:
+        results = list(self._iterate())
+        return results if length is None else results[:length]
+
+    def _iterate(self) -> Iterator[Document]:
+        if self._results is None:
+            self._results = iter(self._run(self))
+        return self._results
+
+    def __aiter__(self) -> "MemoryCursor":
+        return self
+
+    async def __anext__(self) -> Document:
+        try:
+            return next(self._iterate())
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self) -> None:
+        self._results = iter(())
+
+
+def _normalize(document: Document) -> Document:
+    # A BSON round trip leaves exactly the types a client would read back
+    return bson.decode(bson.encode(document))
+
+
+def _clone(value: Any) -> Any:
+    """Copy of a stored document; everything but dicts and lists is immutable."""
+    if type(value) is dict:
+        return {key: _clone(item) if type(item) in (dict, list) else item for key, item in value.items()}
+    return [_clone(item) if type(item) in (dict, list) else item for item in value]
+
+
+def _read(document: Document, projection: Optional[Dict[str, Any]]) -> Document:
+    """What a client reads back: a projected copy of a stored document."""
+    if not projection:
+        return _clone(document)
+    # Projecting already builds a new dict; only nested values still need copying
+    result = _project(document, projection)
+    for key, value in result.items():
+        if type(value) in (dict, list):
+            result[key] = _clone(value)
+    return result
+
+
+# -- collections -----------------------------------------------------------------
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._documents: Dict[Any, Document] = {}
+        self._indexes: Dict[str, _Index] = {"_id_": _Index("_id_", [("_id", ASCENDING)], unique=True)}
+        self._swept_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    # indexes
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return {name: index.info() for name, index in self._indexes.items()}
+
+    async def create_index(self, keys: Union[str, SortSpec], name: Optional[str] = None, unique: bool = False,
+                           partialFilterExpression: Optional[Filter] = None,
+                           expireAfterSeconds: Optional[int] = None, **kwargs) -> str:
+        spec = _normalize_sort(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in spec)
+        for existing in self._indexes.values():
+            if existing.keys == spec:
+                if existing.name == name and existing.unique == unique:
+                    return name
+                raise OperationFailure(f"Index with keys {spec} already exists as {existing.name}", code=85)
+        index = _Index(name, spec, unique, partialFilterExpression, expireAfterSeconds)
+        for stored in self._documents.values():
+            if index.conflict(stored) is not None:
+                raise DuplicateKeyError(f"E11000 duplicate key error building index {name}", DUPLICATE_KEY_ERROR)
+            index.add(stored, keep_order=False)
+        index.finish_build()
+        self._indexes[name] = index
+        return name
+
+    async def drop_index(self, name: str) -> None:
+        if name == "_id_" or name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        del self._indexes[name]
+
+    # writes
+
+    def _check_unique(self, document: Document) -> None:
+        for index in self._indexes.values():
+            if index.conflict(document) is not None:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name}",
+                    DUPLICATE_KEY_ERROR,
+                    {"index": 0, "code": DUPLICATE_KEY_ERROR, "keyPattern": dict(index.keys)},
+                )
+
+    def _store(self, stored: Document, previous: Optional[Document] = None) -> None:
+        if previous is not None:
+            for index in self._indexes.values():
+                index.remove(previous)
+        self._documents[stored["_id"]] = stored
+        for index in self._indexes.values():
+            index.add(stored)
+
+    def _unstore(self, stored: Document) -> None:
+        for index in self._indexes.values():
+            index.remove(stored)
+        del self._documents[stored["_id"]]
+
+    def _insert(self, document: Document) -> Any:
+        # Like the driver, assign the _id on the caller's document
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = _normalize(document)
+        if stored["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", DUPLICATE_KEY_ERROR)
+        self._check_unique(stored)
+        self._store(stored)
+        return stored["_id"]
+
+    def _replace(self, previous: Document, document: Document) -> bool:
+        stored = _normalize(document)
+        if stored == previous:
+            return False
+        self._check_unique(stored)
+        self._store(stored, previous)
+        return True
+
+    async def insert_one(self, document: Document, **kwargs) -> InsertOneResult:
+        self._sweep()
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[Document], ordered: bool = True, **kwargs) -> InsertManyResult:
+        self._sweep()
+        inserted, errors = [], []
+        for position, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as exc:
+                errors.append({"index": position, "code": exc.code, "errmsg": str(exc), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted, True)
+
+    def _update(self, query: Filter, update: Dict[str, Any], upsert: bool, sort: Optional[SortSpec] = None
+                ) -> Tuple[Optional[Document], Optional[Document], bool]:
+        """Update the first match; returns the previous version, the new document and whether it changed."""
+        previous = next(self._matching(query, sort), None)
+        if previous is None:
+            if not upsert:
+                return None, None, False
+            document = _apply_update(_upsert_seed(query), update, inserting=True)
+            self._insert(document)
+            return None, document, True
+        document = _apply_update(_clone(previous), update, inserting=False)
+        changed = self._replace(previous, document)
+        return previous, document, changed
+
+    async def update_one(self, query: Filter, update: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        previous, document, changed = self._update(query, update, upsert)
+        raw = {"n": 1 if document is not None else 0, "nModified": 1 if previous is not None and changed else 0}
+        if previous is None and document is not None:
+            raw["upserted"] = document["_id"]
+        return UpdateResult(raw, True)
+
+    async def update_many(self, query: Filter, update: Dict[str, Any], **kwargs) -> UpdateResult:
+        matched = modified = 0
+        for previous in list(self._matching(query)):
+            matched += 1
+            modified += self._replace(previous, _apply_update(_clone(previous), update, inserting=False))
+        return UpdateResult({"n": matched, "nModified": modified}, True)
+
+    async def find_one_and_update(self, query: Filter, update: Dict[str, Any], projection: Optional[Dict] = None,
+                                  sort: Optional[SortSpec] = None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Optional[Document]:
+        previous, document, _ = self._update(query, update, upsert, _normalize_sort(sort))
+        if return_document == ReturnDocument.AFTER:
+            return None if document is None else _read(self._documents[document["_id"]], projection)
+        return None if previous is None else _read(previous, projection)
+
+    async def find_one_and_delete(self, query: Filter, projection: Optional[Dict] = None,
+                                  sort: Optional[SortSpec] = None, **kwargs) -> Optional[Document]:
+        stored = next(self._matching(query, _normalize_sort(sort)), None)
+        if stored is None:
+            return None
+        self._unstore(stored)
+        return _read(stored, projection)
+
+    async def delete_one(self, query: Filter, **kwargs) -> DeleteResult:
+        stored = next(self._matching(query), None)
+        if stored is not None:
+            self._unstore(stored)
+        return DeleteResult({"n": 0 if stored is None else 1}, True)
+
+    async def delete_many(self, query: Filter, **kwargs) -> DeleteResult:
+        victims = list(self._matching(query))
+        for stored in victims:
+            self._unstore(stored)
+        return DeleteResult({"n": len(victims)}, True)
+
+    async def bulk_write(self, requests: Sequence[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                  "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+        for position, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, UpdateOne):
+                    previous, document, changed = self._update(request._filter, request._doc, bool(request._upsert))
+                    if previous is not None:
+                        result["nMatched"] += 1
+                        result["nModified"] += changed
+                    elif document is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": position, "_id": document["_id"]})
+                elif isinstance(request, DeleteOne):
+                    stored = next(self._matching(request._filter), None)
+                    if stored is not None:
+                        self._unstore(stored)
+                        result["nRemoved"] += 1
+                else:
+                    raise OperationFailure(f"Unsupported bulk operation {type(request).__name__} in the memory engine")
+            except DuplicateKeyError as exc:
+                result["writeErrors"].append({"index": position, "code": exc.code, "errmsg": str(exc)})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # reads
+
+    def _plan(self, query: Filter) -> Optional[set]:
+        """Candidate _ids from a hash or ordered index, or None when no index applies."""
+        best: Optional[set] = None
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            index = next((
+                index for index in self._indexes.values()
+                if index.field == field and (
+                    index.partial_filter is None or index.partial_filter == {field: {"$exists": True}}
+                )
+            ), None)
+            if index is None:
+                continue
+            if isinstance(condition, dict) and condition and all(name.startswith("$") for name in condition):
+                if "$eq" in condition and condition["$eq"] is not None:
+                    ids = index.lookup(condition["$eq"])
+                elif "$in" in condition and None not in condition["$in"]:
+                    ids = set().union(*(index.lookup(value) for value in condition["$in"]))
+                elif "$all" in condition and condition["$all"]:
+                    ids = set.intersection(*(index.lookup(value) for value in condition["$all"]))
+                else:
+                    ids = index.range(condition)
+                    if ids is None:
+                        continue
+            elif condition is None or isinstance(condition, (dict, list)):
+                continue
+            else:
+                ids = index.lookup(condition)
+            if best is None or len(ids) < len(best):
+                best = ids
+        if query.get("$or"):
+            # Like an OR stage: usable only when every branch is index-backed
+            branches = [self._plan(branch) for branch in query["$or"]]
+            if all(ids is not None for ids in branches):
+                ids = set().union(*branches)
+                if best is None or len(ids) < len(best):
+                    best = ids
+        return best
+
+    def _ordered_index(self, sort: SortSpec) -> Optional[Tuple[_Index, bool]]:
+        inverse = [(field, -direction) for field, direction in sort]
+        for index in self._indexes.values():
+            if index.partial_filter is not None or index.multikey:
+                continue
+            if index.keys == sort:
+                return index, False
+            if index.keys == inverse:
+                return index, True
+        return None
+
+    def _matching(self, query: Optional[Filter], sort: Optional[SortSpec] = None) -> Iterator[Document]:
+        query = query or {}
+        candidates = self._plan(query)
+        if candidates is None and sort:
+            ordered = self._ordered_index(sort)
+            if ordered is not None:
+                # Already in the requested order: stream it, callers stop at their limit
+                index, reverse = ordered
+                pool = (self._documents[_id] for _id in index.ids_in_order(reverse))
+                return (stored for stored in pool if matches(stored, query))
+        if candidates is None:
+            pool = list(self._documents.values())
+        else:
+            pool = [self._documents[_id] for _id in candidates]
+        hits = [stored for stored in pool if matches(stored, query)]
+        if sort:
+            hits.sort(key=lambda stored: _order_key(stored, sort))
+        return iter(hits)
+
+    def find(self, query: Optional[Filter] = None, projection: Optional[Dict] = None, sort: Optional[SortSpec] = None,
+             skip: int = 0, limit: int = 0, **kwargs) -> MemoryCursor:
+        def run(cursor: MemoryCursor) -> List[Document]:
+            self._sweep()
+            end = cursor.skip_count + cursor.limit_count if cursor.limit_count else None
+            results = []
+            for position, stored in enumerate(self._matching(query, cursor.sort_spec)):
+                if end is not None and position >= end:
+                    break
+                if position >= cursor.skip_count:
+                    results.append(_read(stored, projection))
+            return results
+
+        cursor = MemoryCursor(run)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, query: Optional[Filter] = None, projection: Optional[Dict] = None,
+                       sort: Optional[SortSpec] = None, **kwargs) -> Optional[Document]:
+        if query is not None and not isinstance(query, dict):
+            query = {"_id": query}
+        results = await self.find(query, projection, sort=sort, limit=1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, query: Filter, **kwargs) -> int:
+        return sum(1 for _ in self._matching(query))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._documents)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> MemoryCursor:
+        return MemoryCursor(lambda cursor: _run_pipeline([_clone(stored) for stored in self._matching({})], pipeline))
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("Change streams are not supported by the memory engine")
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._swept_at < TTL_SWEEP_SECONDS:
+            return
+        self._swept_at = now
+        for index in list(self._indexes.values()):
+            if index.expire_after_seconds is None or index.field is None:
+                continue
+            cutoff = datetime.utcnow() - timedelta(seconds=index.expire_after_seconds)
+            for stored in list(self._matching({index.field: {"$lt": cutoff}})):
+                self._unstore(stored)
+
+
+# -- aggregation -----------------------------------------------------------------
+
+def _evaluate(expression: Any, document: Document) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(document, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        return {key: _evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+def _group(documents: List[Document], spec: Dict[str, Any]) -> List[Document]:
+    groups: Dict[Any, Document] = {}
+    for document in documents:
+        key = _evaluate(spec["_id"], document)
+        group = groups.get(_hashable(key))
+        if group is None:
+            group = groups[_hashable(key)] = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (operator, expression), = accumulator.items()
+            value = _evaluate(expression, document)
+            if operator == "$sum":
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif operator in ("$max", "$min"):
+                current = group.get(field)
+                better = max if operator == "$max" else min
+                group[field] = value if current is None else better(current, value, key=_sort_key)
+            elif operator == "$first":
+                group.setdefault(field, value)
+            elif operator == "$last":
+                group[field] = value
+            else:
+                raise OperationFailure(f"Unsupported accumulator {operator} in the memory engine")
+    return list(groups.values())
+
+
+def _run_pipeline(documents: List[Document], pipeline: List[Dict[str, Any]]) -> List[Document]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$facet":
+            documents = [{field: _run_pipeline(list(documents), sub) for field, sub in spec.items()}]
+        elif name == "$sort":
+            documents = sorted(documents, key=lambda document: _order_key(document, list(spec.items())))
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$skip":
+            documents = documents[spec:]
+        elif name == "$count":
+            documents = [{spec: len(documents)}] if documents else []
+        elif name == "$project":
+            documents = [_project(document, spec) for document in documents]
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage {name} in the memory engine")
+    return documents
+
+
+# -- database and client ---------------------------------------------------------
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command: Union[str, Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the memory engine")
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(name)
+        return database
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+import cache
+from auth import create_access_token, get_current_user, invalidate_user, user_cache
+from cache import TTLCache
+from models import User
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire(clock):
+    entries = TTLCache(4, ttl_seconds=10)
+    entries.set("a", 1)
+    entries.set("b", 2, ttl_seconds=30)
+    clock.now += 9
+    assert entries.get("a") == 1
+    clock.now += 1
+    # A longer ttl than the cache's own is capped
+    assert entries.get("a") is None and entries.get("b") is None
+    assert (entries.hits, entries.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    entries = TTLCache(2, ttl_seconds=10)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+    assert entries.get("b") is None
+    assert (entries.get("a"), entries.get("c")) == (1, 3)
+
+
+def test_expired_or_disabled_entries_are_not_stored(clock):
+    TTLCache(0, ttl_seconds=10).set("a", 1)
+    entries = TTLCache(2, ttl_seconds=10)
+    entries.set("a", 1, ttl_seconds=-5)
+    assert len(entries) == 0
+
+
+def test_invalidate_where():
+    entries = TTLCache(4, ttl_seconds=10)
+    for key, value in [("a", 1), ("b", 2), ("c", 3)]:
+        entries.set(key, value)
+    assert entries.invalidate_where(lambda value: value % 2) == 2
+    assert len(entries) == 1
+
+
+@pytest.fixture
+def session(database):
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+def _credentials(username):
+    token = create_access_token(data={"sub": username}, expires_delta=timedelta(minutes=5))
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.anyio
+async def test_current_user_is_cached_until_invalidated(database, session):
+    await database.users.insert_one(User(username="cached", password_hash="x").model_dump())
+    credentials = _credentials("cached")
+    user = await get_current_user(credentials, database)
+    await database.users.delete_many({})
+
+    # The token is not decoded nor the user read again while it is cached
+    assert await get_current_user(credentials, database) is user
+    assert invalidate_user("cached") == 1
+    with pytest.raises(HTTPException) as raised:
+        await get_current_user(credentials, database)
+    assert raised.value.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_rejected_tokens_are_not_cached(database, session):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-token")
+    with pytest.raises(HTTPException):
+        await get_current_user(credentials, database)
+    with pytest.raises(HTTPException):
+        await get_current_user(_credentials("nobody"), database)
+    assert len(user_cache) == 0
+
+
+@pytest.mark.anyio
+async def test_cache_entry_never_outlives_the_token(database, session):
+    await database.users.insert_one(User(username="short", password_hash="x").model_dump())
+    token = create_access_token(data={"sub": "short"}, expires_delta=timedelta(seconds=2))
+    await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), database)
+    expires_at, _ = user_cache._entries[token]
+    assert expires_at - auth.time.monotonic() <= 2
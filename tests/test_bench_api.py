@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# The benchmarks are scripts next to the backend, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "benchmarks"))
+
+import bench_api  # noqa: E402
+from bench_api import Session, make_document, print_results, run_scenario, seed, summarize  # noqa: E402
+
+
+def test_summary_percentiles():
+    summary = summarize([float(value) for value in range(1, 101)], errors=2, seconds=4)
+    assert (summary["requests"], summary["errors"], summary["throughput_rps"]) == (100, 2, 25.0)
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.5, 95.05, 99.01)
+    assert summarize([3.0], 0, 1)["p99_ms"] == 3.0
+
+
+@pytest.mark.anyio
+async def test_seed_reuses_a_dataset_of_the_right_size(database):
+    await seed(database, 5)
+    first = await database.scammers.find_one({"discord_id": str(bench_api.FIRST_DISCORD_ID)})
+    await seed(database, 5)
+    assert await database.scammers.find_one({"discord_id": str(bench_api.FIRST_DISCORD_ID)}) == first
+    await seed(database, 3)
+    assert await database.scammers.count_documents({}) == 3
+
+
+def test_documents_are_searchable_records():
+    document = make_document(4, bench_api.datetime(2025, 1, 1))
+    assert document["discord_id"] == str(bench_api.FIRST_DISCORD_ID + 4)
+    assert document["status"] == "inactive" and document["search_grams"]
+
+
+@pytest.mark.anyio
+async def test_only_the_measured_run_is_recorded():
+    def respond(request):
+        return httpx.Response(500 if request.url.path == "/fail" else 200)
+
+    async def scenario(session, rng):
+        await session.request("ok", "GET", "/ok")
+        await session.request("fail", "GET", "/fail")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(respond), base_url="http://bench") as client:
+        session = Session(client, {})
+        result = await run_scenario(scenario, session, concurrency=2, duration=0, warmup=0, seed_value=0)
+
+    # A zero duration still collects MIN_SAMPLES per label, and no warm-up samples
+    ok, fail = result["endpoints"]["ok"], result["endpoints"]["fail"]
+    assert ok["requests"] == fail["requests"] == bench_api.MIN_SAMPLES
+    assert (ok["errors"], fail["errors"]) == (0, bench_api.MIN_SAMPLES)
+    assert not session.recording
+
+
+def test_baseline_comparison(capsys):
+    endpoint = {"throughput_rps": 10.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0, "errors": 0}
+    results = {"scenarios": {"s": {"endpoints": {"a": endpoint, "b": {**endpoint, "p50_ms": 10.2}}}}}
+    baseline = {"scenarios": {"s": {"endpoints": {"a": {**endpoint, "p50_ms": 20.0}, "b": endpoint}}}}
+    print_results(results, baseline)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].endswith("p50 -50.0% faster")
+    assert lines[2].endswith("p50 +2.0%")
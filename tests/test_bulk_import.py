@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from bulk_import import import_scammers, iter_csv_rows, iter_lines, iter_ndjson_rows
+from indexes import ensure_indexes
+from models import ImportRowStatus, RecordFormat
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+async def test_lines_split_across_chunks():
+    # BOM, CRLF endings, a multi-byte character cut between chunks and no final newline
+    data = "﻿a,b\r\nпривет\nlast".encode()
+    cut = data.index("п".encode()) + 1
+    lines = await collect(iter_lines(chunked(data[:cut], data[cut:])))
+    assert lines == ["a,b", "привет", "last"]
+
+
+async def test_ndjson_rows():
+    lines = chunked(b'{"a": 1}\n\n[1]\n{broken\n{"b": 2}\n')
+    rows = await collect(iter_ndjson_rows(iter_lines(lines)))
+    assert rows[0] == (1, {"a": 1})
+    assert rows[1] == (2, "Row must be a JSON object")
+    assert rows[2][0] == 3 and rows[2][1].startswith("Invalid JSON")
+    assert rows[3] == (4, {"b": 2})
+
+
+async def test_csv_rows_with_quoted_newlines():
+    body = b'discord_id,description\n1,"two\nlines, and ""quotes"""\n\n2,plain\n3\n'
+    rows = await collect(iter_csv_rows(iter_lines(chunked(body))))
+    assert rows == [
+        (1, {"discord_id": "1", "description": 'two\nlines, and "quotes"'}),
+        (2, {"discord_id": "2", "description": "plain"}),
+        (3, "Expected 2 columns, got 1"),
+    ]
+
+
+async def test_csv_unterminated_quote():
+    rows = await collect(iter_csv_rows(iter_lines(chunked(b'discord_id,description\n1,"never closed\n'))))
+    assert rows == [(1, "Unterminated quoted field")]
+
+
+async def test_too_long_lines_are_dropped_unbuffered():
+    # A 50-character line without a newline, delivered in 10-byte chunks
+    body = b"short\n" + b"x" * 50 + b"\nafter\n" + b"y" * 50
+    chunks = [body[i:i + 10] for i in range(0, len(body), 10)]
+    lines = await collect(iter_lines(chunked(*chunks), max_length=20))
+    assert lines == ["short", None, "after", None]
+
+
+async def test_too_long_rows_are_rejected():
+    lines = iter_lines(chunked(b'{"a": 1}\n{"b": "' + b"x" * 50 + b'"}\n{"c": 3}\n'), max_length=20)
+    rows = await collect(iter_ndjson_rows(lines, max_length=20))
+    assert rows == [(1, {"a": 1}), (2, "Record exceeds 20 characters"), (3, {"c": 3})]
+
+
+async def test_too_long_csv_record_is_skipped_to_its_end():
+    # The quoted field keeps the record open over several short lines
+    body = b'a,b\n1,"' + b"long\n" * 10 + b'end"\n2,ok\n'
+    rows = await collect(iter_csv_rows(iter_lines(chunked(body), max_length=20), max_length=20))
+    assert rows == [(1, "Record exceeds 20 characters"), (2, {"a": "2", "b": "ok"})]
+
+
+async def test_malformed_records_are_invalid_rows():
+    csv_rows = await collect(iter_csv_rows(iter_lines(chunked(b'a,b\nx,a"b\nc"d\n2,ok\n'))))
+    assert csv_rows[0][0] == 1 and csv_rows[0][1].startswith("Invalid CSV")
+    assert csv_rows[1] == (2, {"a": "2", "b": "ok"})
+
+    nested = b"[" * 100000 + b"]" * 100000
+    json_rows = await collect(iter_ndjson_rows(iter_lines(chunked(nested + b'\n{"a": 1}\n'))))
+    assert json_rows[0][0] == 1 and json_rows[0][1].startswith("Invalid JSON")
+    assert json_rows[1] == (2, {"a": 1})
+
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+def record(discord_id, **fields):
+    return {"discord_id": discord_id, "discord_name": "name", "scam_method": "m", "description": "d", **fields}
+
+
+async def test_import_reports_every_row(database):
+    await ensure_indexes(database)
+    inserted = []
+
+    async def on_inserted(documents):
+        inserted.extend(documents)
+
+    body = ndjson(
+        record("123456789012345678"),
+        record("123456789012345679"),
+        record("123456789012345678"),
+        record("not-an-id"),
+        {"discord_id": "123456789012345680"},
+        record("123456789012345681"),
+    )
+    report = await import_scammers(database, chunked(body), RecordFormat.NDJSON, on_inserted, batch_size=2)
+
+    assert (report.total_rows, report.inserted, report.duplicates, report.invalid) == (6, 3, 1, 2)
+    assert report.inserted_rows == [[1, 2], [6, 6]]
+    assert sorted((row.row, row.status) for row in report.rows) == [
+        (3, ImportRowStatus.DUPLICATE), (4, ImportRowStatus.INVALID), (5, ImportRowStatus.INVALID),
+    ]
+    assert [document["discord_id"] for document in inserted] == [
+        "123456789012345678", "123456789012345679", "123456789012345681",
+    ]
+    assert await database.scammers.count_documents({}) == 3
+
+
+async def test_import_csv(database):
+    await ensure_indexes(database)
+
+    async def on_inserted(documents):
+        pass
+
+    body = b"discord_id,discord_name,scam_method,description\n123456789012345678,name,m,\"multi\nline\"\n"
+    report = await import_scammers(database, chunked(body), RecordFormat.CSV, on_inserted)
+    assert (report.total_rows, report.inserted) == (1, 1)
+    stored = await database.scammers.find_one({"discord_id": "123456789012345678"})
+    assert stored["description"] == "multi\nline"
+    assert stored["status"] == "active"
+
+
+def test_import_endpoint_reports_malformed_records(client, admin_headers):
+    body = b'discord_id,discord_name,scam_method,description\n610000000000000001,a"b\nc"d,m,d\n610000000000000002,ok,m,d\n'
+    response = client.post("/api/scammers/import", params={"format": "csv"}, content=body,
+                           headers={**admin_headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total_rows"], report["inserted"], report["invalid"]) == (2, 1, 1)
+    assert report["rows"][0]["detail"].startswith("Invalid CSV")
@@ -0,0 +1,191 @@
+from datetime import datetime
+import uuid
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import bulk_ops
+from indexes import ensure_indexes
+from models import BulkStatusRequest
+
+
+@pytest.fixture
+def create(client, admin_headers):
+    # Every test tags its records with its own scam method, so filters only see them
+    method = f"bulk-{uuid.uuid4().hex[:8]}"
+
+    def create_scammer(**fields):
+        response = client.post("/api/scammers", headers=admin_headers, json={
+            "discord_id": str(300000000000000000 + uuid.uuid4().int % 10 ** 17),
+            "discord_name": "bulk", "scam_method": method, "description": "d", **fields,
+        })
+        assert response.status_code == 200
+        return response.json()
+
+    create_scammer.method = method
+    return create_scammer
+
+
+def outcomes(result):
+    return {item["id"]: item["outcome"] for item in result["results"]}
+
+
+def test_requires_authentication(client):
+    response = client.post("/api/scammers/bulk/delete", json={"ids": ["x"]})
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"ids": ["a"], "filter": {"status": "active"}},
+    {"filter": {}},
+    {"filter": {"status": None}},
+])
+def test_rejects_ambiguous_or_empty_selections(client, admin_headers, body):
+    response = client.post("/api/scammers/bulk/delete", headers=admin_headers, json=body)
+    assert response.status_code == 422
+
+
+def test_status_change_by_ids(client, admin_headers, create):
+    first, second = create(), create()
+    response = client.post("/api/scammers/bulk/status", headers=admin_headers, json={
+        "ids": [first["id"], second["id"], "missing"], "status": "inactive",
+    })
+    assert response.status_code == 200
+    result = response.json()
+    # updated_at is always set, so every matched record counts as modified
+    assert (result["matched"], result["modified"], result["deleted"]) == (2, 2, 0)
+    assert outcomes(result) == {first["id"]: "updated", second["id"]: "updated", "missing": "not_found"}
+    assert client.get(f"/api/scammers/{first['id']}", headers=admin_headers).json()["status"] == "inactive"
+
+
+def test_update_by_filter_updates_indexes_and_statistics(client, admin_headers, create):
+    records = [create() for _ in range(3)]
+    before = client.get("/api/statistics").json()
+    response = client.post("/api/scammers/bulk/update", headers=admin_headers, json={
+        "filter": {"scam_method": create.method}, "update": {"status": "inactive"},
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["matched"], result["modified"], result["has_more"]) == (3, 3, False)
+
+    after = client.get("/api/statistics").json()
+    assert after["active_threats"] == before["active_threats"] - 3
+    assert after["by_status"]["inactive"] == before["by_status"].get("inactive", 0) + 3
+    for record in records:
+        assert client.get(f"/api/check/{record['discord_id']}").json()["flagged"] is False
+
+
+def test_filter_selection_is_capped(client, admin_headers, create, monkeypatch):
+    monkeypatch.setattr(bulk_ops, "MAX_BULK_IDS", 2)
+    for _ in range(3):
+        create()
+    selection = {"filter": {"scam_method": create.method}}
+
+    first = client.post("/api/scammers/bulk/delete", headers=admin_headers, json=selection).json()
+    assert (first["deleted"], first["has_more"]) == (2, True)
+    second = client.post("/api/scammers/bulk/delete", headers=admin_headers, json=selection).json()
+    assert (second["deleted"], second["has_more"]) == (1, False)
+
+
+def test_delete_by_ids(client, admin_headers, create):
+    record = create()
+    response = client.post("/api/scammers/bulk/delete", headers=admin_headers, json={"ids": [record["id"], record["id"]]})
+    result = response.json()
+    assert (result["matched"], result["deleted"]) == (1, 1)
+    assert outcomes(result) == {record["id"]: "deleted"}
+    assert client.get(f"/api/scammers/{record['id']}", headers=admin_headers).status_code == 404
+
+    again = client.post("/api/scammers/bulk/delete", headers=admin_headers, json={"ids": [record["id"]]}).json()
+    assert outcomes(again) == {record["id"]: "not_found"}
+
+
+def test_discord_id_cannot_be_bulk_assigned(client, admin_headers, create):
+    record = create()
+    response = client.post("/api/scammers/bulk/update", headers=admin_headers, json={
+        "ids": [record["id"]], "update": {"discord_id": "123456789012345678"},
+    })
+    # Unknown fields are ignored, so nothing changes
+    assert response.json()["modified"] == 0
+    assert client.get(f"/api/scammers/{record['id']}", headers=admin_headers).json()["discord_id"] == record["discord_id"]
+
+
+def scammer(n, **fields):
+    return {"id": f"id-{n}", "discord_id": str(400000000000000000 + n), "discord_name": f"n{n}",
+            "scam_method": "m", "description": "d", "status": "active",
+            "created_at": datetime(2025, 1, 1), "updated_at": datetime(2025, 1, 1), **fields}
+
+
+async def seed(database, count):
+    await ensure_indexes(database)
+    await database.scammers.insert_many([scammer(n) for n in range(count)])
+    published = []
+
+    async def on_changed(changes):
+        published.extend(changes)
+
+    return published, on_changed
+
+
+def by_ids(*ids):
+    return BulkStatusRequest(ids=list(ids), status="inactive")
+
+
+@pytest.mark.anyio
+async def test_one_bulk_write_per_call(database, monkeypatch):
+    published, on_changed = await seed(database, 3)
+    calls = []
+    bulk_write = database.scammers.bulk_write
+
+    async def counting(requests, **kwargs):
+        calls.append(len(requests))
+        return await bulk_write(requests, **kwargs)
+
+    monkeypatch.setattr(database.scammers, "bulk_write", counting)
+    result = await bulk_ops.bulk_update(database, by_ids("id-0", "id-1", "id-2"), {"status": "inactive"}, on_changed)
+    assert calls == [3]
+    assert result.matched == 3 and len(published) == 3
+
+
+@pytest.mark.anyio
+async def test_record_changed_after_the_selection_is_skipped(database, monkeypatch):
+    published, on_changed = await seed(database, 2)
+    bulk_write = database.scammers.bulk_write
+
+    async def racing(requests, **kwargs):
+        # Another writer updates id-1 between the selection read and the bulk write
+        await database.scammers.update_one({"id": "id-1"}, {"$set": {"updated_at": datetime(2025, 2, 1)}})
+        return await bulk_write(requests, **kwargs)
+
+    monkeypatch.setattr(database.scammers, "bulk_write", racing)
+    result = await bulk_ops.bulk_delete(database, by_ids("id-0", "id-1"), on_changed)
+    assert outcomes(result.model_dump()) == {"id-0": "deleted", "id-1": "not_found"}
+    assert [before["id"] for before, _ in published] == ["id-0"]
+    assert await database.scammers.count_documents({"id": "id-1"}) == 1
+
+
+@pytest.mark.anyio
+async def test_write_errors_keep_the_committed_writes(database):
+    published, on_changed = await seed(database, 2)
+    # Both records cannot take the same discord_id: the unique index rejects one write
+    result = await bulk_ops.bulk_update(
+        database, by_ids("id-0", "id-1"), {"discord_id": "499999999999999999"}, on_changed,
+    )
+    assert sorted(outcomes(result.model_dump()).values()) == ["failed", "updated"]
+    assert result.matched == 1
+    assert len(published) == 1 and published[0][1]["discord_id"] == "499999999999999999"
+
+
+@pytest.mark.anyio
+async def test_committed_writes_are_published_when_the_call_fails(database, monkeypatch):
+    published, on_changed = await seed(database, 2)
+    bulk_write = database.scammers.bulk_write
+
+    async def interrupted(requests, **kwargs):
+        await bulk_write(requests[:1], **kwargs)
+        raise AutoReconnect("connection lost")
+
+    monkeypatch.setattr(database.scammers, "bulk_write", interrupted)
+    with pytest.raises(AutoReconnect):
+        await bulk_ops.bulk_update(database, by_ids("id-0", "id-1"), {"status": "inactive"}, on_changed)
+    assert [(before["id"], after["status"]) for before, after in published] == [("id-1", "inactive")]
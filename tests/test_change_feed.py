@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import change_feed
+from change_feed import (
+    CHANGES_COLLECTION, CursorExpired, InvalidChangeCursor, change_entries, decode_change_cursor,
+    encode_change_cursor, read_change_log, read_changes, record_changes
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def scammer(n, status="active"):
+    return {"id": f"id-{n}", "discord_id": str(100000000000000000 + n), "discord_name": f"n{n}",
+            "scam_method": "m", "description": "d", "status": status,
+            "created_at": datetime(2025, 1, 1), "updated_at": datetime(2025, 1, 1)}
+
+
+async def log(database, seqs, age_seconds=0):
+    at = datetime.utcnow() - timedelta(seconds=age_seconds)
+    await database[CHANGES_COLLECTION].insert_many([
+        {**entry, "at": at} for seq in seqs for entry in change_entries([(None, scammer(seq))], seq)
+    ])
+
+
+def seqs(page):
+    return [entry["seq"] for entry in page]
+
+
+def test_entries_record_what_changed():
+    before, after = scammer(1), scammer(1, status="inactive")
+    inserted, updated, deleted = change_entries([(None, after), (before, after), (before, None)], 12)
+    assert [entry["seq"] for entry in (inserted, updated, deleted)] == [10, 11, 12]
+    assert [entry["op"] for entry in (inserted, updated, deleted)] == ["insert", "update", "delete"]
+    assert inserted["previous"] is None
+    assert updated["previous"] == {"status": "active", "scam_method": "m", "discord_id": before["discord_id"]}
+    assert deleted["record"] is None and deleted["discord_id"] == before["discord_id"]
+
+
+def test_cursor_round_trip():
+    assert decode_change_cursor(encode_change_cursor("epoch", 42)) == ("epoch", 42)
+    with pytest.raises(InvalidChangeCursor):
+        decode_change_cursor("bogus")
+
+
+async def test_pages_in_order(database):
+    await log(database, range(1, 8))
+    page, has_more = await read_change_log(database, 7, 0, 3)
+    assert (seqs(page), has_more) == ([1, 2, 3], True)
+    page, has_more = await read_change_log(database, 7, 3, 10)
+    assert (seqs(page), has_more) == ([4, 5, 6, 7], False)
+
+
+async def test_stops_at_a_recent_gap(database):
+    # seq 3 is assigned but its writer has not logged it yet
+    await log(database, [1, 2, 4, 5])
+    page, has_more = await read_change_log(database, 5, 0, 10)
+    assert (seqs(page), has_more) == ([1, 2], True)
+
+    page, has_more = await read_change_log(database, 5, 2, 10)
+    assert (seqs(page), has_more) == ([], True)
+
+
+async def test_skips_a_gap_once_it_timed_out(database):
+    await log(database, [1, 2, 4, 5], age_seconds=change_feed.GAP_TIMEOUT_SECONDS + 5)
+    page, has_more = await read_change_log(database, 5, 0, 10)
+    assert (seqs(page), has_more) == ([1, 2, 4, 5], False)
+
+
+async def test_gap_at_the_start_of_a_recent_page(database):
+    # The oldest retained entry is still reachable, the missing one is just late
+    await log(database, [1, 2])
+    await log(database, [4])
+    page, has_more = await read_change_log(database, 4, 2, 10)
+    assert (seqs(page), has_more) == ([], True)
+
+
+async def test_expired_cursor(database):
+    # The TTL already removed 1..3
+    await log(database, [4, 5])
+    with pytest.raises(CursorExpired):
+        await read_change_log(database, 5, 1, 10)
+    page, _ = await read_change_log(database, 5, 3, 10)
+    assert seqs(page) == [4, 5]
+
+
+async def test_empty_log_behind_the_head_is_expired(database):
+    with pytest.raises(CursorExpired):
+        await read_change_log(database, 3, 0, 10)
+    page, has_more = await read_change_log(database, 0, 0, 10)
+    assert (page, has_more) == ([], False)
+
+
+async def test_read_changes_checks_the_epoch(database):
+    await log(database, [1, 2])
+    head = await read_changes(database, "epoch", 2, None)
+    assert head.changes == [] and decode_change_cursor(head.next_cursor) == ("epoch", 2)
+
+    page = await read_changes(database, "epoch", 2, encode_change_cursor("epoch", 0))
+    assert [change.seq for change in page.changes] == [1, 2]
+    assert decode_change_cursor(page.next_cursor) == ("epoch", 2)
+
+    with pytest.raises(CursorExpired):
+        await read_changes(database, "other", 2, encode_change_cursor("epoch", 0))
+
+
+async def test_record_changes_can_be_retried(database):
+    await database[CHANGES_COLLECTION].create_index("seq", unique=True)
+    changes = [(None, scammer(1)), (None, scammer(2))]
+    await record_changes(database, changes, 2)
+    # A retry after a partial failure keeps what was logged
+    await record_changes(database, changes, 2)
+    page, _ = await read_change_log(database, 2, 0, 10)
+    assert seqs(page) == [1, 2]
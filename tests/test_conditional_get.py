@@ -0,0 +1,113 @@
+from starlette.requests import Request
+import pytest
+
+import server
+from versioning import DataVersion
+
+
+def first_page(client, **headers):
+    # The snapshot of the default page is rebuilt in the background after writes
+    server.public_snapshot.cancel()
+    client.portal.call(server.public_snapshot.rebuild)
+    return client.get("/api/scammers/public", headers=headers)
+
+
+def test_each_content_coding_has_its_own_etag(client):
+    identity = first_page(client, **{"Accept-Encoding": "identity"})
+    compressed = first_page(client, **{"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in identity.headers
+    assert compressed.headers["ETag"] != identity.headers["ETag"]
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+
+
+def test_not_modified_only_for_the_same_coding(client):
+    compressed = first_page(client, **{"Accept-Encoding": "gzip"})
+    etag = compressed.headers["ETag"]
+
+    again = client.get("/api/scammers/public", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+
+    # The gzip tag must not confirm an identity body
+    plain = client.get("/api/scammers/public", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert plain.status_code == 200
+    assert plain.json() == compressed.json()
+
+
+def test_live_pages_keep_the_plain_etag(client):
+    response = client.get("/api/scammers/public", params={"limit": 3}, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gzip"')
+
+
+@pytest.mark.parametrize("if_none_match", [
+    "{etag}", "W/{etag}", '"other", W/{etag}', "*",
+])
+def test_if_none_match_uses_the_weak_comparison(client, if_none_match):
+    etag = client.get("/api/statistics").headers["ETag"]
+    response = client.get("/api/statistics", headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+
+
+def test_other_tags_do_not_match(client):
+    response = client.get("/api/statistics", headers={"If-None-Match": 'W/"other", "0-0-0"'})
+    assert response.status_code == 200
+
+
+def test_writes_change_the_etag(client, admin_headers):
+    before = client.get("/api/statistics").headers["ETag"]
+    client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": "790000000000000001", "discord_name": "tagged", "scam_method": "m", "description": "d",
+    })
+    response = client.get("/api/statistics", headers={"If-None-Match": before})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != before
+
+
+def test_each_query_has_its_own_etag(client):
+    first = client.get("/api/scammers/public", params={"limit": 2}).headers["ETag"]
+    second = client.get("/api/scammers/public", params={"limit": 3}).headers["ETag"]
+    assert first != second
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/api/statistics").headers["Last-Modified"]
+    assert client.get("/api/statistics", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/api/statistics", headers={
+        "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT",
+    }).status_code == 200
+    assert client.get("/api/statistics", headers={"If-Modified-Since": "yesterday"}).status_code == 200
+
+    # If-None-Match wins when both are sent
+    assert client.get("/api/statistics", headers={
+        "If-Modified-Since": last_modified, "If-None-Match": '"other"',
+    }).status_code == 200
+
+
+def _request(path="/api/statistics"):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+@pytest.mark.anyio
+async def test_data_version_is_shared_through_the_database(database):
+    writer, reader = DataVersion(), DataVersion()
+    # Creating the counter starts a new epoch, which counts as a foreign change
+    assert await writer.bump(database) == (1, True)
+    assert await reader.refresh(database)
+    assert (reader.epoch, reader.version) == (writer.epoch, 1)
+
+    # The reader's bump detects the writer's earlier one
+    assert await writer.bump(database, 2) == (3, False)
+    assert await reader.bump(database) == (4, True)
+    assert not await reader.refresh(database)
+
+
+def test_lagging_bodies_get_no_last_modified():
+    version = DataVersion()
+    version.version = 5
+    assert "Last-Modified" in version.cache_headers(_request())
+    headers = version.cache_headers(_request(), version=4)
+    assert "Last-Modified" not in headers
+    assert headers["ETag"] != version.cache_headers(_request())["ETag"]
@@ -0,0 +1,103 @@
+import pytest
+from pydantic import ValidationError
+
+import migrations
+import search
+import similarity
+from indexes import ensure_indexes
+from membership import MembershipIndex
+from migrations import BackfillBlocked, backfill_completed, backfill_discord_id_num, run_backfills
+from models import Scammer, discord_id_number, parse_discord_id
+
+UNICODE_DIGITS = ["²" * 18, "᧚" * 18, "١" * 18]
+
+
+@pytest.mark.parametrize("discord_id", UNICODE_DIGITS)
+def test_only_ascii_digits_parse(discord_id):
+    assert parse_discord_id(discord_id) is None
+    with pytest.raises(ValueError):
+        discord_id_number(discord_id)
+    with pytest.raises(ValidationError):
+        Scammer(discord_id=discord_id, discord_name="n", scam_method="m", description="d")
+
+
+def test_valid_id_parses():
+    assert parse_discord_id("012345678901234567") == 12345678901234567
+    assert Scammer(discord_id="123456789012345678", discord_name="n", scam_method="m",
+                   description="d").discord_id_num == 123456789012345678
+
+
+@pytest.mark.parametrize("discord_id", UNICODE_DIGITS)
+def test_create_rejects_unicode_digits(client, admin_headers, discord_id):
+    response = client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": discord_id, "discord_name": "n", "scam_method": "m", "description": "d",
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("numeric", [False, True])
+def test_search_with_unicode_digits(client, monkeypatch, numeric):
+    monkeypatch.setattr(search, "_numeric_discord_ids", numeric)
+    response = client.get("/api/scammers/public", params={"search": "᧚᧚᧚᧚᧚"})
+    assert response.status_code == 200
+
+
+def test_indexes_skip_unicode_digit_ids():
+    document = {"discord_id": "᧚" * 18, "discord_name": "name", "status": "active"}
+    assert similarity._entry(document) is None
+    index = MembershipIndex()
+    index.apply([(None, document)])
+    assert not index.is_flagged("᧚" * 18)
+
+
+def _legacy(discord_id, record_id=None):
+    return {"id": record_id or discord_id, "discord_id": discord_id, "discord_name": "n", "search_grams": []}
+
+
+@pytest.mark.anyio
+async def test_backfill_adds_the_numeric_id(database):
+    await database.scammers.insert_many([
+        _legacy("830000000000000001"), _legacy("830000000000000002"), _legacy("not-an-id"), _legacy("²" * 18),
+    ])
+    assert await backfill_discord_id_num(database, batch_size=1) == 2
+    stored = {doc["discord_id"]: doc.get("discord_id_num") async for doc in database.scammers.find({})}
+    assert stored == {
+        "830000000000000001": 830000000000000001, "830000000000000002": 830000000000000002,
+        "not-an-id": None, "²" * 18: None,
+    }
+    assert await backfill_discord_id_num(database) == 0
+
+
+@pytest.mark.anyio
+async def test_backfill_reports_shared_ids(database):
+    await ensure_indexes(database)
+    # Written before the string index existed: two records share an ID
+    await database.scammers.drop_index("discord_id_unique")
+    await database.scammers.insert_many([_legacy("830000000000000003", "a"), _legacy("830000000000000003", "b")])
+    with pytest.raises(BackfillBlocked, match="830000000000000003"):
+        await backfill_discord_id_num(database)
+
+
+@pytest.mark.anyio
+async def test_finished_backfill_switches_to_numeric_ids(database, monkeypatch):
+    monkeypatch.setattr(search, "_numeric_discord_ids", False)
+    await database.scammers.insert_one(_legacy("830000000000000004"))
+    assert (await run_backfills(database))["discord_id_num"] == 1
+    assert await backfill_completed(database, "discord_id_num")
+    assert search.discord_ids_filter(["830000000000000004"]) == {"discord_id_num": 830000000000000004}
+    assert search.discord_id_prefix_filter("83") == {
+        "discord_id_num": {"$gte": 830000000000000000, "$lt": 840000000000000000},
+    }
+
+
+@pytest.mark.anyio
+async def test_blocked_backfill_keeps_string_ids(database, monkeypatch):
+    monkeypatch.setattr(search, "_numeric_discord_ids", False)
+
+    async def blocked(database, batch_size):
+        raise BackfillBlocked("2 records share a Discord ID")
+
+    monkeypatch.setitem(migrations.BACKFILLS, "discord_id_num", blocked)
+    assert "discord_id_num" not in await run_backfills(database)
+    assert not await backfill_completed(database, "discord_id_num")
+    assert search.discord_ids_filter(["830000000000000005"]) == {"discord_id": "830000000000000005"}
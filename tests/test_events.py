@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+import server
+from change_feed import change_entries, encode_change_cursor, record_changes
+from events import EventBroker, TooManyClientSubscribers, TooManySubscribers, event_stream, replay
+
+EPOCH = "e" * 32
+
+
+def _record(scammer_id, status="active"):
+    return {"id": scammer_id, "discord_id": "810000000000000001", "status": status, "scam_method": "m"}
+
+
+def _entries(first_seq, count):
+    changes = [(None, _record(f"r{first_seq + offset}")) for offset in range(count)]
+    return changes, first_seq + count - 1
+
+
+def change_entries_for(first_seq, count=1):
+    return change_entries(*_entries(first_seq, count))
+
+
+def parse_events(body):
+    events = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def test_each_client_has_its_own_allowance():
+    broker = EventBroker(max_subscribers=10, max_per_client=2)
+    first = broker.subscribe("10.0.0.1")
+    broker.subscribe("10.0.0.1")
+    with pytest.raises(TooManyClientSubscribers):
+        broker.subscribe("10.0.0.1")
+    # Other clients are not affected
+    broker.subscribe("10.0.0.2")
+
+    broker.unsubscribe(first)
+    broker.unsubscribe(first)
+    broker.subscribe("10.0.0.1")
+    assert broker.per_client == {"10.0.0.1": 2, "10.0.0.2": 1}
+
+
+def test_overall_cap_still_applies():
+    broker = EventBroker(max_subscribers=2, max_per_client=2)
+    broker.subscribe("a")
+    broker.subscribe("b")
+    with pytest.raises(TooManySubscribers):
+        broker.subscribe("c")
+
+
+def test_endpoint_limits_a_client(client, monkeypatch):
+    broker = EventBroker(max_per_client=1)
+    monkeypatch.setattr(server, "event_broker", broker)
+    # TestClient connects from "testclient"
+    broker.subscribe("testclient")
+    response = client.get("/api/scammers/events")
+    assert response.status_code == 429
+
+
+@pytest.mark.anyio
+async def test_stream_sends_ready_then_published_changes(database):
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    stream = event_stream(broker, subscriber, b"")
+    first = await stream.__anext__()
+    assert first.startswith(b"retry: ")
+    assert parse_events(first) == [("ready", None, {"source": "local"})]
+
+    changes, last_seq = _entries(1, 2)
+    broker.publish(await record_changes(database, changes, last_seq), EPOCH)
+    events = parse_events(await stream.__anext__())
+    assert [(event, event_id) for event, event_id, _ in events] == [
+        ("change", encode_change_cursor(EPOCH, 1)), ("change", encode_change_cursor(EPOCH, 2)), ("statistics", None),
+    ]
+    assert events[0][2]["op"] == "insert" and events[0][2]["record"]["id"] == "r1"
+    assert events[2][2]["total_records"] == 2 and events[2][2]["active_threats"] == 2
+
+    await stream.aclose()
+    assert len(broker) == 0
+
+
+@pytest.mark.anyio
+async def test_slow_subscribers_are_disconnected():
+    broker = EventBroker(queue_size=1)
+    subscriber = broker.subscribe()
+    stream = event_stream(broker, subscriber, b"")
+    await stream.__anext__()
+    for seq in (1, 2):
+        broker.publish(change_entries_for(seq), EPOCH)
+
+    assert parse_events(await stream.__anext__()) == [("overflow", None, {})]
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert (len(broker), broker.slow_disconnects) == (0, 1)
+
+
+@pytest.mark.anyio
+async def test_replayed_entries_are_not_sent_twice():
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    subscriber.after_seq = 2
+    stream = event_stream(broker, subscriber, b"")
+    await stream.__anext__()
+    broker.publish(change_entries_for(1, 2), EPOCH)
+    broker.publish(change_entries_for(2, 2), EPOCH)
+    events = parse_events(await stream.__anext__())
+    assert [event_id for _, event_id, _ in events] == [encode_change_cursor(EPOCH, 3), None]
+    await stream.aclose()
+
+
+@pytest.mark.anyio
+async def test_replay_sends_what_the_client_missed(database):
+    changes, last_seq = _entries(1, 3)
+    await record_changes(database, changes, last_seq)
+
+    backlog, after_seq, resync = await replay(database, EPOCH, 3, encode_change_cursor(EPOCH, 1))
+    assert (after_seq, resync) == (3, False)
+    assert [event_id for _, event_id, _ in parse_events(backlog)] == [
+        encode_change_cursor(EPOCH, 2), encode_change_cursor(EPOCH, 3), None,
+    ]
+    assert await replay(database, EPOCH, 3, encode_change_cursor(EPOCH, 3)) == (b"", 3, False)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("last_event_id", [encode_change_cursor("other", 1), "not a cursor"])
+async def test_unusable_event_ids_resync(database, last_event_id):
+    changes, last_seq = _entries(1, 1)
+    await record_changes(database, changes, last_seq)
+    assert await replay(database, EPOCH, 1, last_event_id) == (b"", 0, True)
+
+
+@pytest.mark.anyio
+async def test_expired_event_ids_resync(database):
+    changes, last_seq = _entries(5, 1)
+    await record_changes(database, changes, last_seq)
+    assert await replay(database, EPOCH, 5, encode_change_cursor(EPOCH, 1)) == (b"", 0, True)
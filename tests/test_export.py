@@ -0,0 +1,60 @@
+import csv
+from datetime import datetime
+import io
+import json
+
+import pytest
+
+from export import export_filter, stream_export
+from models import RecordFormat, ScammerStatus
+
+pytestmark = pytest.mark.anyio
+
+
+def scammer(n, status="active", **fields):
+    return {"id": f"id-{n}", "discord_id": str(700000000000000000 + n), "discord_name": f"имя {n}",
+            "scam_method": "m", "description": 'two\nlines, "quoted"', "status": status,
+            "created_at": datetime(2025, 1, n), "updated_at": datetime(2025, 1, n), **fields}
+
+
+async def export(database, record_format, query=None, fields=("id", "description", "created_at"), batch_size=2):
+    chunks = [chunk async for chunk in stream_export(database, record_format, query or {}, list(fields), batch_size)]
+    return chunks, b"".join(chunks).decode()
+
+
+async def test_ndjson_in_creation_order_and_batches(database):
+    await database.scammers.insert_many([scammer(3), scammer(1), scammer(2)])
+    chunks, body = await export(database, RecordFormat.NDJSON)
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row["id"] for row in rows] == ["id-1", "id-2", "id-3"]
+    assert rows[0] == {"id": "id-1", "description": 'two\nlines, "quoted"', "created_at": "2025-01-01T00:00:00"}
+    # Two documents per chunk
+    assert len(chunks) == 2
+
+
+async def test_csv_round_trips_through_a_csv_reader(database):
+    await database.scammers.insert_many([scammer(1), scammer(2)])
+    chunks, body = await export(database, RecordFormat.CSV, fields=("discord_name", "description"))
+    assert chunks[0] == b"discord_name,description\n"
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert rows == [{"discord_name": f"имя {n}", "description": 'two\nlines, "quoted"'} for n in (1, 2)]
+
+
+async def test_filter_by_status_and_creation_date(database):
+    await database.scammers.insert_many([scammer(1), scammer(2, "inactive"), scammer(3), scammer(4)])
+    query = export_filter(ScammerStatus.ACTIVE, datetime(2025, 1, 2), datetime(2025, 1, 4))
+    _, body = await export(database, RecordFormat.NDJSON, query, fields=("id",))
+    assert [json.loads(line)["id"] for line in body.splitlines()] == ["id-3"]
+
+
+def test_endpoint_streams_with_a_download_name(client, admin_headers):
+    response = client.get("/api/scammers/export", params={"format": "csv", "fields": "id,discord_id"},
+                          headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == 'attachment; filename="scammers.csv"'
+    assert response.text.splitlines()[0] == "id,discord_id"
+
+
+def test_endpoint_rejects_unknown_fields_and_anonymous_users(client, admin_headers):
+    assert client.get("/api/scammers/export", params={"fields": "password"}, headers=admin_headers).status_code == 400
+    assert client.get("/api/scammers/export").status_code in (401, 403)
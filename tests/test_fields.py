@@ -0,0 +1,66 @@
+import pytest
+
+from serialization import (
+    SCAMMER_RESPONSE_FIELDS, SUMMARY_FIELDS, parse_fields, resolve_view, select_fields,
+)
+
+DISCORD_ID = "780000000000000001"
+
+
+def test_parse_fields_keeps_the_declared_order():
+    assert parse_fields(" status, id ,,discord_id") == ["id", "discord_id", "status"]
+    assert parse_fields(None) == SCAMMER_RESPONSE_FIELDS
+    with pytest.raises(ValueError, match="Unknown fields: password, x"):
+        parse_fields("id,x,password")
+
+
+def test_named_views():
+    assert resolve_view(None) == resolve_view("summary") == SUMMARY_FIELDS
+    assert "description" not in SUMMARY_FIELDS
+    assert resolve_view("full") == SCAMMER_RESPONSE_FIELDS
+
+
+def test_select_fields_drops_internal_fields():
+    documents = [{"id": "a", "created_at": 1, "discord_name": "n"}]
+    assert select_fields(documents, ["id", "created_at", "discord_name"]) is documents
+    assert select_fields(documents, ["discord_name"]) == [{"discord_name": "n"}]
+
+
+@pytest.fixture(scope="module")
+def record(client, admin_headers):
+    return client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": DISCORD_ID, "discord_name": "fielded", "scam_method": "m", "description": "long text",
+    }).json()
+
+
+@pytest.mark.parametrize("fields, expected", [
+    (None, set(SUMMARY_FIELDS)),
+    ("full", set(SCAMMER_RESPONSE_FIELDS)),
+    ("discord_name,status", {"discord_name", "status"}),
+])
+def test_list_routes_return_the_requested_view(client, admin_headers, record, fields, expected):
+    params = {"search": "fielded"} if fields is None else {"search": "fielded", "fields": fields}
+    for path, headers in (("/api/scammers/public", None), ("/api/scammers", admin_headers)):
+        [row] = client.get(path, headers=headers, params=params).json()
+        assert set(row) == expected
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/api/scammers/public", params={"fields": "id,password_hash"})
+    assert response.status_code == 400
+
+
+def test_public_detail_returns_the_full_record(client, record):
+    response = client.get(f"/api/scammers/public/{record['id']}")
+    assert response.status_code == 200
+    assert response.json()["description"] == "long text"
+    assert client.get("/api/scammers/public/missing").status_code == 404
+
+
+def test_list_schema_documents_every_fields_view(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    for path in ("/api/scammers/public", "/api/scammers"):
+        items = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["items"]
+        assert {option["$ref"].rsplit("/", 1)[1] for option in items["anyOf"]} == {
+            "ScammerSummary", "ScammerResponse", "ScammerFields",
+        }
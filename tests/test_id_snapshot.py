@@ -0,0 +1,65 @@
+from array import array
+
+import pytest
+
+from id_snapshot import HEADER, IDSnapshot, InvalidSnapshot, encode_snapshot
+
+IDS = array("Q", [111111111111111111, 222222222222222222, 333333333333333333])
+EPOCH = "0123456789abcdef" + "0" * 16
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(body):
+        path = tmp_path / "flagged.bin"
+        path.write_bytes(body)
+        return str(path)
+    return write
+
+
+def test_round_trip(write):
+    with IDSnapshot(write(encode_snapshot(IDS, version=7, epoch=EPOCH))) as snapshot:
+        assert (len(snapshot), snapshot.version, snapshot.epoch) == (3, 7, EPOCH[:16])
+        assert snapshot.is_flagged("222222222222222222")
+        assert 333333333333333333 in snapshot
+        assert not snapshot.is_flagged(222222222222222223)
+        assert not snapshot.is_flagged("not a number")
+        assert not snapshot.is_flagged(2 ** 64)
+        assert not snapshot.is_flagged("²" * 18)
+
+
+def test_status_bitmap(write):
+    with IDSnapshot(write(encode_snapshot(IDS, active=[True, False, True]))) as snapshot:
+        assert [snapshot.is_flagged(discord_id) for discord_id in IDS] == [True, False, True]
+
+
+def test_empty_snapshot(write):
+    with IDSnapshot(write(encode_snapshot(array("Q")))) as snapshot:
+        assert len(snapshot) == 0 and not snapshot.is_flagged(1)
+
+
+@pytest.mark.parametrize("corrupt, message", [
+    (lambda body: body[:10], "too short"),
+    (lambda body: b"XXXX" + body[4:], "Not an ID snapshot"),
+    (lambda body: body[:4] + b"\x09\x00" + body[6:], "Unsupported format version"),
+    (lambda body: body[:-5] + body[-4:], "does not match"),
+    (lambda body: body[:HEADER.size] + b"\xff" + body[HEADER.size + 1:], "Checksum"),
+])
+def test_damaged_files_are_rejected(write, corrupt, message):
+    with pytest.raises(InvalidSnapshot, match=message):
+        IDSnapshot(write(corrupt(encode_snapshot(IDS))))
+
+
+def test_download_matches_the_check_endpoint(client, admin_headers, write):
+    discord_id = "820000000000000001"
+    client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": discord_id, "discord_name": "snapshot", "scam_method": "m", "description": "d",
+    })
+    response = client.get("/api/check/snapshot")
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == 'attachment; filename="flagged-ids.bin"'
+    assert client.get("/api/check/snapshot", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    with IDSnapshot(write(response.content)) as snapshot:
+        assert snapshot.is_flagged(discord_id)
+        assert not snapshot.is_flagged("820000000000000002")
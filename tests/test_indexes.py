@@ -0,0 +1,60 @@
+import pytest
+from pymongo import ASCENDING
+
+from indexes import INDEXES, IndexSpec, ensure_indexes
+
+pytestmark = pytest.mark.anyio
+
+SPECS = [
+    IndexSpec("scammers", "id_unique", (("id", ASCENDING),), unique=True),
+    IndexSpec("scammers", "status", (("status", ASCENDING),)),
+]
+
+
+async def test_creates_missing_indexes_once(database):
+    first = await ensure_indexes(database, SPECS)
+    assert first.created == ["scammers.id_unique", "scammers.status"]
+
+    second = await ensure_indexes(database, SPECS)
+    assert (second.created, second.present) == ([], ["scammers.id_unique", "scammers.status"])
+    assert not second.has_drift
+
+
+async def test_check_only_reports(database):
+    report = await ensure_indexes(database, SPECS, create=False)
+    assert report.missing == ["scammers.id_unique", "scammers.status"]
+    assert report.has_drift
+    assert set(await database.scammers.index_information()) <= {"_id_"}
+
+
+async def test_index_under_another_name_is_not_duplicated(database):
+    await database.scammers.create_index([("status", ASCENDING)], name="by_hand")
+    report = await ensure_indexes(database, SPECS)
+    assert "scammers.status" in report.present
+    assert "status" not in await database.scammers.index_information()
+
+
+async def test_conflicting_options_are_rebuilt_only_on_request(database):
+    await database.scammers.create_index([("id", ASCENDING)], name="id_unique")
+    report = await ensure_indexes(database, SPECS)
+    assert report.conflicting == ["scammers.id_unique"] and report.has_drift
+    assert not (await database.scammers.index_information())["id_unique"].get("unique")
+
+    await ensure_indexes(database, SPECS, drop_conflicting=True)
+    assert (await database.scammers.index_information())["id_unique"]["unique"]
+
+
+async def test_extra_indexes_are_reported_then_dropped(database):
+    await database.scammers.create_index([("legacy", ASCENDING)], name="legacy")
+    report = await ensure_indexes(database, SPECS)
+    assert report.extra == ["scammers.legacy"] and not report.has_drift
+    assert "legacy" in await database.scammers.index_information()
+
+    await ensure_indexes(database, SPECS, drop_extra=True)
+    assert "legacy" not in await database.scammers.index_information()
+
+
+async def test_declared_indexes_build_on_an_empty_database(database):
+    report = await ensure_indexes(database)
+    assert not report.has_drift
+    assert len(report.created) == len(INDEXES)
@@ -0,0 +1,39 @@
+import pytest
+
+from models import MAX_LOOKUP_IDS
+
+FIRST, SECOND, MISSING = "710000000000000001", "710000000000000002", "710000000000000099"
+
+
+@pytest.fixture(scope="module")
+def known(client, admin_headers):
+    for discord_id in (FIRST, SECOND):
+        response = client.post("/api/scammers", headers=admin_headers, json={
+            "discord_id": discord_id, "discord_name": "lookup", "scam_method": "m", "description": "d",
+        })
+        assert response.status_code == 200
+
+
+def test_hits_and_misses_keep_the_request_order(client, known):
+    response = client.post("/api/scammers/lookup", json={
+        "discord_ids": [SECOND, MISSING, FIRST, SECOND, "not-an-id", "²" * 18],
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["hits"] == [SECOND, FIRST]
+    assert result["misses"] == [MISSING, "not-an-id", "²" * 18]
+    assert sorted(record["discord_id"] for record in result["records"]) == [FIRST, SECOND]
+    assert result["records"][0]["description"] == "d"
+
+
+def test_hits_only_skips_the_records(client, known):
+    result = client.post("/api/scammers/lookup", json={"discord_ids": [FIRST, MISSING], "hits_only": True}).json()
+    assert (result["hits"], result["misses"], result["records"]) == ([FIRST], [MISSING], [])
+
+
+def test_batch_size_is_capped(client):
+    too_many = [str(720000000000000000 + n) for n in range(MAX_LOOKUP_IDS + 1)]
+    assert client.post("/api/scammers/lookup", json={"discord_ids": too_many}).status_code == 422
+    assert client.post("/api/scammers/lookup", json={"discord_ids": []}).json() == {
+        "hits": [], "misses": [], "records": [],
+    }
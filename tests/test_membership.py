@@ -0,0 +1,93 @@
+from array import array
+
+import pytest
+
+from membership import MembershipIndex, merge_sorted
+
+
+@pytest.mark.parametrize("discord_id", ["²" * 18, "᧚" * 18, "١" * 18, "12345", "x" * 18])
+def test_check_rejects_malformed_ids(client, discord_id):
+    response = client.get(f"/api/check/{discord_id}")
+    assert response.status_code == 400
+
+
+def test_check_reports_unknown_ids(client):
+    response = client.get("/api/check/999999999999999999")
+    assert response.status_code == 200
+    assert response.json() == {"discord_id": "999999999999999999", "flagged": False}
+
+
+def test_check_follows_writes(client, admin_headers):
+    discord_id = "730000000000000001"
+    created = client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": discord_id, "discord_name": "member", "scam_method": "m", "description": "d",
+    }).json()
+    assert client.get(f"/api/check/{discord_id}").json()["flagged"] is True
+
+    client.put(f"/api/scammers/{created['id']}", headers=admin_headers, json={"status": "inactive"})
+    assert client.get(f"/api/check/{discord_id}").json()["flagged"] is False
+
+    client.put(f"/api/scammers/{created['id']}", headers=admin_headers, json={"status": "active"})
+    client.delete(f"/api/scammers/{created['id']}", headers=admin_headers)
+    assert client.get(f"/api/check/{discord_id}").json()["flagged"] is False
+
+
+def test_merge_sorted_inserts_and_removes():
+    base = array("Q", [10, 20, 30, 40])
+    assert merge_sorted(base, [5, 25, 50], [20, 40]).tolist() == [5, 10, 25, 30, 50]
+    assert merge_sorted(array("Q"), [2, 1], []).tolist() == [1, 2]
+    assert merge_sorted(base, [], []).tolist() == base.tolist()
+
+
+def _record(discord_id, status="active"):
+    return {"discord_id": discord_id, "status": status}
+
+
+def test_apply_tracks_status_and_id_changes():
+    index = MembershipIndex(compact_threshold=2)
+    first, second = "740000000000000001", "740000000000000002"
+    index.apply([(None, _record(first)), (None, _record(second, "inactive"))])
+    assert index.is_flagged(first) and not index.is_flagged(second)
+
+    # A changed Discord ID leaves the old one behind; an unrelated compaction keeps both answers
+    index.apply([(_record(first), _record(second)), (None, _record("740000000000000003"))])
+    index.compact()
+    assert not index.is_flagged(first) and index.is_flagged(second)
+    assert len(index) == 2
+
+    index.apply([(_record(second), None)])
+    assert not index.is_flagged(second)
+    assert len(index) == 1
+
+
+def test_deltas_compact_past_the_threshold():
+    index = MembershipIndex(compact_threshold=2)
+    index.apply([(None, _record(str(750000000000000000 + n))) for n in range(3)])
+    base, added, removed = index.parts()
+    assert len(base) == 3 and not added and not removed
+
+
+@pytest.mark.anyio
+async def test_load_reports_drift(database):
+    index = MembershipIndex()
+    index.apply([(None, _record("760000000000000009"))])
+    await database.scammers.insert_many([
+        _record("760000000000000001"), _record("760000000000000002"),
+        _record("760000000000000002"), _record("760000000000000003", "inactive"),
+    ])
+
+    assert await index.load(database, "epoch", 4) == (2, 1)
+    assert index.loaded and (index.epoch, index.synced_seq) == ("epoch", 4)
+    assert sorted(merge_sorted(*index.parts()).tolist()) == [760000000000000001, 760000000000000002]
+    assert await index.load(database, "epoch", 4) == (0, 0)
+
+
+def test_mark_synced_needs_contiguous_versions():
+    index = MembershipIndex()
+    index.epoch, index.synced_seq = "epoch", 3
+    index.mark_synced("epoch", 5, 6)
+    assert index.synced_seq == 3
+    index.mark_synced("epoch", 4, 6)
+    assert index.synced_seq == 6
+    index.mark_synced("other", 7, 7)
+    assert index.synced_seq == 6
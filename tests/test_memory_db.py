@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteOne, InsertOne, UpdateOne
+
+from tests import memory_db
+from models import ScammerStatus
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_documents_read_back_with_bson_types(database):
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678999)
+    document = {"id": "a", "status": ScammerStatus.ACTIVE, "created_at": created_at, "tags": ["x"]}
+    await database.scammers.insert_one(document)
+
+    # Like the driver, the _id is assigned on the caller's document
+    assert "_id" in document
+    stored = await database.scammers.find_one({"id": "a"}, {"_id": 0})
+    assert stored == {"id": "a", "status": "active", "created_at": created_at.replace(microsecond=678000), "tags": ["x"]}
+
+
+async def test_reads_and_writes_never_share_state(database):
+    document = {"id": "a", "tags": ["x"]}
+    await database.scammers.insert_one(document)
+    document["tags"].append("changed by caller")
+
+    first = await database.scammers.find_one({"id": "a"})
+    first["tags"].append("changed by reader")
+
+    assert (await database.scammers.find_one({"id": "a"}))["tags"] == ["x"]
+
+
+async def test_unique_and_partial_indexes(database):
+    await database.scammers.create_index("discord_id", unique=True)
+    await database.scammers.create_index(
+        "email", name="email_unique", unique=True, partialFilterExpression={"email": {"$exists": True}}
+    )
+    await database.scammers.insert_one({"discord_id": "1"})
+    with pytest.raises(DuplicateKeyError):
+        await database.scammers.insert_one({"discord_id": "1"})
+
+    # Documents outside the partial filter never conflict
+    await database.scammers.insert_one({"discord_id": "2"})
+    await database.scammers.insert_one({"discord_id": "3", "email": "a@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await database.scammers.insert_one({"discord_id": "4", "email": "a@example.com"})
+
+    # An update may not take another document's key either
+    with pytest.raises(DuplicateKeyError):
+        await database.scammers.update_one({"discord_id": "2"}, {"$set": {"discord_id": "1"}})
+    assert await database.scammers.count_documents({}) == 3
+
+
+async def test_creating_an_index_over_duplicates_fails(database):
+    await database.scammers.insert_many([{"discord_id": "1"}, {"discord_id": "1"}])
+    with pytest.raises(DuplicateKeyError):
+        await database.scammers.create_index("discord_id", unique=True)
+    assert "discord_id_1" not in await database.scammers.index_information()
+
+
+async def test_same_keys_under_another_name_conflict(database):
+    await database.scammers.create_index("discord_id", name="first")
+    assert await database.scammers.create_index("discord_id", name="first") == "first"
+    with pytest.raises(OperationFailure):
+        await database.scammers.create_index("discord_id", name="second")
+
+
+@pytest.mark.parametrize("ordered, inserted", [(True, 1), (False, 2)])
+async def test_insert_many_reports_duplicates(database, ordered, inserted):
+    await database.scammers.create_index("discord_id", unique=True)
+    documents = [{"discord_id": "1"}, {"discord_id": "1"}, {"discord_id": "2"}]
+    with pytest.raises(BulkWriteError) as raised:
+        await database.scammers.insert_many(documents, ordered=ordered)
+
+    errors = raised.value.details["writeErrors"]
+    assert [(error["index"], error["code"]) for error in errors] == [(1, memory_db.DUPLICATE_KEY_ERROR)]
+    assert raised.value.details["nInserted"] == inserted
+    assert await database.scammers.count_documents({}) == inserted
+
+
+async def test_query_operators(database):
+    await database.scammers.insert_many([
+        {"n": 1, "name": "Alpha", "tags": ["a", "b"]},
+        {"n": 2, "name": "beta", "tags": ["b"]},
+        {"n": 3, "name": "Gamma"},
+    ])
+
+    async def numbers(query):
+        return sorted(document["n"] for document in await database.scammers.find(query).to_list(None))
+
+    assert await numbers({"n": {"$gt": 1, "$lte": 3}}) == [2, 3]
+    assert await numbers({"n": {"$in": [1, 3]}}) == [1, 3]
+    assert await numbers({"n": {"$nin": [1, 3]}}) == [2]
+    assert await numbers({"n": {"$ne": 2}}) == [1, 3]
+    assert await numbers({"tags": "b"}) == [1, 2]
+    assert await numbers({"tags": {"$all": ["a", "b"]}}) == [1]
+    assert await numbers({"tags": {"$exists": False}}) == [3]
+    assert await numbers({"name": {"$regex": "^(alpha|gamma)$", "$options": "i"}}) == [1, 3]
+    assert await numbers({"$or": [{"n": 1}, {"name": "Gamma"}]}) == [1, 3]
+    assert await numbers({"$and": [{"n": {"$gte": 2}}, {"tags": {"$exists": True}}]}) == [2]
+
+
+async def test_indexed_and_unindexed_queries_agree(database):
+    documents = [{"n": n % 7, "name": f"user{n}"} for n in range(50)]
+    await database.plain.insert_many([dict(document) for document in documents])
+    await database.indexed.insert_many([dict(document) for document in documents])
+    await database.indexed.create_index("n")
+    await database.indexed.create_index("name")
+
+    for query in (
+        {"n": 3},
+        {"n": {"$in": [1, 2]}},
+        {"n": {"$gte": 2, "$lt": 5}},
+        {"$or": [{"n": 6}, {"name": "user1"}]},
+        {"name": {"$gt": "user4"}},
+    ):
+        plain = await database.plain.find(query, {"_id": 0}).sort("name", ASCENDING).to_list(None)
+        indexed = await database.indexed.find(query, {"_id": 0}).sort("name", ASCENDING).to_list(None)
+        assert plain == indexed, query
+
+
+async def test_sort_skip_limit_over_a_compound_index(database):
+    await database.scammers.create_index([("created_at", DESCENDING), ("id", DESCENDING)])
+    start = datetime(2025, 1, 1)
+    # Two records per millisecond, so id has to break the ties
+    await database.scammers.insert_many([
+        {"id": f"{n:03d}", "created_at": start + timedelta(milliseconds=n // 2)} for n in range(20)
+    ])
+
+    sort = [("created_at", DESCENDING), ("id", DESCENDING)]
+    page = await database.scammers.find({}, {"_id": 0, "id": 1}).sort(sort).skip(3).limit(4).to_list(None)
+    assert [document["id"] for document in page] == ["016", "015", "014", "013"]
+
+
+async def test_update_operators_and_upsert(database):
+    await database.counters.insert_one({"_id": "a", "value": 1, "note": "x"})
+    await database.counters.update_one({"_id": "a"}, {"$inc": {"value": 2}, "$unset": {"note": ""}})
+    assert await database.counters.find_one({"_id": "a"}) == {"_id": "a", "value": 3}
+
+    result = await database.counters.update_one(
+        {"_id": "b"}, {"$set": {"value": 1}, "$setOnInsert": {"created": True}}, upsert=True
+    )
+    assert result.upserted_id == "b"
+    await database.counters.update_one({"_id": "b"}, {"$set": {"value": 2}, "$setOnInsert": {"created": False}}, upsert=True)
+    assert await database.counters.find_one({"_id": "b"}) == {"_id": "b", "value": 2, "created": True}
+
+    unchanged = await database.counters.update_one({"_id": "b"}, {"$set": {"value": 2}})
+    assert (unchanged.matched_count, unchanged.modified_count) == (1, 0)
+
+
+async def test_find_one_and_update_and_delete(database):
+    await database.scammers.insert_one({"id": "a", "status": "active"})
+    before = await database.scammers.find_one_and_update(
+        {"id": "a"}, {"$set": {"status": "inactive"}}, projection={"_id": 0}
+    )
+    after = await database.scammers.find_one_and_update(
+        {"id": "a"}, {"$set": {"status": "resolved"}}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    assert before == {"id": "a", "status": "active"}
+    assert after == {"id": "a", "status": "resolved"}
+    assert await database.scammers.find_one_and_update({"id": "missing"}, {"$set": {"status": "x"}}) is None
+
+    assert await database.scammers.find_one_and_delete({"id": "a"}, projection={"_id": 0}) == after
+    assert await database.scammers.find_one_and_delete({"id": "a"}) is None
+
+
+async def test_bulk_write(database):
+    await database.scammers.create_index("id", unique=True)
+    await database.scammers.insert_one({"id": "a", "n": 1})
+    result = await database.scammers.bulk_write([
+        InsertOne({"id": "b", "n": 1}),
+        UpdateOne({"id": "a"}, {"$set": {"n": 2}}),
+        DeleteOne({"id": "b"}),
+    ])
+    assert (result.inserted_count, result.modified_count, result.deleted_count) == (1, 1, 1)
+    assert await database.scammers.find({}, {"_id": 0}).to_list(None) == [{"id": "a", "n": 2}]
+
+
+async def test_aggregate_group_and_facet(database):
+    await database.scammers.insert_many([
+        {"status": "active", "scam_method": "phishing"},
+        {"status": "active", "scam_method": "trade"},
+        {"status": "inactive", "scam_method": "phishing"},
+    ])
+    pipeline = [{"$facet": {
+        "total": [{"$count": "count"}],
+        "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}, {"$sort": {"_id": 1}}],
+        "active": [{"$match": {"status": "active"}}, {"$count": "count"}],
+    }}]
+    [result] = await database.scammers.aggregate(pipeline).to_list(None)
+    assert result["total"] == [{"count": 3}]
+    assert result["by_status"] == [{"_id": "active", "count": 2}, {"_id": "inactive", "count": 1}]
+    assert result["active"] == [{"count": 2}]
+
+
+async def test_ttl_index_expires_documents(database, monkeypatch):
+    monkeypatch.setattr(memory_db, "TTL_SWEEP_SECONDS", 0)
+    await database.events.create_index("at", expireAfterSeconds=60)
+    await database.events.insert_many([
+        {"n": 1, "at": datetime.utcnow() - timedelta(seconds=120)},
+        {"n": 2, "at": datetime.utcnow()},
+    ])
+    assert [document["n"] for document in await database.events.find({}).to_list(None)] == [2]
+
+
+async def test_change_streams_are_not_supported(database):
+    with pytest.raises(OperationFailure):
+        database.scammers.watch()
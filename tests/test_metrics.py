@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import server
+from metrics import (
+    Collected, Counter, Histogram, MongoCommandMetrics, Registry, mongo_command_duration, mongo_commands,
+)
+
+
+def test_counter_renders_escaped_labels():
+    counter = Counter("requests_total", "Requests.", ("route",))
+    counter.inc(('/a"b\\c',))
+    counter.inc(('/a"b\\c',), 2)
+    assert counter.render() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b\\\\c"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(("/a",), value)
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_collected_values_are_read_at_scrape_time():
+    depth = [1]
+    registry = Registry()
+    registry.register(Collected("queue_depth", "Queue depth.", lambda: depth[0]))
+    registry.register(Collected("hits_total", "Hits.", lambda: {("a",): 2, ("b",): 0.5}, ("cache",), kind="counter"))
+    depth[0] = 4
+    assert registry.render().decode().splitlines()[2:] == [
+        "queue_depth 4", "# HELP hits_total Hits.", "# TYPE hits_total counter",
+        'hits_total{cache="a"} 2', 'hits_total{cache="b"} 0.5',
+    ]
+
+
+def _event(request_id, command_name, command, duration_micros=1500):
+    return SimpleNamespace(request_id=request_id, connection_id=("db", 27017), command_name=command_name,
+                           command=command, duration_micros=duration_micros)
+
+
+def test_mongo_commands_are_labelled_by_collection():
+    listener = MongoCommandMetrics()
+    listener.started(_event(1, "find", {"find": "metrics_test"}))
+    listener.succeeded(_event(1, "find", {}))
+    listener.started(_event(2, "getMore", {"getMore": 123, "collection": "metrics_test"}))
+    listener.failed(_event(2, "getMore", {}))
+    rendered = "\n".join(mongo_commands.render() + mongo_command_duration.render())
+    assert 'mongodb_commands_total{collection="metrics_test",command="find",outcome="success"}' in rendered
+    assert 'mongodb_commands_total{collection="metrics_test",command="getMore",outcome="failure"}' in rendered
+    assert 'mongodb_command_duration_seconds_sum{collection="metrics_test",command="find"} 0.0015' in rendered
+    assert not listener._collections
+
+
+def test_requests_are_labelled_by_route_template(client):
+    client.get("/api/scammers/public/metrics-missing")
+    client.get("/no/such/path")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/scammers/public/{scammer_id}",status="404"}' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert "password_hash_queue_depth 0" in body
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape")
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
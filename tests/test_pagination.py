@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+import base64
+import json
+import uuid
+
+import pytest
+
+import server
+from pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor, next_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 5, 6, 7, 8, 9, 123000)
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": "abc"})) == (created_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", ""])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_cursor_with_an_offset_is_naive_utc():
+    cursor = base64.urlsafe_b64encode(json.dumps(["2025-05-06T09:08:09+02:00", "abc"]).encode()).decode()
+    assert decode_cursor(cursor) == (datetime(2025, 5, 6, 7, 8, 9), "abc")
+
+
+def test_short_page_has_no_next_cursor():
+    row = {"created_at": datetime(2025, 1, 1), "id": "a"}
+    assert next_cursor([row], 2) is None
+    assert next_cursor([], 2) is None
+    assert next_cursor([row, row], 2) is not None
+
+
+def test_after_cursor_keeps_the_query():
+    assert after_cursor({"status": "active"}, None) == {"status": "active"}
+    cursor = encode_cursor({"created_at": datetime(2025, 1, 1), "id": "a"})
+    assert after_cursor({"status": "active"}, cursor)["$and"][0] == {"status": "active"}
+    assert "$or" in after_cursor({}, cursor)
+
+
+async def test_pages_cover_every_record_once_with_ties(database, monkeypatch):
+    monkeypatch.setattr(server, "db", database)
+    await database.scammers.create_index([("created_at", -1), ("id", -1)])
+    start = datetime(2025, 1, 1)
+    # Three records per millisecond: the id decides their order
+    await database.scammers.insert_many([
+        {"id": str(uuid.uuid4()), "discord_id": str(100000000000000000 + n), "discord_name": f"n{n}",
+         "scam_method": "m", "description": "d", "status": "active",
+         "created_at": start + timedelta(milliseconds=n // 3)}
+        for n in range(25)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await server.find_scammers(database, None, 4, cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    expected = await database.scammers.find({}, {"_id": 0}).sort(server.SORT).to_list(None)
+    assert [row["id"] for row in seen] == [row["id"] for row in expected]
+
+
+def test_public_list_follows_the_next_cursor_header(client, admin_headers):
+    method = f"pagination-{uuid.uuid4().hex[:8]}"
+    created = []
+    for n in range(5):
+        response = client.post("/api/scammers", headers=admin_headers, json={
+            "discord_id": str(200000000000000000 + uuid.uuid4().int % 10 ** 17),
+            "discord_name": f"paged{n}", "scam_method": method, "description": "d",
+        })
+        assert response.status_code == 200
+        created.append(response.json()["id"])
+
+    first = client.get("/api/scammers/public", params={"limit": 2})
+    assert first.status_code == 200 and len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/api/scammers/public", params={"limit": 2, "cursor": cursor})
+    assert not {row["id"] for row in first.json()} & {row["id"] for row in second.json()}
+
+    # Newest first: the last records created lead the list
+    assert [row["id"] for row in first.json() + second.json()] == created[::-1][:4]
+
+
+def test_cursor_with_an_offset_pages_normally(client):
+    cursor = base64.urlsafe_b64encode(json.dumps(["2999-01-01T00:00:00+05:00", "z"]).encode()).decode()
+    response = client.get("/api/scammers/public", params={"cursor": cursor, "limit": 2})
+    assert response.status_code == 200 and len(response.json()) == 2
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/scammers/public", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def test_search_results_page_with_the_cursor(client, admin_headers):
+    # The frontend searches on the server and follows X-Next-Cursor through the matches
+    name = f"paged-search-{uuid.uuid4().hex[:8]}"
+    for _ in range(5):
+        response = client.post("/api/scammers", headers=admin_headers, json={
+            "discord_id": str(200000000000000000 + uuid.uuid4().int % 10 ** 17),
+            "discord_name": name, "scam_method": "m", "description": "d",
+        })
+        assert response.status_code == 200
+
+    seen, cursor = [], None
+    while True:
+        params = {"search": name, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/scammers/public", params=params)
+        seen.extend(row["discord_name"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [name] * 5
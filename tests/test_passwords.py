@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+import auth
+from models import User
+from passwords import PasswordHasher, pwd_context
+
+pytestmark = pytest.mark.anyio
+
+# The minimum bcrypt cost keeps the tests fast
+FAST = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+
+
+async def test_cancelled_waiters_leave_the_queue():
+    hasher = PasswordHasher(pwd_context, concurrency=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+        return "done"
+
+    running = asyncio.ensure_future(hasher._run(block))
+    try:
+        await asyncio.to_thread(started.wait)
+        waiting = asyncio.ensure_future(hasher._run(block))
+        await asyncio.sleep(0)
+        assert (hasher.in_progress, hasher.queue_depth) == (1, 1)
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert hasher.queue_depth == 0
+    finally:
+        release.set()
+    assert await running == "done"
+    assert (hasher.in_progress, hasher.queue_depth) == (0, 0)
+
+
+async def test_hash_and_verify_run_off_the_event_loop():
+    hasher = PasswordHasher(FAST, concurrency=2)
+    assert (await hasher._run(lambda: threading.current_thread().name)).startswith("bcrypt")
+
+    password_hash = await hasher.hash("secret")
+    assert await hasher.verify("secret", password_hash)
+    assert not await hasher.verify("wrong", password_hash)
+    assert await hasher.verify_and_update("secret", password_hash) == (True, None)
+    hasher.shutdown()
+
+
+async def test_concurrency_is_capped():
+    hasher = PasswordHasher(FAST, concurrency=2)
+    running, peak, lock = [0], [0], threading.Lock()
+    release = threading.Event()
+
+    def track():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait()
+        with lock:
+            running[0] -= 1
+
+    calls = [asyncio.ensure_future(hasher._run(track)) for _ in range(5)]
+    try:
+        await asyncio.sleep(0.05)
+        assert (hasher.in_progress, hasher.queue_depth) == (2, 3)
+    finally:
+        release.set()
+    await asyncio.gather(*calls)
+    assert peak[0] == 2
+    assert (hasher.in_progress, hasher.queue_depth) == (0, 0)
+    hasher.shutdown()
+
+
+async def test_failures_release_the_counters():
+    hasher = PasswordHasher(FAST, concurrency=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await hasher._run(fail)
+    assert (hasher.in_progress, hasher.queue_depth) == (0, 0)
+    hasher.shutdown()
+
+
+async def test_outdated_hashes_are_upgraded_on_login(database, monkeypatch):
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(FAST))
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+    await database.users.insert_one(User(username="old", password_hash=outdated).model_dump())
+
+    assert not await auth.authenticate_user(database, "old", "wrong")
+    user = await auth.authenticate_user(database, "old", "secret")
+    assert user.password_hash != outdated and FAST.verify("secret", user.password_hash)
+    stored = await database.users.find_one({"username": "old"})
+    assert stored["password_hash"] == user.password_hash
+    auth.password_hasher.shutdown()
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import search
+import server
+from indexes import ensure_indexes
+from search import build_search_filter, grams, rank, search_fields, with_search_fields
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def string_discord_ids(monkeypatch):
+    # The app's startup backfill switches numeric IDs on for the whole process
+    monkeypatch.setattr(search, "_numeric_discord_ids", False)
+
+
+def test_search_fields_are_normalized():
+    fields = search_fields("  ＮｉｔｒｏＧｉｆｔ ")
+    assert fields["discord_name_lower"] == "nitrogift"
+    assert fields["search_grams"] == grams("nitrogift")
+    assert grams("ab") == []
+
+
+def test_short_queries_match_a_name_prefix():
+    assert build_search_filter("ab") == {"discord_name_lower": {"$regex": "^ab"}}
+    assert build_search_filter("") == {} and build_search_filter(None) == {}
+
+
+def test_user_input_is_never_a_regex():
+    query = build_search_filter("a.*(b")
+    assert query["discord_name_lower"]["$regex"] == r"a\.\*\(b"
+    assert query["search_grams"] == {"$all": grams("a.*(b")}
+
+
+def test_digits_also_match_discord_ids():
+    full = build_search_filter("123456789012345678")
+    assert {"discord_id": "123456789012345678"} in full["$or"]
+    prefix = build_search_filter("1234")
+    assert {"discord_id": {"$regex": "^1234"}} in prefix["$or"]
+
+
+def test_numeric_prefix_is_a_range(monkeypatch):
+    monkeypatch.setattr(search, "_numeric_discord_ids", True)
+    (clause,) = [clause for clause in build_search_filter("12")["$or"] if "discord_id_num" in clause]
+    assert clause["discord_id_num"] == {"$gte": 12 * 10 ** 16, "$lt": 13 * 10 ** 16}
+
+
+def test_rank_prefers_exact_then_prefix_matches():
+    documents = [
+        {"discord_id": "1", "discord_name": "old nitro", "created_at": datetime(2025, 1, 1)},
+        {"discord_id": "2", "discord_name": "nitro", "created_at": datetime(2024, 1, 1)},
+        {"discord_id": "3", "discord_name": "nitroshop", "created_at": datetime(2023, 1, 1)},
+        {"discord_id": "4", "discord_name": "freenitro", "created_at": datetime(2025, 6, 1)},
+    ]
+    assert [document["discord_id"] for document in rank(documents, "Nitro")] == ["2", "3", "1", "4"]
+
+
+async def seed(database, *names):
+    await ensure_indexes(database)
+    start = datetime(2025, 1, 1)
+    await database.scammers.insert_many([
+        with_search_fields({
+            "id": f"id-{n}", "discord_id": str(500000000000000000 + n), "discord_name": name,
+            "scam_method": "m", "description": "d", "status": "active", "created_at": start + timedelta(seconds=n),
+        })
+        for n, name in enumerate(names)
+    ])
+
+
+async def names(database, query, **options):
+    page, _ = await server.find_scammers(database, query, 10, **options)
+    return [row["discord_name"] for row in page]
+
+
+async def test_search_finds_substrings_and_ids(database):
+    await seed(database, "NitroGift", "free_nitro", "Steam (support)", "other")
+    assert await names(database, "nitro") == ["free_nitro", "NitroGift"]
+    assert await names(database, "(support") == ["Steam (support)"]
+    assert await names(database, "50000000000000000") == ["other", "Steam (support)", "free_nitro", "NitroGift"]
+    assert await names(database, "500000000000000001") == ["free_nitro"]
+    assert await names(database, ".*") == []
+
+
+async def test_relevance_mode_ranks_the_matches(database):
+    await seed(database, "freenitro", "nitro", "nitroshop")
+    assert await names(database, "nitro", relevance=True) == ["nitro", "nitroshop", "freenitro"]
@@ -0,0 +1,54 @@
+from datetime import datetime
+import json
+
+import pytest
+
+import serialization
+from models import ScammerResponse, ScammerStatus
+from serialization import SCAMMER_PROJECTION, SCAMMER_RESPONSE_FIELDS, dumps
+
+DOCUMENT = {
+    "id": "a1",
+    "discord_id": "770000000000000001",
+    "discord_name": "Ünïcode \"name\"",
+    "scam_method": "m",
+    "description": "d",
+    "status": ScammerStatus.ACTIVE,
+    "created_at": datetime(2025, 1, 2, 3, 4, 5, 123000),
+    "updated_at": datetime(2025, 1, 2, 3, 4, 5),
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return dumps
+
+
+def test_bytes_match_the_validated_response(encoder):
+    document = {name: DOCUMENT.get(name) for name in SCAMMER_RESPONSE_FIELDS}
+    expected = json.loads(ScammerResponse(**document).model_dump_json())
+    assert json.loads(encoder([document])) == [expected]
+
+
+def test_unsupported_values_are_rejected(encoder):
+    with pytest.raises(TypeError):
+        encoder({"value": object()})
+
+
+def test_projection_covers_the_response_model():
+    assert SCAMMER_PROJECTION["_id"] == 0
+    assert set(SCAMMER_PROJECTION) - {"_id"} == set(ScammerResponse.model_fields)
+
+
+def test_list_route_returns_the_stored_fields_only(client, admin_headers):
+    client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": "770000000000000002", "discord_name": "serialized", "scam_method": "m", "description": "d",
+    })
+    response = client.get("/api/scammers", headers=admin_headers, params={"fields": "full", "search": "serialized"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    [record] = response.json()
+    assert set(record) == set(SCAMMER_RESPONSE_FIELDS)
+    assert ScammerResponse(**record).discord_name == "serialized"
@@ -0,0 +1,88 @@
+import pytest
+
+import similarity
+from similarity import SimilarityIndex, edit_distance, name_grams, skeleton
+
+NAMES = {
+    840000000000000001: "discord_support",
+    840000000000000002: "Nitro Giveaway",
+    840000000000000003: "steam-trade-bot",
+    840000000000000004: "discord staff",
+}
+
+
+def _record(discord_id, name):
+    return {"discord_id": str(discord_id), "discord_name": name}
+
+
+@pytest.fixture
+def index():
+    index = SimilarityIndex()
+    index.apply([(None, _record(discord_id, name)) for discord_id, name in NAMES.items()])
+    return index
+
+
+def test_lookalikes_fold_to_the_same_skeleton():
+    # Digits, Cyrillic letters, accents and separators
+    assert skeleton("D1sсоrd.Suppórt") == skeleton("discord support") == "discord support"
+    assert name_grams("ab") == {"  a", " ab", "ab "}
+    assert name_grams("  _ ") == set()
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == edit_distance("abc", "") == 3
+    assert edit_distance("same", "same") == 0
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_renamed_accounts_rank_first(index, monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(similarity, "numpy", None)
+    matches = index.search("d1scord_supp0rt", limit=2)
+    assert [discord_id for discord_id, _ in matches] == [840000000000000001, 840000000000000004]
+    assert matches[0][1] == 1.0
+    assert index.search("zzzz") == []
+    assert index.search("discord_support", min_score=1.0, limit=5) == [(840000000000000001, 1.0)]
+
+
+def test_scoring_paths_agree(index, monkeypatch):
+    vectorized = index.search("discord", limit=10, min_score=0.1)
+    monkeypatch.setattr(similarity, "numpy", None)
+    assert index.search("discord", limit=10, min_score=0.1) == vectorized
+
+
+def test_renames_and_deletes_leave_dead_slots(index):
+    old, new = _record(840000000000000002, "Nitro Giveaway"), _record(840000000000000002, "free nitro")
+    index.apply([(old, new), (_record(840000000000000003, "steam-trade-bot"), None)])
+    assert len(index) == 3
+    assert index.search("nitro giveaway", min_score=0.8) == []
+    assert index.search("free nitro")[0] == (840000000000000002, 1.0)
+    assert index.search("steam trade bot") == []
+    assert index.due()
+
+
+@pytest.mark.anyio
+async def test_load_drops_dead_slots(database, index):
+    await database.scammers.insert_many([
+        _record(840000000000000001, "discord_support"), _record(840000000000000005, "fresh name"),
+        {"discord_id": "not-an-id", "discord_name": "broken"},
+    ])
+    index.apply([(_record(840000000000000002, "Nitro Giveaway"), None)])
+    await index.load(database)
+    assert len(index) == 2 and index._dead == 0
+    assert index.search("fresh name")[0][0] == 840000000000000005
+    assert index.search("broken") == []
+    assert index.loaded and not index.due()
+
+
+def test_similar_endpoint(client, admin_headers):
+    client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": "840000000000000009", "discord_name": "crypto_helper_desk", "scam_method": "m", "description": "d",
+    })
+    response = client.get("/api/scammers/similar", headers=admin_headers, params={"name": "crypt0 helper d3sk"})
+    assert response.status_code == 200
+    [best, *_] = response.json()
+    # Same skeleton, four characters apart as typed
+    assert (best["discord_id"], best["score"], best["distance"]) == ("840000000000000009", 1.0, 4)
+    assert "description" not in best
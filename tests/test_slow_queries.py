@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from slow_queries import (
+    SlowQueryLog, current_scope, docs_returned, filter_shape, redact, summarize_explain,
+)
+
+EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_1"}}},
+    "executionStats": {"totalDocsExamined": 40, "totalKeysExamined": 40, "nReturned": 20},
+}
+
+
+def test_filters_keep_their_shape_only():
+    assert redact({"status": "active", "name": {"$in": ["a", "b"]}, "$or": [{"a": 1}, {"b": 2}]}) == {
+        "status": "?", "name": {"$in": ["?"]}, "$or": [{"a": "?"}, {"b": "?"}],
+    }
+    assert filter_shape("update", {"updates": [{"q": {"id": "x"}, "u": {}}, {"q": {"id": "y"}}]}) == [{"id": "?"}]
+    assert filter_shape("insert", {"documents": []}) is None
+
+
+def test_docs_returned():
+    assert docs_returned("find", {"cursor": {"firstBatch": [{}, {}]}}) == 2
+    assert docs_returned("getMore", {"cursor": {"nextBatch": [{}]}}) == 1
+    assert docs_returned("delete", {"n": 3}) == 3
+    assert docs_returned("findAndModify", {"value": None}) == 0
+
+
+def test_explain_summary():
+    assert summarize_explain(EXPLAIN) == {
+        "plan": "FETCH <- IXSCAN(status_1)", "collscan": False,
+        "docs_examined": 40, "keys_examined": 40, "docs_returned": 20,
+    }
+    aggregate = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}, {"$group": {}}]}
+    assert summarize_explain(aggregate)["collscan"] is True
+
+
+def _run(log, request_id, duration_ms, filter=None, command_name="find"):
+    command = {command_name: "scammers", "filter": filter or {"status": "active"}, "lsid": {}, "$db": "test"}
+    event = SimpleNamespace(request_id=request_id, connection_id=("db", 27017), command_name=command_name,
+                            command=command, duration_micros=duration_ms * 1000, reply={"cursor": {"firstBatch": []}})
+    log.started(event)
+    log.succeeded(event)
+
+
+def test_slow_commands_are_aggregated_by_shape():
+    log = SlowQueryLog(threshold_ms=100, explain_rate=0)
+    token = current_scope.set({"method": "GET", "path": "/api/scammers"})
+    try:
+        _run(log, 1, 50)
+        _run(log, 2, 150, {"status": "inactive"})
+        _run(log, 3, 250)
+        _run(log, 4, 500, {"discord_id": "x"})
+    finally:
+        current_scope.reset(token)
+    _run(log, 5, 120, {"discord_id": "y"})
+
+    top = log.top(10)
+    assert [(entry.filter, entry.count, entry.total_ms) for entry in top] == [
+        ({"discord_id": "?"}, 2, 620), ({"status": "?"}, 2, 400),
+    ]
+    assert top[0].routes == ["GET /api/scammers", "background"]
+    assert log.top(1) == top[:1]
+    log.reset()
+    assert log.top(10) == []
+
+
+class ExplainingDatabase:
+    def __init__(self):
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return EXPLAIN
+
+
+@pytest.mark.anyio
+async def test_sampled_slow_reads_are_explained():
+    log = SlowQueryLog(threshold_ms=100, explain_rate=1)
+    database = ExplainingDatabase()
+    log.start(database)
+    _run(log, 1, 200)
+    _run(log, 2, 200)
+    while log._explain_tasks or log._explains_in_flight:
+        await asyncio.sleep(0)
+
+    # One explain per shape and interval, without the driver's session fields
+    assert database.commands == [{
+        "explain": {"find": "scammers", "filter": {"status": "active"}}, "verbosity": "executionStats",
+    }]
+    [entry] = log.top(1)
+    assert (entry.plan, entry.collscan, entry.docs_examined) == ("FETCH <- IXSCAN(status_1)", False, 40)
+
+
+@pytest.mark.anyio
+async def test_failed_explains_are_released(database):
+    log = SlowQueryLog(threshold_ms=100, explain_rate=1)
+    log.start(database)
+    _run(log, 1, 200)
+    while log._explain_tasks or log._explains_in_flight:
+        await asyncio.sleep(0)
+    assert log.top(1)[0].plan is None
+
+
+def test_endpoints_require_admin(client, admin_headers, monkeypatch):
+    log = SlowQueryLog(threshold_ms=100, explain_rate=0)
+    monkeypatch.setattr(server, "slow_query_log", log)
+    _run(log, 1, 200)
+    assert client.get("/api/admin/slow-queries").status_code == 403
+    [entry] = client.get("/api/admin/slow-queries", headers=admin_headers).json()
+    assert (entry["collection"], entry["count"]) == ("scammers", 1)
+    assert "explained_at" not in entry
+    assert client.delete("/api/admin/slow-queries", headers=admin_headers).status_code == 200
+    assert client.get("/api/admin/slow-queries", headers=admin_headers).json() == []
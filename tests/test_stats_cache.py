@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from stats_cache import StatisticsCache, statistics_delta
+
+pytestmark = pytest.mark.anyio
+
+
+def scammer(n, status="active", scam_method="phishing"):
+    return {"id": f"id-{n}", "status": status, "scam_method": scam_method}
+
+
+async def test_served_from_cache_until_it_expires(database):
+    await database.scammers.insert_many([scammer(1), scammer(2, "inactive")])
+    cache = StatisticsCache(ttl_seconds=60)
+    first = await cache.get(database)
+    assert (first.total_records, first.active_threats) == (2, 1)
+
+    # A write the cache is not told about stays invisible until the TTL expires
+    await database.scammers.insert_one(scammer(3))
+    assert (await cache.get(database)).total_records == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.invalidate()
+    assert (await cache.get(database)).total_records == 3
+
+
+async def test_writes_are_folded_into_the_counters(database):
+    await database.scammers.insert_one(scammer(1))
+    cache = StatisticsCache()
+    await cache.get(database)
+
+    cache.apply([
+        (None, scammer(2, scam_method="nitro")),
+        (scammer(1), scammer(1, "inactive")),
+    ])
+    stats = await cache.get(database)
+    assert stats.total_records == 2 and stats.active_threats == 1
+    assert stats.by_status == {"active": 1, "inactive": 1}
+    assert stats.by_scam_method == {"phishing": 1, "nitro": 1}
+
+    cache.apply([(scammer(2, scam_method="nitro"), None)])
+    assert (await cache.get(database)).by_scam_method == {"phishing": 1}
+    assert cache.misses == 1
+
+
+async def test_one_rebuild_for_concurrent_misses(database, monkeypatch):
+    await database.scammers.insert_one(scammer(1))
+    cache = StatisticsCache()
+    aggregate = database.scammers.aggregate
+    calls = []
+
+    def counting(pipeline):
+        calls.append(pipeline)
+        return aggregate(pipeline)
+
+    monkeypatch.setattr(database.scammers, "aggregate", counting)
+    results = await asyncio.gather(*(cache.get(database) for _ in range(5)))
+    assert len(calls) == 1
+    assert {result.total_records for result in results} == {1}
+
+
+async def test_write_during_a_rebuild_is_not_lost(database, monkeypatch):
+    cache = StatisticsCache()
+    aggregate = database.scammers.aggregate
+
+    def racing(pipeline):
+        # A write lands while the counts are computed: the result must not be kept
+        cache.apply([(None, scammer(1))])
+        return aggregate(pipeline)
+
+    monkeypatch.setattr(database.scammers, "aggregate", racing)
+    await cache.get(database)
+    monkeypatch.setattr(database.scammers, "aggregate", aggregate)
+    await database.scammers.insert_one(scammer(1))
+    assert (await cache.get(database)).total_records == 1
+
+
+def test_delta_of_changes():
+    delta = statistics_delta([(None, scammer(1)), (scammer(2), scammer(2, "inactive"))])
+    assert delta["total_records"] == 1 and delta["active_threats"] == 0
+    assert delta["by_status"] == {"inactive": 1}
+    assert delta["by_scam_method"] == {"phishing": 1}
+
+
+def test_statistics_endpoint_follows_writes(client, admin_headers):
+    before = client.get("/api/statistics").json()
+    response = client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": "600000000000000001", "discord_name": "stats", "scam_method": "stats-test", "description": "d",
+    })
+    assert response.status_code == 200
+    after = client.get("/api/statistics").json()
+    assert after["total_records"] == before["total_records"] + 1
+    assert after["by_scam_method"]["stats-test"] == 1
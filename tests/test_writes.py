@@ -0,0 +1,51 @@
+import pytest
+
+
+def _create(client, admin_headers, discord_id, name="writer"):
+    return client.post("/api/scammers", headers=admin_headers, json={
+        "discord_id": discord_id, "discord_name": name, "scam_method": "m", "description": "d",
+    })
+
+
+@pytest.fixture(scope="module")
+def records(client, admin_headers):
+    return [
+        _create(client, admin_headers, "800000000000000001").json(),
+        _create(client, admin_headers, "800000000000000002").json(),
+    ]
+
+
+def test_duplicate_discord_id_is_rejected(client, admin_headers, records):
+    total = client.get("/api/statistics").json()["total_records"]
+    response = _create(client, admin_headers, records[0]["discord_id"], name="copy")
+    assert response.status_code == 400
+    assert client.get("/api/statistics").json()["total_records"] == total
+
+
+def test_update_returns_the_stored_record(client, admin_headers, records):
+    response = client.put(f"/api/scammers/{records[0]['id']}", headers=admin_headers,
+                          json={"discord_name": "renamed", "status": "inactive"})
+    assert response.status_code == 200
+    updated = response.json()
+    assert (updated["discord_name"], updated["status"]) == ("renamed", "inactive")
+    assert updated["updated_at"] > records[0]["updated_at"]
+    assert client.get(f"/api/scammers/{records[0]['id']}", headers=admin_headers).json() == updated
+
+
+def test_update_to_a_taken_discord_id_is_rejected(client, admin_headers, records):
+    before = client.get(f"/api/scammers/{records[1]['id']}", headers=admin_headers).json()
+    response = client.put(f"/api/scammers/{records[1]['id']}", headers=admin_headers,
+                          json={"discord_id": records[0]["discord_id"]})
+    assert response.status_code == 400
+    assert client.get(f"/api/scammers/{records[1]['id']}", headers=admin_headers).json() == before
+
+
+def test_empty_update_changes_nothing(client, admin_headers, records):
+    before = client.get(f"/api/scammers/{records[1]['id']}", headers=admin_headers).json()
+    response = client.put(f"/api/scammers/{records[1]['id']}", headers=admin_headers, json={})
+    assert response.json() == before
+
+
+@pytest.mark.parametrize("body", [{}, {"discord_name": "x"}])
+def test_update_of_a_missing_record(client, admin_headers, body):
+    assert client.put("/api/scammers/missing", headers=admin_headers, json=body).status_code == 404